@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Latency vs. angle accuracy of the detection engine at different scales.
+
+Runs DetectionEngine on synthetic board images with known angles, once per
+detection scale, and reports the median detection latency and the angle
+error of the lines found at each scale.
+
+Usage:
+    python benchmarks/bench_detection_scale.py [--resolution 1920x1080]
+        [--scales 1.0 0.75 0.5 0.35 0.25] [--repeats 20] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.detection_engine import DetectionEngine
+from benchmarks.synthetic_boards import make_board_image, angle_errors
+
+def run_scale(engine, image, true_angles, scale, repeats):
+    engine.detection_scale = scale
+    engine.detection_target_pixels = None
+
+    timings = []
+    for _ in range(repeats):
+        frame = image.copy()
+        start = time.perf_counter()
+        engine.detect_and_draw_lines_with_angles(frame)
+        timings.append(time.perf_counter() - start)
+
+    # Measure the angles of every selected line once, outside the timed loop
+    measured = measure_line_angles(engine, image)
+
+    errors = angle_errors(measured, true_angles)
+    return {
+        'scale': scale,
+        'median_ms': float(np.median(timings) * 1000),
+        'p95_ms': float(np.percentile(timings, 95) * 1000),
+        'lines': len(measured),
+        'boards_found': int(np.sum(errors <= 1.0)),
+        'boards': len(true_angles),
+        'mean_angle_error': float(np.nanmean(errors)) if np.any(~np.isnan(errors)) else None,
+        'max_angle_error': float(np.nanmax(errors)) if np.any(~np.isnan(errors)) else None
+    }
+
+def measure_line_angles(engine, image):
+    """Angles of the lines the engine selects, using its own pipeline stages"""
+    lines = engine.detect_lines(image)
+    if lines is None:
+        return []
+    classified = engine.classify_lines(engine.select_lines(lines, image.shape), image.shape)
+    return classified['angle'].tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark detection latency vs. accuracy per scale")
+    parser.add_argument('--resolution', default='1920x1080', help="ROI size as WIDTHxHEIGHT")
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.75, 0.5, 0.35, 0.25])
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--json', help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.resolution.lower().split('x'))
+    image, true_angles = make_board_image(width, height)
+
+    engine = DetectionEngine()
+    engine.save_defect_images = False
+
+    results = [run_scale(engine, image, true_angles, scale, args.repeats) for scale in args.scales]
+
+    print(f"\nDetection scale benchmark at {width}x{height} ({args.repeats} repeats)")
+    print(f"{'scale':>6} {'median ms':>10} {'p95 ms':>8} {'lines':>6} {'found':>7} {'mean err':>9} {'max err':>8}")
+    for r in results:
+        mean_err = '-' if r['mean_angle_error'] is None else f"{r['mean_angle_error']:.2f}"
+        max_err = '-' if r['max_angle_error'] is None else f"{r['max_angle_error']:.2f}"
+        print(f"{r['scale']:>6.2f} {r['median_ms']:>10.2f} {r['p95_ms']:>8.2f} {r['lines']:>6} "
+              f"{r['boards_found']:>3}/{r['boards']:<3} {mean_err:>9} {max_err:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump({'resolution': [width, height], 'repeats': args.repeats, 'results': results}, file, indent=2)
+
+    engine.close()
+
+if __name__ == "__main__":
+    main()
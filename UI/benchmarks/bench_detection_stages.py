@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing of the detection hot path, with regression comparison.
+
+Times every stage of DetectionEngine.detect_and_draw_lines_with_angles
+(grayscale, resize, blur, Canny, Hough, line selection, classification,
+drawing, defect save) on synthetic board images across resolutions and ROI
+sizes, and optionally on frames from recorded clips. Results are written as
+JSON so two runs can be compared.
+
+Usage:
+    python benchmarks/bench_detection_stages.py run [--resolutions 640x480 1280x720 1920x1080]
+        [--roi-fractions 1.0 0.5 0.25] [--clips recording.mp4 ...] [--repeats 30]
+        [--json results.json]
+    python benchmarks/bench_detection_stages.py compare baseline.json results.json
+        [--threshold 0.10] [--min-delta-ms 0.05]
+
+compare exits with status 1 when any stage's median slowed down by more than
+the threshold (and by more than min-delta-ms, to ignore timer noise).
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.detection_engine import DetectionEngine
+from benchmarks.synthetic_boards import make_board_image, angle_errors
+
+STAGES = ['grayscale', 'resize', 'blur', 'canny', 'hough', 'selection',
+          'classification', 'drawing', 'defect_save']
+
+def parse_resolution(text):
+    width, height = (int(v) for v in text.lower().split('x'))
+    return width, height
+
+def crop_centre(image, fraction):
+    """Central ROI covering fraction of the image width and height"""
+    height, width = image.shape[:2]
+    roi_width = max(16, int(width * fraction))
+    roi_height = max(16, int(height * fraction))
+    x = (width - roi_width) // 2
+    y = (height - roi_height) // 2
+    return image[y:y + roi_height, x:x + roi_width]
+
+def load_clip_frames(path, max_frames):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+    return frames
+
+def time_case(engine, frames, repeats):
+    """Run detection repeats times, cycling through frames; returns per-stage and total timings in ms"""
+    stage_times = {stage: [] for stage in STAGES}
+    totals = []
+    for index in range(repeats):
+        # Copy outside the timed region - the engine draws on its input
+        frame = frames[index % len(frames)].copy()
+        start = time.perf_counter()
+        engine.detect_and_draw_lines_with_angles(frame)
+        totals.append((time.perf_counter() - start) * 1000)
+        for stage in STAGES:
+            if stage in engine.last_stage_timings:
+                stage_times[stage].append(engine.last_stage_timings[stage] * 1000)
+
+    stages = {}
+    for stage, values in stage_times.items():
+        if values:
+            stages[stage] = {
+                'median_ms': float(np.median(values)),
+                'p95_ms': float(np.percentile(values, 95)),
+                'runs': len(values)
+            }
+    return {
+        'total': {'median_ms': float(np.median(totals)), 'p95_ms': float(np.percentile(totals, 95)),
+                  'runs': len(totals)},
+        'stages': stages
+    }
+
+def measure_accuracy(engine, roi, true_angles):
+    """Board angle errors for a synthetic ROI, using the engine's own stages"""
+    lines = engine.detect_lines(roi)
+    measured = []
+    if lines is not None:
+        measured = engine.classify_lines(engine.select_lines(lines, roi.shape), roi.shape)['angle'].tolist()
+    errors = angle_errors(measured, true_angles)
+    return {
+        'boards_found': int(np.sum(errors <= 1.0)),
+        'boards': len(true_angles)
+    }
+
+def environment_info():
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'opencv': cv2.__version__,
+        'numpy': np.__version__
+    }
+    try:
+        from hardware_config import hardware_config
+        info['cpu_count'] = hardware_config.cpu_count
+        info['memory_gb'] = round(hardware_config.memory_gb, 1)
+        info['performance_profile'] = hardware_config.performance_profile
+    except ImportError:
+        info['cpu_count'] = os.cpu_count()
+    return info
+
+def run(args):
+    engine = DetectionEngine()
+    # Defect images go to a scratch directory: the save stage measures the
+    # hand-off to the writer thread, the encode time is reported separately
+    image_dir = tempfile.mkdtemp(prefix="bench_defects_")
+    engine.image_writer.output_dir = image_dir
+    engine.save_defect_images = not args.no_save
+
+    cases = []
+    try:
+        for resolution in args.resolutions:
+            width, height = parse_resolution(resolution)
+            image, true_angles = make_board_image(width, height, seed=args.seed)
+            for fraction in args.roi_fractions:
+                roi = crop_centre(image, fraction)
+                case = {
+                    'name': f"synthetic/{width}x{height}/roi{fraction:g}",
+                    'source': 'synthetic',
+                    'resolution': [width, height],
+                    'roi': [roi.shape[1], roi.shape[0]]
+                }
+                case.update(time_case(engine, [np.ascontiguousarray(roi)], args.repeats))
+                if fraction == 1.0:
+                    case['accuracy'] = measure_accuracy(engine, roi, true_angles)
+                cases.append(case)
+                print_case(case)
+
+        for clip in args.clips:
+            frames = load_clip_frames(clip, args.clip_frames)
+            if not frames:
+                print(f"Warning: no frames read from {clip}", file=sys.stderr)
+                continue
+            height, width = frames[0].shape[:2]
+            for fraction in args.roi_fractions:
+                rois = [np.ascontiguousarray(crop_centre(frame, fraction)) for frame in frames]
+                case = {
+                    'name': f"clip:{os.path.basename(clip)}/roi{fraction:g}",
+                    'source': clip,
+                    'resolution': [width, height],
+                    'roi': [rois[0].shape[1], rois[0].shape[0]],
+                    'frames': len(frames)
+                }
+                case.update(time_case(engine, rois, args.repeats))
+                cases.append(case)
+                print_case(case)
+
+        engine.image_writer.flush()
+        writer_stats = engine.image_writer.get_stats()
+    finally:
+        engine.close()
+        shutil.rmtree(image_dir, ignore_errors=True)
+
+    results = {
+        'created': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'environment': environment_info(),
+        'repeats': args.repeats,
+        'image_writer': {'avg_encode_ms': writer_stats['avg_encode_ms'], 'written': writer_stats['written']},
+        'cases': cases
+    }
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(results, file, indent=2)
+        print(f"\nResults written to {args.json}")
+    return 0
+
+def print_case(case):
+    stages = case['stages']
+    parts = ' '.join(f"{stage}={stages[stage]['median_ms']:.2f}" for stage in STAGES if stage in stages)
+    accuracy = case.get('accuracy')
+    found = f" found {accuracy['boards_found']}/{accuracy['boards']}" if accuracy else ""
+    print(f"{case['name']:<36} total {case['total']['median_ms']:7.2f} ms (p95 {case['total']['p95_ms']:.2f})"
+          f"{found}\n    {parts}")
+
+def compare(args):
+    with open(args.baseline) as file:
+        baseline = {case['name']: case for case in json.load(file)['cases']}
+    with open(args.results) as file:
+        current = {case['name']: case for case in json.load(file)['cases']}
+
+    regressions = []
+    print(f"{'case':<36} {'stage':<15} {'base ms':>8} {'new ms':>8} {'change':>8}")
+    for name, case in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        rows = [('total', base['total'], case['total'])]
+        rows += [(stage, base['stages'][stage], case['stages'][stage])
+                 for stage in STAGES if stage in base['stages'] and stage in case['stages']]
+        for stage, old, new in rows:
+            old_ms, new_ms = old['median_ms'], new['median_ms']
+            change = (new_ms - old_ms) / old_ms if old_ms > 0 else 0.0
+            regressed = change > args.threshold and new_ms - old_ms > args.min_delta_ms
+            marker = '  REGRESSION' if regressed else ''
+            print(f"{name:<36} {stage:<15} {old_ms:>8.3f} {new_ms:>8.3f} {change:>+7.1%}{marker}")
+            if regressed:
+                regressions.append((name, stage, change))
+
+    missing = sorted(set(baseline) - set(current))
+    if missing:
+        print(f"\nCases missing from the new results: {', '.join(missing)}")
+
+    if regressions:
+        print(f"\n{len(regressions)} stage(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    print("\nNo regressions")
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark each stage of the detection pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Time the detection stages")
+    run_parser.add_argument('--resolutions', nargs='+', default=['640x480', '1280x720', '1920x1080'],
+                            help="Synthetic frame sizes as WIDTHxHEIGHT")
+    run_parser.add_argument('--roi-fractions', type=float, nargs='+', default=[1.0, 0.5, 0.25],
+                            help="Central ROI size as a fraction of the frame width and height")
+    run_parser.add_argument('--clips', nargs='*', default=[], help="Recorded video clips to benchmark")
+    run_parser.add_argument('--clip-frames', type=int, default=50, help="Frames to use from each clip")
+    run_parser.add_argument('--repeats', type=int, default=30)
+    run_parser.add_argument('--seed', type=int, default=0, help="Noise seed for the synthetic images")
+    run_parser.add_argument('--no-save', action='store_true', help="Do not queue defect images")
+    run_parser.add_argument('--json', help="Write results to this JSON file")
+
+    compare_parser = commands.add_parser('compare', help="Compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('results')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Relative slowdown reported as a regression (default: 0.10)")
+    compare_parser.add_argument('--min-delta-ms', type=float, default=0.05,
+                                help="Ignore slowdowns smaller than this many milliseconds")
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        return run(args)
+    return compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
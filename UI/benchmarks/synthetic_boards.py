@@ -0,0 +1,41 @@
+"""
+Synthetic conveyor images with boards at known angles, for benchmarking.
+"""
+import cv2
+import numpy as np
+
+def make_board_image(width=1280, height=720, angles=(90, 90, 84, 90, 78, 90),
+                     board_width=None, noise=8.0, seed=0):
+    """Render light boards on a dark belt, one per angle.
+
+    Angles use the detection engine's convention: 90 is a perfectly
+    aligned (vertical) board, lower values lean further over.
+
+    Returns:
+        (image, angles) - BGR image and the list of board angles drawn
+    """
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 40, dtype=np.uint8)
+
+    slot = width / len(angles)
+    board_width = board_width or max(8, int(slot * 0.35))
+    board_length = height * 0.8
+
+    for i, angle in enumerate(angles):
+        centre = (slot * (i + 0.5), height / 2)
+        # Board rotation from vertical; the long edges then sit at `angle`
+        tilt = 90 - angle
+        box = cv2.boxPoints((centre, (board_width, board_length), tilt))
+        cv2.fillPoly(image, [np.intp(box)], (200, 190, 170), lineType=cv2.LINE_AA)
+
+    if noise:
+        image = np.clip(image + rng.normal(0, noise, image.shape), 0, 255).astype(np.uint8)
+
+    return image, list(angles)
+
+def angle_errors(measured_angles, true_angles):
+    """Absolute error between each true angle and the closest measured one"""
+    measured = np.asarray(measured_angles, dtype=np.float64)
+    if measured.size == 0:
+        return np.full(len(true_angles), np.nan)
+    return np.array([np.min(np.abs(measured - angle)) for angle in true_angles])
@@ -115,7 +115,60 @@ class HardwareConfig:
             'canny_low': 50,
             'canny_high': 150,
             'hough_threshold': self.hough_threshold,
-            'max_defect_images': self.max_defect_images
+            'max_defect_images': self.max_defect_images,
+            'max_lines': None,  # Evaluate every significant line
+            # Time allowed for merging line segments, a quarter of the detection interval
+            'line_time_budget': self.detection_interval * 0.25,
+            # Multi-scale mode: run detection on a downsampled ROI. Set a factor
+            # (e.g. 0.5) or a target pixel count (takes precedence); 1.0/None
+            # keeps full resolution
+            'detection_scale': 1.0,
+            'detection_target_pixels': None
+        }
+        
+        # Defect image writer settings (encoding runs off the detection thread)
+        self.image_writer_settings = {
+            'codec': 'png',
+            'png_compression': 1 if self.performance_profile == "low" else 3,
+            'jpeg_quality': 90,
+            'webp_quality': 90,
+            'max_queue_size': 32 if self.performance_profile == "high" else 16,
+            # A dropped new frame is never logged with an image path
+            'drop_policy': 'drop_newest'
+        }
+        
+        # Multi-camera settings: one capture thread per stream, detection on a
+        # worker pool shared by all streams (leaving a core for capture and GUI)
+        self.stream_settings = {
+            'max_streams': 4,
+            'detection_workers': max(1, min(4, self.cpu_count - 1))
+        }
+        
+        # Camera discovery: devices are probed concurrently and the inventory cached
+        self.camera_discovery_settings = {
+            'probe_timeout': 3.0,    # Seconds allowed to open a device and read a frame
+            'max_probe_index': 4,    # Indices probed where devices cannot be enumerated
+            'cache_ttl': 60.0,       # Inventory lifetime without hotplug detection (non-Linux)
+            'probe_workers': 4
+        }
+        
+        # Recent defects kept in memory; older ones are read back from the fault database
+        self.defect_history_settings = {
+            'capacity': 4096 if self.performance_profile == "high" else 2048
+        }
+        
+        # Shift start times (local hours) for the defect statistics
+        self.shift_settings = {
+            'shift_starts': [6, 14, 22]
+        }
+        
+        # Logging settings (records are written by a background listener thread)
+        self.logging_settings = {
+            'level': 'INFO',
+            'log_file': None,        # Also write to this file when set
+            'json_lines': False,     # One JSON object per record instead of text
+            'rate_limit': 5,         # Records per call site per period
+            'rate_period': 1.0       # Seconds
         }
         
     def get_optimised_camera_settings(self):
@@ -130,6 +183,30 @@ class HardwareConfig:
         """Get optimised video thread settings"""
         return self.video_thread_settings.copy()
         
+    def get_optimised_image_writer_settings(self):
+        """Get optimised defect image writer settings"""
+        return self.image_writer_settings.copy()
+        
+    def get_stream_settings(self):
+        """Get multi-camera stream settings"""
+        return self.stream_settings.copy()
+        
+    def get_camera_discovery_settings(self):
+        """Get camera discovery settings"""
+        return self.camera_discovery_settings.copy()
+        
+    def get_defect_history_settings(self):
+        """Get in-memory defect history settings"""
+        return self.defect_history_settings.copy()
+        
+    def get_shift_settings(self):
+        """Get shift start times"""
+        return self.shift_settings.copy()
+        
+    def get_logging_settings(self):
+        """Get logging settings"""
+        return self.logging_settings.copy()
+        
     def get_detection_interval(self):
         """Get optimised detection interval"""
         return self.detection_interval
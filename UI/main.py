@@ -1,44 +1,88 @@
 import sys
 import cv2
 import datetime
+import logging
 import os
 import json
+import math
 import time
 from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                                QHBoxLayout, QPushButton, QLabel, QComboBox,
-                               QMenuBar, QMenu, QStatusBar, QGroupBox, QDialog)
+                               QMenuBar, QMenu, QStatusBar, QGroupBox, QDialog,
+                               QGridLayout)
 from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QFont, QAction
 
 from src.core.video_thread import VideoThread
 from src.core.detection_engine import DetectionEngine
+from src.core.detection_worker import DetectionWorkerPool
+from src.core.camera_stream import CameraStream
 from src.ui.video_widget import VideoWidget
 from src.ui.dialogs import (DetectionSettingsDialog, 
                            DefectsWindow,
+                           DefectStatisticsWindow,
                            RelaySetupDialog)
 from src.utils.database_manager import DatabaseManager
 from src.utils.camera_manager import CameraManager
 from src.utils.relay_controller import RelayController
+from src.utils.reject_scheduler import RejectScheduler
+from src.utils.defect_history import DefectHistory
+from src.utils.metrics import metrics
+from src.utils.logging_setup import configure_logging, fields
 from hardware_config import hardware_config
 
+logger = logging.getLogger(__name__)
+
 class VideoApp(QMainWindow):
+    # Metrics shown in the performance panel, in pipeline order
+    METRIC_LABELS = [
+        ('capture.latency', 'Capture'),
+        ('capture.resize', 'Resize'),
+        ('detection.queue', 'Queue'),
+        ('detection.total', 'Detect'),
+        ('database.write', 'DB'),
+        ('image.save', 'Image'),
+        ('relay.command', 'Relay'),
+        ('display.paint', 'Paint'),
+        ('pipeline.capture_to_result', 'To Result'),
+        ('pipeline.capture_to_relay', 'E2E Relay'),
+        ('reject.lateness', 'Reject')
+    ]
+    
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Misaligned Boards Application")
         self.setGeometry(100, 100, 1600, 900)
         
-        self.video_thread = None
-        self.camera_index = None
-        self.defects = []
         self.defects_window = None
+        self.statistics_window = None
         
-        self.detection_engine = DetectionEngine()
         self.database_manager = DatabaseManager()
+        # Recent defects in a fixed-size ring buffer; older ones are read from the database
+        self.defect_history = DefectHistory(hardware_config.get_defect_history_settings()['capacity'],
+                                            self.database_manager)
         self.camera_manager = CameraManager()
+        self.camera_manager.inventory_updated.connect(self.on_camera_inventory_updated)
+        # Camera selection waiting for discovery to finish (callback taking the camera index)
+        self.pending_camera_selection = None
+        # Discover cameras in the background so Select Camera opens at once
+        self.camera_manager.refresh_async()
+        
+        # Camera streams shown as tiles; ROI tools and settings act on the active one
+        self.stream_settings = hardware_config.get_stream_settings()
+        self.streams = []
+        self.active_stream = None
+        self.next_stream_id = 0
+        
+        # Detection runs on worker threads shared by all streams, so Canny/Hough
+        # never stall the GUI
+        self.detection_pool = DetectionWorkerPool(self.stream_settings['detection_workers'])
+        self.detection_pool.detection_finished.connect(self.on_detection_finished)
+        self.detection_pool.error_occurred.connect(self.handle_detection_error)
+        self.detection_pool.start()
         
         # Performance and stability settings (hardware optimised)
         self.detection_enabled = False
-        self.last_detection_time = 0
         self.detection_interval = hardware_config.get_detection_interval()
         self.max_defects_per_second = hardware_config.get_max_defects_per_second()
         self.last_defect_time = 0
@@ -55,12 +99,22 @@ class VideoApp(QMainWindow):
             'port': 'COM4',
             'baudrate': 9600,
             'timeout': 1.0,
-            'trigger_duration': 0.5
+            'trigger_duration': 0.5,
+            # Reject timing: 0 belt speed or distance fires as soon as a defect is seen
+            'belt_speed': 0.0,        # mm/s
+            'ejector_distance': 0.0,  # mm from the camera's view to the ejector
+            'reject_lead_time': 0.0   # s, relay and ejector response time
         }
         self.relay_enabled = False
         
+        # Fires the relay when each defective board reaches the ejector
+        self.reject_scheduler = RejectScheduler(
+            belt_speed=self.relay_config['belt_speed'],
+            ejector_distance=self.relay_config['ejector_distance'],
+            lead_time=self.relay_config['reject_lead_time']
+        )
+        
         # Performance monitoring
-        self.frame_count = 0
         self.last_fps_time = time.time()
         self.current_fps = 0
         
@@ -115,6 +169,10 @@ class VideoApp(QMainWindow):
         self.detection_status_label = QLabel("Detection: Disabled")
         detection_layout.addWidget(self.detection_status_label)
         
+        self.defect_count_label = QLabel("Defects: 0")
+        self.defect_tooltip_total = None
+        detection_layout.addWidget(self.defect_count_label)
+        
         detection_group.setLayout(detection_layout)
         toolbar_layout.addWidget(detection_group)
         
@@ -148,15 +206,35 @@ class VideoApp(QMainWindow):
         self.detection_interval_label = QLabel(f"Detection Interval: {self.detection_interval}s")
         performance_layout.addWidget(self.detection_interval_label)
         
+        self.relay_latency_label = QLabel("Relay Latency: -")
+        performance_layout.addWidget(self.relay_latency_label)
+        
+        self.image_queue_label = QLabel("Image Queue: 0")
+        performance_layout.addWidget(self.image_queue_label)
+        
+        # Rolling p50/p95/p99 latencies of the main pipeline stages
+        self.metrics_label = QLabel("Latency (ms): -")
+        self.metrics_label.setFont(QFont("Monospace", 8))
+        self.metrics_label.setWordWrap(True)
+        performance_layout.addWidget(self.metrics_label)
+        
+        self.btn_export_metrics = QPushButton("Export Metrics")
+        self.btn_export_metrics.clicked.connect(self.export_metrics)
+        performance_layout.addWidget(self.btn_export_metrics)
+        
         performance_group.setLayout(performance_layout)
         toolbar_layout.addWidget(performance_group)
         
         toolbar_layout.addStretch()
         main_layout.addWidget(toolbar)
         
-        self.video_widget = VideoWidget()
-        self.video_widget.roi_selected_signal.connect(self.on_roi_selected)
-        main_layout.addWidget(self.video_widget)
+        # Tiled stream views
+        self.tiles_widget = QWidget()
+        self.tiles_layout = QGridLayout(self.tiles_widget)
+        self.tiles_layout.setContentsMargins(0, 0, 0, 0)
+        self.tiles_layout.setSpacing(4)
+        main_layout.addWidget(self.tiles_widget, 1)
+        self.add_stream()
         
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
@@ -165,28 +243,233 @@ class VideoApp(QMainWindow):
         # Initialize relay after UI is set up
         self.initialize_relay()
         
+    # The active stream's view, capture thread and engine, used by the ROI
+    # tools, source selection and settings dialogs
+    @property
+    def video_widget(self):
+        return self.active_stream.video_widget
+        
+    @property
+    def video_thread(self):
+        return self.active_stream.video_thread
+        
+    @property
+    def detection_engine(self):
+        return self.active_stream.detection_engine
+        
+    @property
+    def camera_index(self):
+        return self.active_stream.camera_index
+        
+    def add_stream(self):
+        """Add a stream tile with its own view, ROI and detection engine"""
+        if len(self.streams) >= self.stream_settings['max_streams']:
+            self.status_bar.showMessage(f"Maximum of {self.stream_settings['max_streams']} streams reached")
+            return None
+            
+        stream_id = self.next_stream_id
+        self.next_stream_id += 1
+        
+        video_widget = VideoWidget()
+        video_widget.roi_selected_signal.connect(self.on_roi_selected)
+        video_widget.activated.connect(self.on_stream_activated)
+        
+        detection_engine = DetectionEngine()
+        # Share one batched database writer between the app and the engines
+        detection_engine.database_manager = self.database_manager
+        if stream_id:
+            # Keep image names unique across the streams' writers
+            detection_engine.image_writer.filename_tag = f"cam{stream_id}"
+        
+        stream = CameraStream(stream_id, video_widget, detection_engine)
+        self.streams.append(stream)
+        self.detection_pool.add_stream(stream_id, detection_engine)
+        self.layout_stream_tiles()
+        self.set_active_stream(stream)
+        return stream
+        
+    def remove_active_stream(self):
+        """Stop and remove the active stream (the last stream is kept)"""
+        if len(self.streams) <= 1:
+            self.status_bar.showMessage("At least one stream is required")
+            return
+            
+        stream = self.active_stream
+        stream.stop()
+        # A worker may still be running this stream's last ROI; the engine
+        # must not be closed under it
+        if not self.detection_pool.remove_stream(stream.stream_id).wait(timeout=5.0):
+            logger.warning("⚠️ Detection of %s still running after 5s - closing its engine anyway", stream.name)
+        try:
+            stream.detection_engine.close()
+        except Exception as e:
+            logger.warning("⚠️ Error closing detection engine of %s: %s", stream.name, e)
+        self.streams.remove(stream)
+        self.tiles_layout.removeWidget(stream.video_widget)
+        stream.video_widget.deleteLater()
+        
+        self.layout_stream_tiles()
+        self.set_active_stream(self.streams[0])
+        self.status_bar.showMessage(f"Removed {stream.name}")
+        
+    def layout_stream_tiles(self):
+        """Arrange the stream views in a grid (1x1, 2x1, 2x2, ...)"""
+        columns = math.ceil(math.sqrt(len(self.streams)))
+        for index, stream in enumerate(self.streams):
+            self.tiles_layout.removeWidget(stream.video_widget)
+            # A single stream keeps the full-size view; tiles may shrink
+            if len(self.streams) == 1:
+                stream.video_widget.setMinimumSize(1280, 720)
+            else:
+                stream.video_widget.setMinimumSize(320, 180)
+            self.tiles_layout.addWidget(stream.video_widget, index // columns, index % columns)
+            
+    def set_active_stream(self, stream):
+        if stream is self.active_stream:
+            return
+        if self.active_stream is not None:
+            # An unfinished ROI drag does not carry over to the new stream
+            self.active_stream.video_widget.selecting_roi = False
+        self.active_stream = stream
+        for other in self.streams:
+            other.video_widget.set_highlighted(other is stream and len(self.streams) > 1)
+        self.btn_select_roi.setText("Select ROI")
+        self.btn_select_roi.setStyleSheet("")
+        if len(self.streams) > 1:
+            self.status_bar.showMessage(f"Active stream: {stream.name}")
+            
+    def on_stream_activated(self):
+        widget = self.sender()
+        for stream in self.streams:
+            if stream.video_widget is widget:
+                self.set_active_stream(stream)
+                break
+                
+    def stream_for_mailbox(self, mailbox):
+        for stream in self.streams:
+            if stream.video_thread is not None and stream.video_thread.frame_mailbox is mailbox:
+                return stream
+        return None
+        
+    def stream_by_id(self, stream_id):
+        for stream in self.streams:
+            if stream.stream_id == stream_id:
+                return stream
+        return None
+        
     def update_fps(self):
         current_time = time.time()
-        if current_time - self.last_fps_time > 0:
-            self.current_fps = self.frame_count / (current_time - self.last_fps_time)
-            self.fps_label.setText(f"FPS: {self.current_fps:.1f}")
-        self.frame_count = 0
+        elapsed = current_time - self.last_fps_time
+        if elapsed > 0:
+            rates = [stream.frame_count / elapsed for stream in self.streams]
+            self.current_fps = sum(rates)
+            text = "FPS: " + " / ".join(f"{rate:.1f}" for rate in rates)
+            dropped = sum(stream.dropped_frames for stream in self.streams)
+            if dropped:
+                text += f" ({dropped} dropped)"
+            self.fps_label.setText(text)
+        for stream in self.streams:
+            stream.frame_count = 0
         self.last_fps_time = current_time
         
+        self.update_relay_latency()
+        self.update_image_writer_stats()
+        self.update_latency_metrics()
+        self.update_defect_count()
+        
         # Reset defect counter for new second
         current_second = int(current_time)
         if current_second != self.current_second:
             self.defect_count_this_second = 0
             self.current_second = current_second
         
+    def update_relay_latency(self):
+        """Show the relay command-to-wire latency in the performance panel"""
+        if not self.relay_controller:
+            self.relay_latency_label.setText("Relay Latency: -")
+            return
+            
+        stats = self.relay_controller.get_actuation_stats()
+        if stats['last_latency_ms'] is None:
+            self.relay_latency_label.setText("Relay Latency: -")
+        else:
+            text = f"Relay Latency: {stats['last_latency_ms']:.1f}ms (max {stats['max_latency_ms']:.1f}ms)"
+            if stats['last_end_to_end_ms'] is not None:
+                text += f", capture→relay {stats['last_end_to_end_ms']:.0f}ms"
+            reject_stats = self.reject_scheduler.get_stats()
+            if reject_stats['pending'] or reject_stats['late']:
+                text += f", {reject_stats['pending']} rejects pending ({reject_stats['late']} late)"
+            self.relay_latency_label.setText(text)
+        
+    def update_defect_count(self):
+        """Show defects this session and in the last minute, and the last hour's on hover"""
+        total = self.defect_history.total_count
+        self.defect_count_label.setText(f"Defects: {total} "
+                                        f"({self.defect_history.count_since(60)} last min)")
+        if total == self.defect_tooltip_total:
+            return
+        self.defect_tooltip_total = total
+        
+        # Memory only: a database query would block the GUI on a flush. The ten
+        # newest defects are in the buffer unless this session has fewer
+        recent = self.defect_history.query(start=datetime.datetime.now() - datetime.timedelta(hours=1),
+                                           limit=10, memory_only=True)
+        lines = [f"{defect['timestamp']}  {defect['angle']:.1f}°"
+                 + (f"  Stream {defect['stream_id'] + 1}" if defect['stream_id'] is not None else "")
+                 for defect in recent]
+        self.defect_count_label.setToolTip("Last hour:\n" + "\n".join(lines) if lines else "No defects in the last hour")
+        
+    def update_image_writer_stats(self):
+        """Show defect image queue depth and encode time in the performance panel"""
+        all_stats = [stream.detection_engine.image_writer.get_stats() for stream in self.streams]
+        encode_times = [stats['avg_encode_ms'] for stats in all_stats if stats['avg_encode_ms'] is not None]
+        dropped = sum(stats['dropped'] for stats in all_stats)
+        text = f"Image Queue: {sum(stats['queue_depth'] for stats in all_stats)}"
+        if encode_times:
+            text += f" ({sum(encode_times) / len(encode_times):.0f}ms enc)"
+        if dropped:
+            text += f", {dropped} dropped"
+        self.image_queue_label.setText(text)
+        
+    def update_latency_metrics(self):
+        """Show rolling p50/p95/p99 stage latencies in the performance panel"""
+        summaries = metrics.summary()
+        lines = ["Latency p50/p95/p99 ms"]
+        for name, label in self.METRIC_LABELS:
+            stats = summaries.get(name)
+            if stats and stats['count']:
+                lines.append(f"{label:<8}{stats['p50']:5.1f}/{stats['p95']:5.1f}/{stats['p99']:5.1f}")
+        self.metrics_label.setText("\n".join(lines) if len(lines) > 1 else "Latency (ms): -")
+        
+        # Every recorded metric (including individual detection stages) on hover
+        self.metrics_label.setToolTip("\n".join(
+            f"{name}: p50 {stats['p50']:.2f}, p95 {stats['p95']:.2f}, p99 {stats['p99']:.2f} ms ({stats['count']})"
+            for name, stats in summaries.items() if stats['count']))
+        
+    def export_metrics(self):
+        from PySide6.QtWidgets import QFileDialog
+        default_name = f"metrics_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", default_name,
+                                                   "JSON Files (*.json);;CSV Files (*.csv)")
+        if file_path:
+            try:
+                metrics.export(file_path)
+                self.status_bar.showMessage(f"Metrics exported to {file_path}")
+            except Exception as e:
+                self.status_bar.showMessage(f"Error exporting metrics: {str(e)}")
+        
     def toggle_detection(self):
         if self.detection_enabled:
             self.detection_enabled = False
+            self.detection_pool.clear()
+            for stream in self.streams:
+                stream.pending_detection_overlay = None
             self.btn_toggle_detection.setText("Start Detection")
             self.detection_status_label.setText("Detection: Disabled")
             self.status_bar.showMessage("Detection stopped")
         else:
-            if self.video_widget.roi_selected:
+            # Detection runs on every stream that has an ROI
+            if any(stream.video_widget.roi_selected for stream in self.streams):
                 self.detection_enabled = True
                 self.btn_toggle_detection.setText("Stop Detection")
                 self.detection_status_label.setText("Detection: Enabled")
@@ -207,6 +490,18 @@ class VideoApp(QMainWindow):
         select_camera_action.triggered.connect(self.select_camera)
         file_menu.addAction(select_camera_action)
         
+        add_camera_action = QAction("Add Camera Stream", self)
+        add_camera_action.triggered.connect(self.add_camera_stream)
+        file_menu.addAction(add_camera_action)
+        
+        add_video_action = QAction("Add Video Stream", self)
+        add_video_action.triggered.connect(self.add_video_stream)
+        file_menu.addAction(add_video_action)
+        
+        remove_stream_action = QAction("Remove Active Stream", self)
+        remove_stream_action.triggered.connect(self.remove_active_stream)
+        file_menu.addAction(remove_stream_action)
+        
         upload_image_action = QAction("Upload Image", self)
         upload_image_action.triggered.connect(self.upload_image)
         file_menu.addAction(upload_image_action)
@@ -231,6 +526,10 @@ class VideoApp(QMainWindow):
         view_defects_action.triggered.connect(self.open_defects_window)
         view_menu.addAction(view_defects_action)
         
+        view_statistics_action = QAction("Defect Statistics", self)
+        view_statistics_action.triggered.connect(self.open_statistics_window)
+        view_menu.addAction(view_statistics_action)
+        
         relay_menu = menubar.addMenu("Relay")
         
         setup_relay_action = QAction("Setup Relay", self)
@@ -243,80 +542,154 @@ class VideoApp(QMainWindow):
         from PySide6.QtWidgets import QFileDialog, QMessageBox
         file_path, _ = QFileDialog.getOpenFileName(self, "Select Video File", "", "Video Files (*.mp4 *.avi *.mov)")
         if file_path:
-            try:
-                if self.video_thread is not None:
-                    self.video_thread.stop()
-                    self.video_thread.wait()
-                
-                self.video_thread = VideoThread()
-                self.video_thread.set_video_file(file_path)
-                self.video_thread.frame_ready.connect(self.process_frame)
-                self.video_thread.error_occurred.connect(self.handle_camera_error)
-                self.video_thread.start()
-                
-                self.status_bar.showMessage(f"Playing video: {file_path}")
-                
-            except Exception as e:
-                QMessageBox.critical(self, "Video Error", f"Error opening video: {str(e)}")
-                
+            self.start_video(file_path)
+            
+    def start_video(self, file_path, stream=None):
+        """Play a video file on the given stream (default: the active stream)"""
+        stream = stream or self.active_stream
+        try:
+            video_thread = VideoThread()
+            video_thread.set_video_file(file_path)
+            video_thread.frame_mailbox.item_available.connect(self.on_frame_available)
+            video_thread.error_occurred.connect(self.handle_camera_error)
+            stream.set_source(video_thread, video_file=file_path)
+            
+            self.status_bar.showMessage(f"Playing video: {file_path}")
+            
+        except Exception as e:
+            from PySide6.QtWidgets import QMessageBox
+            QMessageBox.critical(self, "Video Error", f"Error opening video: {str(e)}")
+            
+    def in_use_cameras(self):
+        return [stream.camera_index for stream in self.streams if stream.camera_index is not None]
+        
     def select_camera(self):
-        camera_index = self.camera_manager.select_camera_dialog(self)
+        self.choose_camera(self.start_camera)
+            
+    def add_camera_stream(self):
+        """Open a camera in a new stream tile"""
+        self.choose_camera(self.start_camera_in_new_stream)
+        
+    def start_camera_in_new_stream(self, camera_index):
+        stream = self.add_stream()
+        if stream is not None:
+            self.start_camera(camera_index, stream)
+            
+    def choose_camera(self, on_selected):
+        """Ask for a camera and pass its index to on_selected
+        
+        Discovery never runs on the GUI thread: if the inventory is not ready
+        the dialog opens once the background refresh finishes.
+        """
+        inventory = self.camera_manager.get_inventory()
+        if inventory is None:
+            self.pending_camera_selection = on_selected
+            self.status_bar.showMessage("Searching for cameras...")
+            return
+        camera_index = self.camera_manager.select_camera_dialog(self, inventory, self.in_use_cameras())
         if camera_index is not None:
-            self.start_camera(camera_index)
+            on_selected(camera_index)
             
-    def start_camera(self, camera_index):
-        try:
-            if self.video_thread is not None:
-                self.video_thread.stop()
-                self.video_thread.wait()
+    def on_camera_inventory_updated(self, inventory):
+        on_selected, self.pending_camera_selection = self.pending_camera_selection, None
+        if on_selected is None:
+            return
+        self.status_bar.clearMessage()
+        camera_index = self.camera_manager.select_camera_dialog(self, inventory, self.in_use_cameras())
+        if camera_index is not None:
+            on_selected(camera_index)
                 
-            self.video_thread = VideoThread(camera_index)
-            self.video_thread.frame_ready.connect(self.process_frame)
-            self.video_thread.error_occurred.connect(self.handle_camera_error)
-            self.video_thread.start()
+    def add_video_stream(self):
+        """Play a video file in a new stream tile"""
+        from PySide6.QtWidgets import QFileDialog
+        file_path, _ = QFileDialog.getOpenFileName(self, "Select Video File", "", "Video Files (*.mp4 *.avi *.mov)")
+        if file_path:
+            stream = self.add_stream()
+            if stream is not None:
+                self.start_video(file_path, stream)
+            
+    def start_camera(self, camera_index, stream=None):
+        """Capture from a camera on the given stream (default: the active stream)"""
+        stream = stream or self.active_stream
+        try:
+            # A camera can only be opened by one capture thread
+            for other in self.streams:
+                if other is not stream and other.camera_index == camera_index:
+                    self.status_bar.showMessage(f"Camera {camera_index} is already used by another stream")
+                    return
+                    
+            video_thread = VideoThread(camera_index)
+            video_thread.frame_mailbox.item_available.connect(self.on_frame_available)
+            video_thread.error_occurred.connect(self.handle_camera_error)
+            stream.set_source(video_thread, camera_index=camera_index)
             
-            self.camera_index = camera_index
             self.status_bar.showMessage(f"Connected to Camera {camera_index}")
             
         except Exception as e:
             from PySide6.QtWidgets import QMessageBox
             QMessageBox.critical(self, "Camera Error", f"Error starting camera: {str(e)}")
             
-    def process_frame(self, frame):
-        self.frame_count += 1
-        
-        # Create a copy of the frame for processing
-        frame_copy = frame.copy()
-        
-        # Only run detection if enabled, ROI is selected, and enough time has passed
-        if (self.detection_enabled and 
-            self.video_widget.roi_selected and 
-            self.video_widget.roi_start and 
-            self.video_widget.roi_end):
+    def on_frame_available(self):
+        """Take the newest frame from the capture mailbox (older ones were dropped)"""
+        mailbox = self.sender()
+        stream = self.stream_for_mailbox(mailbox)
+        frame_handle = mailbox.take() if mailbox is not None else None
+        if frame_handle is not None:
+            if stream is None:
+                # Capture thread of a stream that was just replaced or removed
+                frame_handle.release()
+                return
+            self.process_frame(stream, frame_handle)
             
-            current_time = time.time()
-            if current_time - self.last_detection_time >= self.detection_interval:
-                try:
-                    self.run_detection(frame_copy)
-                    self.last_detection_time = current_time
-                except Exception as e:
-                    print(f"Detection error: {str(e)}")
-                    self.status_bar.showMessage(f"Detection error: {str(e)}")
-        
-        # Add visual indicator if detection is enabled
-        if self.detection_enabled and self.video_widget.roi_selected:
-            self.draw_detection_indicator(frame_copy)
+    def process_frame(self, stream, frame_handle):
+        """Handle a pooled frame from a stream's video thread"""
+        try:
+            stream.frame_count += 1
+            frame = frame_handle.frame
+            video_widget = stream.video_widget
             
-        # Display the processed frame (with lines if detection was run)
-        frame_rgb = cv2.cvtColor(frame_copy, cv2.COLOR_BGR2RGB)
-        self.video_widget.set_frame(frame_rgb)
-        
-    def run_detection(self, frame):
-        """Run detection on the ROI with proper error handling"""
+            # Only run detection if enabled, ROI is selected, and enough time has passed
+            if (self.detection_enabled and 
+                video_widget.roi_selected and 
+                video_widget.roi_start and 
+                video_widget.roi_end):
+                
+                current_time = time.time()
+                if current_time - stream.last_detection_time >= self.detection_interval:
+                    try:
+                        self.run_detection(stream, frame, frame_handle.frame_info())
+                        stream.last_detection_time = current_time
+                    except Exception as e:
+                        logger.error("Detection error: %s", e)
+                        self.status_bar.showMessage(f"Detection error: {str(e)}")
+            
+            # Convert straight into the widget's reusable RGB display buffer
+            convert_start = time.perf_counter()
+            frame_rgb = video_widget.get_display_buffer(frame.shape)
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=frame_rgb)
+            
+            # Overlay the most recent detection result once it is available
+            if stream.pending_detection_overlay is not None:
+                self.apply_detection_overlay(stream, frame_rgb)
+            
+            # Add visual indicator if detection is enabled
+            if self.detection_enabled and video_widget.roi_selected:
+                self.draw_detection_indicator(frame_rgb)
+            metrics.record('display.convert', (time.perf_counter() - convert_start) * 1000)
+                
+            # Display the processed frame (with lines if detection was run)
+            video_widget.set_frame(frame_rgb, live=True)
+        finally:
+            # Return the buffer to the capture pool
+            frame_handle.release()
+        
+    def run_detection(self, stream, frame, frame_info=None):
+        """Queue the stream's ROI for detection on the worker pool"""
         try:
             # Convert widget coordinates to frame coordinates
-            frame_start = self.video_widget.widget_to_frame_coordinates(self.video_widget.roi_start)
-            frame_end = self.video_widget.widget_to_frame_coordinates(self.video_widget.roi_end)
+            video_widget = stream.video_widget
+            frame_start = video_widget.widget_to_frame_coordinates(video_widget.roi_start)
+            frame_end = video_widget.widget_to_frame_coordinates(video_widget.roi_end)
             
             if frame_start is None or frame_end is None:
                 return
@@ -328,31 +701,69 @@ class VideoApp(QMainWindow):
             if abs(x2 - x1) < 10 or abs(y2 - y1) < 10:
                 return
             
-            # Extract ROI
-            roi = frame[min(y1, y2):max(y1, y2), min(x1, x2):max(x1, x2)]
+            bounds = (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+            
+            # Extract ROI (copied, since the worker draws on it)
+            roi = frame[bounds[1]:bounds[3], bounds[0]:bounds[2]].copy()
             
             if roi.size == 0:
                 return
                 
-            # Run detection
-            processed_roi, defects = self.detection_engine.detect_and_draw_lines_with_angles(roi)
+            # Hand the ROI to the detection pool (latest frame per stream wins)
+            self.detection_pool.submit(stream.stream_id, roi, bounds, frame_info)
+            
+        except Exception as e:
+            logger.error("ROI detection error: %s", e)
+            
+    def on_detection_finished(self, result):
+        """Handle a detection result posted back from the worker thread"""
+        # Ignore results that arrive after detection was stopped
+        if not self.detection_enabled:
+            return
             
-            # Update the frame with processed ROI
-            frame[min(y1, y2):max(y1, y2), min(x1, x2):max(x1, x2)] = processed_roi
+        stream = self.stream_by_id(result['stream_id'])
+        if stream is None:
+            # The stream was removed while its ROI was being processed
+            return
+            
+        try:
+            frame_info = result.get('frame_info')
+            if frame_info and frame_info['capture_time'] is not None:
+                metrics.record('pipeline.capture_to_result',
+                               (time.perf_counter() - frame_info['capture_time']) * 1000)
+            
+            defects = result['defects']
+            stream.pending_detection_overlay = (result['bounds'], result['processed_roi'])
             
             # Show status message about detection
+            source = f"{stream.name}: " if len(self.streams) > 1 else ""
             if len(defects) > 0:
-                self.status_bar.showMessage(f"Detected {len(defects)} defects in ROI")
+                self.status_bar.showMessage(f"{source}Detected {len(defects)} defects in ROI")
             else:
-                self.status_bar.showMessage("No defects detected in ROI")
+                self.status_bar.showMessage(f"{source}No defects detected in ROI")
             
             # Process defects with rate limiting
-            self.process_defects(defects)
+            self.process_defects(defects, stream.stream_id, result['bounds'])
+            
+        except Exception as e:
+            logger.error("Error handling detection result: %s", e)
+            
+    def apply_detection_overlay(self, stream, frame_rgb):
+        """Draw the stream's latest processed (BGR) ROI onto the RGB frame being displayed"""
+        try:
+            (x1, y1, x2, y2), processed_roi = stream.pending_detection_overlay
+            stream.pending_detection_overlay = None
             
+            # The frame size may have changed since the ROI was queued
+            if y2 <= frame_rgb.shape[0] and x2 <= frame_rgb.shape[1] and processed_roi.shape[:2] == (y2 - y1, x2 - x1):
+                frame_rgb[y1:y2, x1:x2] = processed_roi[..., ::-1]
         except Exception as e:
-            print(f"ROI detection error: {str(e)}")
+            logger.error("Error applying detection overlay: %s", e)
             
-    def process_defects(self, defects):
+    def handle_detection_error(self, error_message):
+        self.status_bar.showMessage(error_message)
+        
+    def process_defects(self, defects, stream_id=None, roi=None):
         """Process defects with rate limiting to prevent overwhelming the system"""
         current_time = time.time()
         
@@ -373,39 +784,50 @@ class VideoApp(QMainWindow):
                     fault_type="Board Alignment",
                     image_index=1,
                     details=defect['details'],
-                    measurement=defect['angle']
+                    measurement=defect['angle'],
+                    timestamp=defect['captured_at'],
+                    frame_sequence=defect['frame_sequence'],
+                    image_path=defect['image_path'],
+                    camera_id=stream_id,
+                    roi=roi,
+                    deviation=defect['deviation']
                 )
                 
-                self.defects.append((defect['timestamp'], defect['angle'], defect['image_path']))
+                self.defect_history.append(defect, stream_id)
                 
-                # Update defects window if open
-                if self.defects_window is not None:
-                    self.defects_window.update_defects(self.defects)
+                # Append to the defects window if open (one row, no rebuild)
+                if self.defects_window is not None and self.defects_window.isVisible():
+                    self.defects_window.add_defect(defect)
                 
                 # Trigger relay if enabled
                 if self.relay_enabled and self.relay_controller:
-                    # Check connection health before triggering
-                    if self.relay_controller.maintain_connection():
+                    # Only fall back to the (blocking) reconnect path if the port was lost
+                    if self.relay_controller.is_connected() or self.relay_controller.maintain_connection():
                         try:
-                            success = self.relay_controller.trigger(duration=self.relay_config['trigger_duration'])
+                            # Fired by the scheduler when the board reaches the ejector
+                            success = self.reject_scheduler.schedule(capture_time=defect['capture_time'],
+                                                                     duration=self.relay_config['trigger_duration'])
                             if success:
-                                self.status_bar.showMessage(f"✅ Relay triggered for defect: {defect['angle']:.1f}°")
-                                print(f"✅ Relay triggered successfully for defect: {defect['angle']:.1f}°")
+                                self.status_bar.showMessage(f"✅ Reject scheduled for defect: {defect['angle']:.1f}°")
+                                logger.info("✅ Reject scheduled for defect: %.1f°", defect['angle'],
+                                            extra=fields(angle=round(defect['angle'], 2), port=self.relay_config['port']))
                             else:
                                 self.status_bar.showMessage(f"❌ Relay trigger failed for defect: {defect['angle']:.1f}°")
-                                print(f"❌ Relay trigger failed for defect: {defect['angle']:.1f}°")
+                                logger.error("❌ Relay trigger failed for defect: %.1f°", defect['angle'],
+                                             extra=fields(angle=round(defect['angle'], 2), port=self.relay_config['port']))
                         except Exception as e:
                             error_msg = f"Relay trigger error: {str(e)}"
                             self.status_bar.showMessage(f"❌ {error_msg}")
-                            print(f"❌ {error_msg}")
+                            logger.error("❌ %s", error_msg)
                     else:
-                        print(f"⚠️ Relay connection unhealthy - attempting to reconnect...")
+                        logger.warning("⚠️ Relay connection unhealthy - attempting to reconnect...")
                         self.status_bar.showMessage(f"⚠️ Relay connection lost, attempting to reconnect...")
                 else:
-                    print(f"⚠️ Relay not available - enabled: {self.relay_enabled}, controller: {self.relay_controller is not None}")
+                    logger.debug("Relay not available - enabled: %s, controller: %s",
+                                 self.relay_enabled, self.relay_controller is not None)
                         
             except Exception as e:
-                print(f"❌ Error processing defect: {str(e)}")
+                logger.error("❌ Error processing defect: %s", e)
                 
     def initialize_relay(self):
         """Initialize relay connection on startup"""
@@ -415,18 +837,19 @@ class VideoApp(QMainWindow):
                 baudrate=self.relay_config['baudrate'],
                 timeout=self.relay_config['timeout']
             )
+            self.reject_scheduler.relay_controller = self.relay_controller
             
             if self.relay_controller.connect():
                 self.relay_enabled = True
                 self.status_bar.showMessage(f"✅ Relay connected on {self.relay_config['port']}")
-                print(f"✅ Relay connected successfully on {self.relay_config['port']}")
+                logger.info("✅ Relay connected successfully on %s", self.relay_config['port'])
                 if hasattr(self, 'relay_status_label'):
                     self.relay_status_label.setText("Relay: Connected")
                 self._last_relay_status = 'connected'
             else:
                 self.relay_enabled = False
                 self.status_bar.showMessage(f"⚠️ Relay not connected - use Relay Setup to configure")
-                print(f"⚠️ Relay not connected - use Relay Setup to configure")
+                logger.warning("⚠️ Relay not connected - use Relay Setup to configure")
                 if hasattr(self, 'relay_status_label'):
                     self.relay_status_label.setText("Relay: Not Connected")
                 self._last_relay_status = 'disconnected'
@@ -435,16 +858,18 @@ class VideoApp(QMainWindow):
             self.relay_enabled = False
             error_msg = f"Relay initialization error: {str(e)}"
             self.status_bar.showMessage(f"⚠️ Relay not available - use Relay Setup to configure")
-            print(f"⚠️ {error_msg}")
+            logger.warning("⚠️ %s", error_msg)
             if hasattr(self, 'relay_status_label'):
                 self.relay_status_label.setText("Relay: Error")
             self._last_relay_status = 'error'
     
     def handle_camera_error(self, error_message):
         self.status_bar.showMessage(error_message)
+        # The camera may have been unplugged - rediscover on the next selection
+        self.camera_manager.invalidate()
         
     def draw_detection_indicator(self, frame):
-        """Draw a visual indicator that detection is active"""
+        """Draw a visual indicator that detection is active (frame is RGB)"""
         try:
             # Draw a small indicator in the top-left corner
             cv2.rectangle(frame, (10, 10), (30, 30), (0, 255, 0), -1)  # Green square
@@ -455,10 +880,10 @@ class VideoApp(QMainWindow):
                 cv2.rectangle(frame, (10, 40), (30, 60), (0, 255, 0), -1)  # Green square
                 cv2.putText(frame, "REL", (35, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
             else:
-                cv2.rectangle(frame, (10, 40), (30, 60), (0, 0, 255), -1)  # Red square
-                cv2.putText(frame, "REL", (35, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 1)
+                cv2.rectangle(frame, (10, 40), (30, 60), (255, 0, 0), -1)  # Red square
+                cv2.putText(frame, "REL", (35, 55), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 1)
         except Exception as e:
-            print(f"Error drawing detection indicator: {str(e)}")
+            logger.error("Error drawing detection indicator: %s", e)
     
     def test_relay_connection(self):
         """Test the relay connection"""
@@ -469,20 +894,20 @@ class VideoApp(QMainWindow):
                     success = self.relay_controller.test_relay(cycles=1, on_duration=0.1, off_duration=0.1)
                     if success:
                         self.status_bar.showMessage("✅ Relay test successful")
-                        print("✅ Relay test completed successfully")
+                        logger.info("✅ Relay test completed successfully")
                     else:
                         self.status_bar.showMessage("❌ Relay test failed")
-                        print("❌ Relay test failed")
+                        logger.error("❌ Relay test failed")
                 except Exception as e:
                     error_msg = f"Relay test error: {str(e)}"
                     self.status_bar.showMessage(f"❌ {error_msg}")
-                    print(f"❌ {error_msg}")
+                    logger.error("❌ %s", error_msg)
             else:
                 self.status_bar.showMessage("❌ Relay connection unhealthy")
-                print("❌ Relay connection unhealthy for testing")
+                logger.error("❌ Relay connection unhealthy for testing")
         else:
             self.status_bar.showMessage("❌ Relay controller not available")
-            print("❌ Relay controller not available for testing")
+            logger.error("❌ Relay controller not available for testing")
     
     def find_available_ports(self):
         """Find available COM ports"""
@@ -491,15 +916,15 @@ class VideoApp(QMainWindow):
             ports = list(serial.tools.list_ports.comports())
             if ports:
                 port_list = [port.device for port in ports]
-                print(f"Available COM ports: {port_list}")
+                logger.info("Available COM ports: %s", port_list)
                 self.status_bar.showMessage(f"Available ports: {', '.join(port_list)}")
                 return port_list
             else:
-                print("No COM ports found")
+                logger.info("No COM ports found")
                 self.status_bar.showMessage("No COM ports found")
                 return []
         except Exception as e:
-            print(f"Error finding ports: {str(e)}")
+            logger.error("Error finding ports: %s", e)
             self.status_bar.showMessage("Error finding COM ports")
             return []
     
@@ -507,25 +932,25 @@ class VideoApp(QMainWindow):
         """Force release the current relay port"""
         try:
             if self.relay_controller:
-                print(f"🔄 Force releasing {self.relay_config['port']}...")
+                logger.info("🔄 Force releasing %s...", self.relay_config['port'])
                 self.relay_controller.disconnect()
                 time.sleep(0.5)  # Give extra time for port release
-                print(f"✅ Force released {self.relay_config['port']}")
+                logger.info("✅ Force released %s", self.relay_config['port'])
                 self.status_bar.showMessage(f"✅ Force released {self.relay_config['port']}")
             else:
-                print(f"🔄 Force releasing {self.relay_config['port']} (no controller)...")
+                logger.info("🔄 Force releasing %s (no controller)...", self.relay_config['port'])
                 try:
                     import serial
                     temp_serial = serial.Serial(self.relay_config['port'], timeout=0.1)
                     temp_serial.close()
                     time.sleep(0.2)
-                    print(f"✅ Force released {self.relay_config['port']}")
+                    logger.info("✅ Force released %s", self.relay_config['port'])
                     self.status_bar.showMessage(f"✅ Force released {self.relay_config['port']}")
                 except:
-                    print(f"⚠️ Could not force release {self.relay_config['port']}")
+                    logger.warning("⚠️ Could not force release %s", self.relay_config['port'])
                     self.status_bar.showMessage(f"⚠️ Could not force release {self.relay_config['port']}")
         except Exception as e:
-            print(f"❌ Error force releasing port: {str(e)}")
+            logger.error("❌ Error force releasing port: %s", e)
             self.status_bar.showMessage(f"❌ Error force releasing port")
     
     def maintain_relay_connection(self):
@@ -552,7 +977,7 @@ class VideoApp(QMainWindow):
                         self._last_relay_status = 'disconnected'
                     
             except Exception as e:
-                print(f"⚠️ Error maintaining relay connection: {str(e)}")
+                logger.warning("⚠️ Error maintaining relay connection: %s", e)
         
     def enable_roi_selection(self):
         self.video_widget.selecting_roi = True
@@ -560,6 +985,8 @@ class VideoApp(QMainWindow):
         self.video_widget.roi_end = None
         self.video_widget.roi_selected = False
         self.detection_enabled = False  # Stop detection during ROI selection
+        self.detection_pool.clear()
+        self.active_stream.pending_detection_overlay = None
         self.btn_toggle_detection.setText("Start Detection")
         self.detection_status_label.setText("Detection: Disabled")
         self.status_bar.showMessage("Click and drag to select ROI")
@@ -569,6 +996,8 @@ class VideoApp(QMainWindow):
     def clear_roi_selection(self):
         self.video_widget.clear_roi()
         self.detection_enabled = False
+        self.detection_pool.clear()
+        self.active_stream.pending_detection_overlay = None
         self.btn_toggle_detection.setText("Start Detection")
         self.detection_status_label.setText("Detection: Disabled")
         self.status_bar.showMessage("ROI cleared")
@@ -624,15 +1053,23 @@ class VideoApp(QMainWindow):
         dialog.baudrate_combo.setCurrentText(str(self.relay_config['baudrate']))
         dialog.timeout_spin.setValue(self.relay_config['timeout'])
         dialog.trigger_duration_spin.setValue(self.relay_config['trigger_duration'])
+        dialog.belt_speed_spin.setValue(self.relay_config['belt_speed'])
+        dialog.ejector_distance_spin.setValue(self.relay_config['ejector_distance'])
+        dialog.lead_time_spin.setValue(self.relay_config['reject_lead_time'] * 1000)
         
         if dialog.exec() == QDialog.DialogCode.Accepted:
             # Update configuration
             config = dialog.get_config()
             self.relay_config.update(config)
+            self.reject_scheduler.configure(self.relay_config['belt_speed'],
+                                            self.relay_config['ejector_distance'],
+                                            self.relay_config['reject_lead_time'])
             
             # Reinitialize relay controller with new settings
             try:
                 if self.relay_controller:
+                    # Rejects still in flight were timed for the old relay
+                    self.reject_scheduler.clear()
                     self.relay_controller.disconnect()
                 
                 self.relay_controller = RelayController(
@@ -640,18 +1077,19 @@ class VideoApp(QMainWindow):
                     baudrate=self.relay_config['baudrate'],
                     timeout=self.relay_config['timeout']
                 )
+                self.reject_scheduler.relay_controller = self.relay_controller
                 
                 if self.relay_controller.connect():
                     self.relay_enabled = True
                     self.status_bar.showMessage(f"✅ Relay connected on {self.relay_config['port']}")
-                    print(f"✅ Relay reconnected successfully on {self.relay_config['port']}")
+                    logger.info("✅ Relay reconnected successfully on %s", self.relay_config['port'])
                     if hasattr(self, 'relay_status_label'):
                         self.relay_status_label.setText("Relay: Connected")
                     self._last_relay_status = 'connected'
                 else:
                     self.relay_enabled = False
                     self.status_bar.showMessage(f"❌ Failed to connect to relay on {self.relay_config['port']}")
-                    print(f"❌ Failed to reconnect to relay on {self.relay_config['port']}")
+                    logger.error("❌ Failed to reconnect to relay on %s", self.relay_config['port'])
                     if hasattr(self, 'relay_status_label'):
                         self.relay_status_label.setText("Relay: Failed")
                     self._last_relay_status = 'disconnected'
@@ -660,35 +1098,79 @@ class VideoApp(QMainWindow):
                 self.relay_enabled = False
                 error_msg = f"Relay setup error: {str(e)}"
                 self.status_bar.showMessage(f"❌ {error_msg}")
-                print(f"❌ {error_msg}")
+                logger.error("❌ %s", error_msg)
         
 
             
     def open_defects_window(self):
-        if self.defects_window is None or not self.defects_window.isVisible():
-            self.defects_window = DefectsWindow(self)
-            self.defects_window.update_defects(self.defects)
+        if self.defects_window is None:
+            # History is paged from the fault database, new defects are appended live
+            self.defects_window = DefectsWindow(self.database_manager, self)
+            # The window deletes itself when closed
+            self.defects_window.finished.connect(self.on_defects_window_closed)
         self.defects_window.show()
         self.defects_window.raise_()
         
+    def open_statistics_window(self):
+        if self.statistics_window is None:
+            # Hourly and shift figures come from the database's rollup table
+            self.statistics_window = DefectStatisticsWindow(
+                self.database_manager, hardware_config.get_shift_settings()['shift_starts'], self)
+            self.statistics_window.finished.connect(self.on_statistics_window_closed)
+        self.statistics_window.show()
+        self.statistics_window.raise_()
+        
+    def on_defects_window_closed(self):
+        self.defects_window = None
+        
+    def on_statistics_window_closed(self):
+        self.statistics_window = None
+        
     def closeEvent(self, event):
-        print("🔄 Application shutting down - cleaning up resources...")
+        logger.info("🔄 Application shutting down - cleaning up resources...")
+        
+        # No more status updates - they read from the streams and the database
+        self.fps_timer.stop()
+        
+        # Stop video threads
+        logger.info("🔄 Stopping video threads...")
+        for stream in self.streams:
+            stream.stop()
+        logger.info("✅ Video threads stopped")
+        
+        # Stop detection workers
+        logger.info("🔄 Stopping detection workers...")
+        self.detection_pool.stop()
+        logger.info("✅ Detection workers stopped")
+        
+        # Write out any defect images still queued
+        logger.info("🔄 Saving queued defect images...")
+        try:
+            for stream in self.streams:
+                stream.detection_engine.close()
+            logger.info("✅ Defect images saved")
+        except Exception as e:
+            logger.warning("⚠️ Error saving defect images: %s", e)
+        
+        # Flush batched fault records and close the database
+        logger.info("🔄 Flushing fault database...")
+        try:
+            self.database_manager.close()
+            logger.info("✅ Fault database closed")
+        except Exception as e:
+            logger.warning("⚠️ Error closing fault database: %s", e)
         
-        # Stop video thread
-        if self.video_thread is not None:
-            print("🔄 Stopping video thread...")
-            self.video_thread.stop()
-            self.video_thread.wait()
-            print("✅ Video thread stopped")
+        # Pending rejects are for boards that will not be ejected after shutdown
+        self.reject_scheduler.stop()
         
         # Disconnect relay properly
         if self.relay_controller:
-            print("🔄 Disconnecting relay...")
+            logger.info("🔄 Disconnecting relay...")
             try:
                 self.relay_controller.disconnect()
-                print("✅ Relay disconnected")
+                logger.info("✅ Relay disconnected")
             except Exception as e:
-                print(f"⚠️ Error disconnecting relay: {str(e)}")
+                logger.warning("⚠️ Error disconnecting relay: %s", e)
         
         # Force cleanup of any remaining serial connections
         try:
@@ -697,21 +1179,28 @@ class VideoApp(QMainWindow):
             ports = list(serial.tools.list_ports.comports())
             for port in ports:
                 if port.device == self.relay_config['port']:
-                    print(f"🔄 Force closing {port.device}...")
+                    logger.info("🔄 Force closing %s...", port.device)
                     try:
                         # Try to force close any remaining connection
                         temp_serial = serial.Serial(port.device)
                         temp_serial.close()
-                        print(f"✅ Force closed {port.device}")
+                        logger.info("✅ Force closed %s", port.device)
                     except:
                         pass
         except Exception as e:
-            print(f"⚠️ Error during port cleanup: {str(e)}")
+            logger.warning("⚠️ Error during port cleanup: %s", e)
             
-        print("✅ Application shutdown complete")
+        logger.info("✅ Application shutdown complete")
         event.accept()
 
 def main():
+    configure_logging()
+    
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        # Headless batch inspection - no QApplication needed
+        from src.core.batch_inspector import run_batch
+        sys.exit(run_batch(sys.argv[2:]))
+        
     app = QApplication(sys.argv)
     app.setStyle('Fusion')
     
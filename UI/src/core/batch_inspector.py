@@ -0,0 +1,267 @@
+"""
+Headless batch inspection of recorded video files and image folders.
+
+Drives DetectionEngine over every frame as fast as decoding allows (no
+display, no frame-rate throttle) and writes one result record per frame
+as JSON Lines or CSV.
+
+Usage:
+    board-detection batch SOURCE [SOURCE ...] --output results.jsonl
+        [--roi X1,Y1,X2,Y2] [--format jsonl|csv] [--save-images DIR]
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+
+import cv2
+
+from src.core.detection_engine import DetectionEngine
+from src.utils.logging_setup import configure_logging
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+
+def list_sources(paths):
+    """Expand directories into sorted image files; other paths are treated as videos"""
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            images = sorted(f for f in os.listdir(path) if f.lower().endswith(IMAGE_EXTENSIONS))
+            sources.extend(('image', os.path.join(path, f)) for f in images)
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            sources.append(('image', path))
+        else:
+            sources.append(('video', path))
+    return sources
+
+def iter_frames(sources, stride=1):
+    """Yield frame records ({'source', 'frame_index', 'position_ms', 'frame'}) from sources"""
+    for kind, path in sources:
+        if kind == 'image':
+            frame = cv2.imread(path)
+            if frame is None:
+                print(f"Warning: could not read image {path}", file=sys.stderr)
+                continue
+            yield {'source': path, 'frame_index': 0, 'position_ms': None, 'frame': frame}
+            continue
+
+        yield from iter_video_frames(path, stride=stride)
+
+def iter_video_frames(path, start=0, stop=None, stride=1):
+    """Yield frame records for video frames start <= index < stop that fall on the stride"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"Warning: could not open video {path}", file=sys.stderr)
+        return
+    try:
+        if start:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        frame_index = start
+        while stop is None or frame_index < stop:
+            # grab() skips decoding for frames excluded by the stride
+            if frame_index % stride:
+                if not cap.grab():
+                    break
+                frame_index += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield {
+                'source': path,
+                'frame_index': frame_index,
+                'position_ms': cap.get(cv2.CAP_PROP_POS_MSEC),
+                'frame': frame
+            }
+            frame_index += 1
+    finally:
+        cap.release()
+
+def parse_roi(text):
+    """Parse 'X1,Y1,X2,Y2' into a normalised (x1, y1, x2, y2) tuple"""
+    try:
+        x1, y1, x2, y2 = (int(v) for v in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ROI must be four integers: X1,Y1,X2,Y2")
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+class ResultWriter:
+    """Writes per-frame result records as JSON Lines or CSV"""
+    CSV_FIELDS = ['source', 'frame_index', 'position_ms', 'defect_count',
+                  'angles', 'max_deviation', 'image_path', 'processing_ms']
+
+    def __init__(self, path, output_format):
+        self.output_format = output_format
+        self.file = open(path, 'w', newline='')
+        self.csv_writer = None
+        if output_format == 'csv':
+            self.csv_writer = csv.DictWriter(self.file, fieldnames=self.CSV_FIELDS)
+            self.csv_writer.writeheader()
+
+    def write(self, record):
+        if self.csv_writer:
+            row = dict(record)
+            row['angles'] = ';'.join(f"{a:.2f}" for a in record['angles'])
+            self.csv_writer.writerow(row)
+        else:
+            self.file.write(json.dumps(record) + '\n')
+
+    def close(self):
+        self.file.close()
+
+class BatchInspector:
+    """Runs a DetectionEngine over frames with a fixed ROI"""
+
+    def __init__(self, detection_engine, roi=None):
+        self.detection_engine = detection_engine
+        self.roi = roi
+
+    def inspect_frame(self, record):
+        """Run detection on one frame record and return its result record"""
+        frame = record['frame']
+        roi = frame
+        if self.roi is not None:
+            x1, y1, x2, y2 = self.roi
+            roi = frame[y1:y2, x1:x2]
+            if roi.size == 0:
+                raise ValueError(f"ROI {self.roi} is outside the {frame.shape[1]}x{frame.shape[0]} frame")
+            # The engine draws on (and may save) the ROI, so give it its own copy
+            roi = roi.copy()
+
+        start_time = time.perf_counter()
+        _, defects = self.detection_engine.detect_and_draw_lines_with_angles(roi)
+        processing_ms = (time.perf_counter() - start_time) * 1000
+
+        angles = [float(d['angle']) for d in defects]
+        standard = self.detection_engine.standard_angle
+        return {
+            'source': record['source'],
+            'frame_index': record['frame_index'],
+            'position_ms': record['position_ms'],
+            'defect_count': len(defects),
+            'angles': angles,
+            'max_deviation': max((abs(a - standard) for a in angles), default=None),
+            'image_path': defects[0]['image_path'] if defects else None,
+            'processing_ms': round(processing_ms, 3)
+        }
+
+    def run(self, frames, writer):
+        """Inspect every frame, writing results; returns (frames, defect frames)"""
+        frame_count = 0
+        defect_frames = 0
+        for record in frames:
+            result = self.inspect_frame(record)
+            writer.write(result)
+            frame_count += 1
+            if result['defect_count']:
+                defect_frames += 1
+        return frame_count, defect_frames
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="board-detection batch",
+        description="Inspect recorded video files or image folders without the GUI")
+    parser.add_argument('sources', nargs='+', help="Video files, image files or image directories")
+    parser.add_argument('-o', '--output', required=True, help="Result file (.jsonl or .csv)")
+    parser.add_argument('--format', choices=['jsonl', 'csv'],
+                        help="Result format (default: from the output extension, else jsonl)")
+    parser.add_argument('--roi', type=parse_roi, help="Fixed ROI in frame pixels: X1,Y1,X2,Y2 (default: whole frame)")
+    parser.add_argument('--stride', type=int, default=1, help="Inspect every Nth video frame")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Detection processes (0: one per CPU core, default: 1)")
+    parser.add_argument('--shard', choices=['frames', 'ranges'], default='frames',
+                        help="With several workers: send decoded frames through shared memory, "
+                             "or let each worker decode its own range of video frames")
+    parser.add_argument('--save-images', metavar='DIR', help="Save annotated defect images to DIR")
+    parser.add_argument('--max-images', type=int, metavar='N',
+                        help="With --save-images: keep only the newest N images (default: keep all)")
+    parser.add_argument('--scale', type=float, help="Detection scale factor (see multi-scale detection)")
+    parser.add_argument('--standard-angle', type=float)
+    parser.add_argument('--tolerance', type=float)
+    parser.add_argument('--min-defect-angle', type=float)
+    parser.add_argument('--max-defect-angle', type=float)
+    parser.add_argument('-v', '--verbose', action='store_true', help="Log per-frame detection details")
+    return parser
+
+def engine_settings(args):
+    """Collect the detection overrides given on the command line"""
+    return {
+        'standard_angle': args.standard_angle,
+        'tolerance': args.tolerance,
+        'min_defect_angle': args.min_defect_angle,
+        'max_defect_angle': args.max_defect_angle,
+        'detection_scale': args.scale,
+        'save_images': args.save_images,
+        'max_images': args.max_images,
+        'log_level': logging.DEBUG if args.verbose else logging.WARNING
+    }
+
+def create_engine(settings):
+    """Create a quiet DetectionEngine with the given overrides applied"""
+    engine = DetectionEngine()
+    engine.save_defect_images = bool(settings['save_images'])
+    if settings['save_images']:
+        engine.image_writer.output_dir = settings['save_images']
+        # Offline runs must not lose images when encoding falls behind
+        engine.image_writer.drop_policy = 'block'
+        # Nor prune images the result file points to, unless asked to
+        engine.image_writer.max_images = settings.get('max_images')
+    if settings['detection_scale'] is not None:
+        engine.detection_scale = settings['detection_scale']
+
+    angles = [getattr(engine, key) if settings[key] is None else settings[key]
+              for key in ('standard_angle', 'tolerance', 'min_defect_angle', 'max_defect_angle')]
+    engine.set_detection_settings(*angles)
+    return engine
+
+def output_format_for(args):
+    if args.format:
+        return args.format
+    return 'csv' if args.output.lower().endswith('.csv') else 'jsonl'
+
+def run_batch(argv=None):
+    """Entry point for `board-detection batch`; returns a process exit code"""
+    args = build_parser().parse_args(argv)
+    if args.stride < 1:
+        print("Error: --stride must be at least 1", file=sys.stderr)
+        return 2
+    if args.workers < 0:
+        print("Error: --workers must not be negative", file=sys.stderr)
+        return 2
+
+    settings = engine_settings(args)
+    configure_logging(level=settings['log_level'])
+
+    sources = list_sources(args.sources)
+    if not sources:
+        print("Error: no video files or images found", file=sys.stderr)
+        return 2
+
+    writer = ResultWriter(args.output, output_format_for(args))
+    start_time = time.perf_counter()
+    try:
+        if args.workers == 1:
+            engine = create_engine(settings)
+            try:
+                inspector = BatchInspector(engine, args.roi)
+                frame_count, defect_frames = inspector.run(iter_frames(sources, args.stride), writer)
+            finally:
+                engine.close()
+        else:
+            from src.core.parallel_inspector import ParallelInspector
+            inspector = ParallelInspector(settings, args.roi, args.workers or None, args.shard)
+            frame_count, defect_frames = inspector.run(sources, args.stride, writer)
+    except ValueError as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 2
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - start_time
+    rate = frame_count / elapsed if elapsed > 0 else 0.0
+    print(f"Inspected {frame_count} frames from {len(sources)} sources in {elapsed:.1f}s "
+          f"({rate:.1f} FPS), {defect_frames} frames with defects", file=sys.stderr)
+    return 0
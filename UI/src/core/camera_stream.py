@@ -0,0 +1,55 @@
+import os
+
+class CameraStream:
+    """One camera of a station: capture thread, tile view, ROI and detection engine.
+
+    Streams run independently (own VideoThread, VideoWidget with its ROI and
+    DetectionEngine with its settings) and share the detection worker pool,
+    fault database and relay of the application.
+    """
+
+    def __init__(self, stream_id, video_widget, detection_engine):
+        self.stream_id = stream_id
+        self.video_widget = video_widget
+        self.detection_engine = detection_engine
+        self.video_thread = None
+        self.camera_index = None
+        self.video_file = None
+
+        # Per-stream detection pacing and the latest result waiting to be drawn
+        self.last_detection_time = 0
+        self.pending_detection_overlay = None
+
+        # Frames displayed since the last FPS update
+        self.frame_count = 0
+
+    @property
+    def name(self):
+        if self.camera_index is not None:
+            return f"Camera {self.camera_index}"
+        if self.video_file:
+            return os.path.basename(self.video_file)
+        return f"Stream {self.stream_id + 1}"
+
+    def set_source(self, video_thread, camera_index=None, video_file=None):
+        """Replace the capture thread (stopping the old one) and start the new one"""
+        self.stop()
+        self.video_thread = video_thread
+        self.camera_index = camera_index
+        self.video_file = video_file
+        self.pending_detection_overlay = None
+        video_thread.start()
+
+    def stop(self):
+        """Stop the capture thread, if any"""
+        if self.video_thread is not None:
+            self.video_thread.stop()
+            self.video_thread.wait()
+            self.video_thread = None
+
+    @property
+    def dropped_frames(self):
+        """Frames replaced in the mailbox before display, plus pool exhaustion"""
+        if self.video_thread is None:
+            return 0
+        return self.video_thread.frame_mailbox.dropped_count + self.video_thread.dropped_frames
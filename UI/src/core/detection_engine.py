@@ -1,10 +1,27 @@
 import cv2
 import numpy as np
 import datetime
+import logging
 import os
-import sqlite3
 import time
 
+from src.core.line_selection import merge_collinear_segments, clip_segments, rank_segments
+from src.utils.image_writer import DefectImageWriter
+
+logger = logging.getLogger(__name__)
+
+# Per-line classification result returned by DetectionEngine.classify_lines
+LINE_DTYPE = np.dtype([
+    ('x1', np.int32),
+    ('y1', np.int32),
+    ('x2', np.int32),
+    ('y2', np.int32),
+    ('angle', np.float64),
+    ('deviation', np.float64),
+    ('in_bounds', np.bool_),
+    ('is_defect', np.bool_)
+])
+
 class DetectionEngine:
     def __init__(self):
         self.standard_angle = 90
@@ -24,6 +41,11 @@ class DetectionEngine:
             self.canny_high = 100      # More sensitive - detect more edges
             self.hough_threshold = 50  # More sensitive - detect more lines
             self.max_defect_images = detection_settings['max_defect_images']
+            self.max_lines = detection_settings.get('max_lines')
+            self.line_time_budget = detection_settings.get('line_time_budget', 0.05)
+            self.detection_scale = detection_settings.get('detection_scale', 1.0)
+            self.detection_target_pixels = detection_settings.get('detection_target_pixels')
+            image_writer_settings = hardware_config.get_optimised_image_writer_settings()
         except ImportError:
             # Fallback settings if hardware config not available - using more sensitive settings
             self.min_line_length = 20
@@ -32,9 +54,25 @@ class DetectionEngine:
             self.canny_high = 100
             self.hough_threshold = 50
             self.max_defect_images = 100
+            self.max_lines = None
+            self.line_time_budget = 0.05
+            self.detection_scale = 1.0
+            self.detection_target_pixels = None
+            image_writer_settings = {}
             
-        # Memory management
-        self.defect_image_count = 0
+        # Line selection: collinear Hough segments are merged before evaluation
+        self.merge_angle_tolerance = 2.0     # degrees
+        self.merge_distance_tolerance = 5.0  # pixels from the merged line
+            
+        # Defect images are encoded and saved on a background thread
+        self.save_defect_images = True
+        self.image_writer = DefectImageWriter(max_images=self.max_defect_images, **image_writer_settings)
+        
+        # Shared fault log (created on first use if not supplied)
+        self.database_manager = None
+        
+        # Seconds spent in each pipeline stage during the last detection
+        self.last_stage_timings = {}
         
     def set_detection_settings(self, standard_angle, tolerance, min_defect_angle, max_defect_angle):
         self.standard_angle = standard_angle
@@ -42,82 +80,213 @@ class DetectionEngine:
         self.min_defect_angle = min_defect_angle
         self.max_defect_angle = max_defect_angle
         
-    def detect_and_draw_lines_with_angles(self, frame):
-        """Detect lines and calculate angles with improved error handling"""
+    def detect_and_draw_lines_with_angles(self, frame, frame_info=None):
+        """Detect lines and calculate angles with improved error handling
+        
+        Lines are drawn onto frame in place, and if defects are found the
+        frame itself is queued for saving, so the caller must hand over a
+        frame it will not modify or reuse afterwards.
+        
+        frame_info (FrameHandle.frame_info()) dates defects by capture time
+        and tags each defect with the frame sequence; without it defects use
+        the current time.
+        """
         try:
             if frame is None or frame.size == 0:
                 return frame, []
                 
-            # Ensure frame is in correct format
-            if len(frame.shape) == 3:
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = frame.copy()
-                
-            # Apply Gaussian blur to reduce noise
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            
-            # Edge detection with optimised parameters
-            edges = cv2.Canny(blurred, self.canny_low, self.canny_high)
-            
-            # Line detection with hardware-friendly parameters
-            lines = cv2.HoughLinesP(
-                edges, 
-                1, 
-                np.pi/180, 
-                threshold=self.hough_threshold, 
-                minLineLength=self.min_line_length, 
-                maxLineGap=self.max_line_gap
-            )
-            
-            # Debug: Print detection parameters
-            print(f"Detection parameters: min_length={self.min_line_length}, max_gap={self.max_line_gap}, threshold={self.hough_threshold}")
-            print(f"Canny parameters: low={self.canny_low}, high={self.canny_high}")
+            self.last_stage_timings = {}
+            lines = self.detect_lines(frame)
+            
+            # Per-call details are debug level (and rate limited when logged)
+            logger.debug("Detection parameters: min_length=%s, max_gap=%s, threshold=%s, canny=%s/%s",
+                         self.min_line_length, self.max_line_gap, self.hough_threshold,
+                         self.canny_low, self.canny_high)
 
             defects = []
             if lines is not None and len(lines) > 0:
-                # Limit the number of lines processed to prevent performance issues
-                max_lines = min(len(lines), 20)
-                lines = lines[:max_lines]
+                # Merge broken segments and rank the result by significance
+                start = time.perf_counter()
+                selected = self.select_lines(lines, frame.shape)
+                start = self._record_stage('selection', start)
+                
+                logger.debug("Detected %d segments, %d lines after merging in ROI", len(lines), len(selected))
                 
-                print(f"Detected {len(lines)} lines in ROI")
+                # Classify every line in one vectorised pass
+                classified = self.classify_lines(selected, frame.shape)
+                valid = classified[classified['in_bounds']]
+                defect_lines = valid[valid['is_defect']]
+                start = self._record_stage('classification', start)
                 
-                for line in lines:
-                    try:
-                        x1, y1, x2, y2 = line[0]
-                        
-                        # Validate line coordinates
-                        if (x1 < 0 or y1 < 0 or x2 < 0 or y2 < 0 or
-                            x1 >= frame.shape[1] or y1 >= frame.shape[0] or
-                            x2 >= frame.shape[1] or y2 >= frame.shape[0]):
-                            continue
-                            
-                        # Calculate angle
-                        angle = self.calculate_line_angle(x1, y1, x2, y2)
-                        
-                        # Check if angle is within defect range
-                        if self.is_defect_angle(angle):
-                            # Draw defect lines in red
-                            cv2.line(frame, (x1, y1), (x2, y2), (0, 0, 255), 3)
-                            defect_info = self.create_defect_info(angle, frame)
-                            if defect_info:
-                                defects.append(defect_info)
-                        else:
-                            # Draw normal lines in green
-                            cv2.line(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                                
-                    except Exception as e:
-                        print(f"Error processing line: {str(e)}")
-                        continue
+                # Draw normal lines in green, then defect lines in red
+                self.draw_lines(frame, valid[~valid['is_defect']], (0, 255, 0), 2)
+                self.draw_lines(frame, defect_lines, (0, 0, 255), 3)
+                start = self._record_stage('drawing', start)
+                
+                # All defects in this pass share one annotated image
+                image_path = None
+                for angle in defect_lines['angle']:
+                    defect_info = self.create_defect_info(float(angle), frame, image_path, frame_info)
+                    if defect_info:
+                        image_path = defect_info['image_path']
+                        defects.append(defect_info)
+                self._record_stage('defect_save', start)
             else:
-                print("No lines detected in ROI")
+                logger.debug("No lines detected in ROI")
 
             return frame, defects
             
         except Exception as e:
-            print(f"Detection error: {str(e)}")
+            logger.error("Detection error: %s", e)
             return frame, []
             
+    def detect_lines(self, frame):
+        """Run the edge and Hough stages and return raw line segments
+        
+        Returns:
+            HoughLinesP segments in full-resolution frame coordinates, or None
+        """
+        # Ensure frame is in correct format
+        start = time.perf_counter()
+        if len(frame.shape) == 3:
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        else:
+            gray = frame
+        start = self._record_stage('grayscale', start)
+            
+        # Optionally detect on a downsampled ROI (multi-scale mode)
+        scale = self.get_detection_scale(gray.shape)
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            start = self._record_stage('resize', start)
+            
+        # Apply Gaussian blur to reduce noise
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        start = self._record_stage('blur', start)
+        
+        # Edge detection with optimised parameters
+        edges = cv2.Canny(blurred, self.canny_low, self.canny_high)
+        start = self._record_stage('canny', start)
+        
+        # Line detection with hardware-friendly parameters (pixel based
+        # parameters follow the detection scale)
+        lines = cv2.HoughLinesP(
+            edges, 
+            1, 
+            np.pi/180, 
+            threshold=max(1, int(round(self.hough_threshold * scale))), 
+            minLineLength=max(1, self.min_line_length * scale), 
+            maxLineGap=max(1, self.max_line_gap * scale)
+        )
+        
+        # Map line coordinates back to full ROI resolution
+        if lines is not None and scale < 1.0:
+            lines = self.rescale_lines(lines, scale, frame.shape)
+        self._record_stage('hough', start)
+        
+        return lines
+        
+    def _record_stage(self, stage, start):
+        """Store the time since start for a pipeline stage and return the current time"""
+        now = time.perf_counter()
+        self.last_stage_timings[stage] = now - start
+        return now
+            
+    def get_detection_scale(self, shape):
+        """Scale factor (<= 1) at which to run detection for an image of this shape
+        
+        detection_target_pixels, when set, takes precedence over the fixed
+        detection_scale factor.
+        """
+        if self.detection_target_pixels:
+            pixels = shape[0] * shape[1]
+            if pixels <= self.detection_target_pixels:
+                return 1.0
+            return float(np.sqrt(self.detection_target_pixels / pixels))
+        if self.detection_scale and 0 < self.detection_scale < 1.0:
+            return float(self.detection_scale)
+        return 1.0
+        
+    def rescale_lines(self, lines, scale, frame_shape):
+        """Convert line coordinates found at a reduced scale to full resolution"""
+        height, width = frame_shape[:2]
+        rescaled = np.rint(np.asarray(lines, dtype=np.float64).reshape(-1, 4) / scale).astype(np.int32)
+        np.clip(rescaled[:, 0::2], 0, width - 1, out=rescaled[:, 0::2])
+        np.clip(rescaled[:, 1::2], 0, height - 1, out=rescaled[:, 1::2])
+        return rescaled
+        
+    def select_lines(self, lines, frame_shape):
+        """Merge collinear Hough segments and return them ranked by significance
+        
+        Merged endpoints are clipped to the frame, so a line along the ROI
+        border is not dropped by the bounds check in classify_lines. Merging
+        stops early once line_time_budget is spent (remaining segments are
+        kept unmerged), and max_lines optionally caps the result.
+        """
+        merged, support, support_length = merge_collinear_segments(
+            lines,
+            angle_tolerance=self.merge_angle_tolerance,
+            distance_tolerance=self.merge_distance_tolerance,
+            max_gap=self.max_line_gap,
+            time_budget=self.line_time_budget
+        )
+        height, width = frame_shape[:2]
+        merged = clip_segments(merged, width, height)
+        selected, _, _ = rank_segments(
+            merged, support, support_length,
+            min_length=self.min_line_length,
+            max_lines=self.max_lines
+        )
+        return selected
+        
+    def classify_lines(self, lines, frame_shape):
+        """Classify a batch of HoughLinesP segments with NumPy array operations
+        
+        Args:
+            lines: HoughLinesP output, shape (N, 1, 4) or (N, 4)
+            frame_shape: shape of the image the lines were detected in
+        Returns:
+            Structured array of LINE_DTYPE, one record per line
+        """
+        segments = np.asarray(lines, dtype=np.int32).reshape(-1, 4)
+        x1, y1, x2, y2 = segments.T
+        height, width = frame_shape[:2]
+        
+        # Bounds check for all four coordinates at once
+        in_bounds = ((segments >= 0).all(axis=1) &
+                     (x1 < width) & (x2 < width) &
+                     (y1 < height) & (y2 < height))
+        
+        # Angle in degrees, normalised to 0-90 (same as calculate_line_angle)
+        angles = np.abs(np.degrees(np.arctan2(y2 - y1, x2 - x1)))
+        angles = np.where(angles > 90, 180 - angles, angles)
+        
+        # Same rule as is_defect_angle
+        deviations = np.abs(angles - self.standard_angle)
+        is_defect = (in_bounds &
+                     (deviations > self.tolerance) &
+                     (angles >= self.min_defect_angle) &
+                     (angles <= self.max_defect_angle))
+        
+        classified = np.empty(len(segments), dtype=LINE_DTYPE)
+        classified['x1'] = x1
+        classified['y1'] = y1
+        classified['x2'] = x2
+        classified['y2'] = y2
+        classified['angle'] = angles
+        classified['deviation'] = deviations
+        classified['in_bounds'] = in_bounds
+        classified['is_defect'] = is_defect
+        return classified
+        
+    def draw_lines(self, frame, classified, color, thickness):
+        """Draw classified line segments with a single polylines call"""
+        if len(classified) == 0:
+            return
+        points = np.stack([classified['x1'], classified['y1'],
+                           classified['x2'], classified['y2']], axis=1).reshape(-1, 2, 2)
+        cv2.polylines(frame, points, False, color, thickness)
+        
     def calculate_line_angle(self, x1, y1, x2, y2):
         """Calculate the angle of a line with proper error handling"""
         try:
@@ -131,7 +300,7 @@ class DetectionEngine:
             return angle
             
         except Exception as e:
-            print(f"Angle calculation error: {str(e)}")
+            logger.error("Angle calculation error: %s", e)
             return 0
             
     def is_defect_angle(self, angle):
@@ -145,97 +314,68 @@ class DetectionEngine:
                    self.min_defect_angle <= angle <= self.max_defect_angle)
                    
         except Exception as e:
-            print(f"Defect angle check error: {str(e)}")
+            logger.error("Defect angle check error: %s", e)
             return False
             
-    def create_defect_info(self, angle, frame):
-        """Create defect information with memory management"""
+    def create_defect_info(self, angle, frame, image_path=None, frame_info=None):
+        """Create defect information, saving the frame unless image_path is given"""
         try:
-            timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            
-            # Only save image if we haven't exceeded the limit
-            image_path = None
-            if self.defect_image_count < self.max_defect_images:
-                image_path = self.save_defect_frame(frame.copy(), timestamp)
-                self.defect_image_count += 1
+            # Date the defect by when the frame was captured, not when it was analysed
+            if frame_info and frame_info.get('capture_wall_time'):
+                captured_at = datetime.datetime.fromtimestamp(frame_info['capture_wall_time'])
             else:
-                # Clean up old images if we've reached the limit
-                self.cleanup_old_defect_images()
-                image_path = self.save_defect_frame(frame.copy(), timestamp)
-                self.defect_image_count = 1
+                captured_at = datetime.datetime.now()
+            timestamp = captured_at.strftime("%Y-%m-%d %H:%M:%S")
+            
+            # Queue the image for the writer thread (old images are pruned there).
+            # Drawing is finished by now, so the frame is saved without a copy
+            if image_path is None and self.save_defect_images:
+                image_path = self.save_defect_frame(frame, timestamp)
                 
             defect_info = {
                 'timestamp': timestamp,
                 'angle': angle,
+                'deviation': abs(angle - self.standard_angle),
                 'image_path': image_path,
-                'details': f"Board angle {angle:.1f}° deviates from standard {self.standard_angle}° by {abs(angle - self.standard_angle):.1f}°"
+                'details': f"Board angle {angle:.1f}° deviates from standard {self.standard_angle}° by {abs(angle - self.standard_angle):.1f}°",
+                'captured_at': captured_at,
+                'frame_sequence': frame_info.get('sequence') if frame_info else None,
+                'capture_time': frame_info.get('capture_time') if frame_info else None
             }
             
             return defect_info
             
         except Exception as e:
-            print(f"Error creating defect info: {str(e)}")
+            logger.error("Error creating defect info: %s", e)
             return None
         
     def save_defect_frame(self, frame, timestamp):
-        """Save defect frame with error handling"""
+        """Queue a defect frame for saving; returns the path it will be written to, or None if dropped"""
         try:
-            if not os.path.exists("defect_images"):
-                os.makedirs("defect_images")
-
-            filename = f"defect_images/defect_{timestamp.replace(':', '-')}.png"
-            
-            # Ensure frame is in BGR format for saving
-            if len(frame.shape) == 3 and frame.shape[2] == 3:
-                # Already in BGR format
-                cv2.imwrite(filename, frame)
-            else:
-                # Convert to BGR if needed
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
-                cv2.imwrite(filename, frame_bgr)
-                
-            return filename
+            filename = self.image_writer.next_filename(timestamp)
+            if self.image_writer.submit(frame, filename):
+                return filename
+            return None
             
         except Exception as e:
-            print(f"Error saving defect frame: {str(e)}")
+            logger.error("Error saving defect frame: %s", e)
             return None
             
     def cleanup_old_defect_images(self):
         """Clean up old defect images to prevent disk space issues"""
-        try:
-            defect_dir = "defect_images"
-            if not os.path.exists(defect_dir):
-                return
-                
-            # Get all defect image files
-            files = [f for f in os.listdir(defect_dir) if f.startswith("defect_") and f.endswith(".png")]
-            
-            if len(files) > self.max_defect_images:
-                # Sort by modification time (oldest first)
-                files.sort(key=lambda x: os.path.getmtime(os.path.join(defect_dir, x)))
-                
-                # Remove oldest files
-                files_to_remove = files[:-self.max_defect_images]
-                for file in files_to_remove:
-                    try:
-                        os.remove(os.path.join(defect_dir, file))
-                    except Exception as e:
-                        print(f"Error removing old defect image {file}: {str(e)}")
-                        
-        except Exception as e:
-            print(f"Error cleaning up defect images: {str(e)}")
+        self.image_writer.max_images = self.max_defect_images
+        self.image_writer.cleanup_old_images()
+        
+    def close(self):
+        """Write out any queued defect images and stop background threads"""
+        self.image_writer.stop()
         
     def log_fault_to_database(self, fault_type, image_index, details, measurement=None):
         """Log fault to database with error handling"""
         try:
-            conn = sqlite3.connect('faults.db')
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO faults (timestamp, fault_type, image_index, details, measurement)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
-                  fault_type, image_index, details, measurement))
-            conn.commit()
-            conn.close()
+            if self.database_manager is None:
+                from src.utils.database_manager import DatabaseManager
+                self.database_manager = DatabaseManager()
+            self.database_manager.log_fault(fault_type, image_index, details, measurement)
         except Exception as e:
-            print(f"Database logging error: {str(e)}") 
\ No newline at end of file
+            logger.error("Database logging error: %s", e)
\ No newline at end of file
@@ -0,0 +1,184 @@
+import logging
+import threading
+import time
+from PySide6.QtCore import QObject, Signal
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def run_detection_job(detection_engine, job):
+    """Run one queued ROI through the engine, record its metrics and build the result"""
+    start_time = time.perf_counter()
+    processed_roi, defects = detection_engine.detect_and_draw_lines_with_angles(
+        job['roi'], job['frame_info'])
+    processing_time = time.perf_counter() - start_time
+
+    metrics.record_seconds('detection.queue', start_time - job['submitted_at'])
+    metrics.record_seconds('detection.total', processing_time)
+    for stage, seconds in detection_engine.last_stage_timings.items():
+        metrics.record_seconds(f'detection.{stage}', seconds)
+    if job['frame_info'] and job['frame_info']['capture_time'] is not None:
+        metrics.record_seconds('pipeline.capture_to_detection',
+                               start_time - job['frame_info']['capture_time'])
+
+    return {
+        'stream_id': job.get('stream_id'),
+        'bounds': job['bounds'],
+        'frame_info': job['frame_info'],
+        'processed_roi': processed_roi,
+        'defects': defects,
+        'processing_time': processing_time,
+        'queue_time': start_time - job['submitted_at']
+    }
+
+class DetectionWorkerPool(QObject):
+    """Detection threads shared by several camera streams.
+
+    Each stream has a single latest-value job slot (a newer ROI replaces one
+    not yet started), so no stream ever queues more than one ROI. An idle
+    worker serves the least recently served stream with a pending job,
+    skipping streams another worker is busy with: a stream's DetectionEngine
+    is only ever used by one thread at a time, while load spreads across the
+    pool and a fast camera cannot starve a slow one.
+    """
+    detection_finished = Signal(object)
+    error_occurred = Signal(str)
+
+    def __init__(self, worker_count=1):
+        super().__init__()
+        self.worker_count = max(1, worker_count)
+        self._condition = threading.Condition()
+        self._engines = {}
+        self._pending = {}
+        self._busy = set()
+        self._last_served = {}
+        self._removed = {}              # stream_id -> Event set when its running job ends
+        self._threads = []
+        self._running = False
+
+        # Statistics
+        self.submitted_jobs = 0
+        self.dropped_jobs = 0
+        self.processed_jobs = 0
+
+    def add_stream(self, stream_id, detection_engine):
+        with self._condition:
+            self._engines[stream_id] = detection_engine
+
+    def remove_stream(self, stream_id):
+        """Forget a stream; a job of it already running still completes
+
+        Returns:
+            threading.Event set once no job of the stream is running, after
+            which its detection engine can safely be closed
+        """
+        idle = threading.Event()
+        with self._condition:
+            self._engines.pop(stream_id, None)
+            self._pending.pop(stream_id, None)
+            self._last_served.pop(stream_id, None)
+            if stream_id in self._busy:
+                self._removed[stream_id] = idle
+            else:
+                idle.set()
+        return idle
+
+    def submit(self, stream_id, roi, bounds, frame_info=None):
+        """Queue an ROI crop of a stream, replacing that stream's job not yet started.
+
+        Returns:
+            True if an older pending job of the stream was dropped, False otherwise
+        """
+        job = {
+            'stream_id': stream_id,
+            'roi': roi,
+            'bounds': bounds,
+            'frame_info': frame_info,
+            'submitted_at': time.perf_counter()
+        }
+        with self._condition:
+            if stream_id not in self._engines:
+                return False
+            dropped = stream_id in self._pending
+            self._pending[stream_id] = job
+            self.submitted_jobs += 1
+            if dropped:
+                self.dropped_jobs += 1
+            self._condition.notify()
+        return dropped
+
+    def clear(self, stream_id=None):
+        """Discard pending jobs of one stream, or of all streams"""
+        with self._condition:
+            if stream_id is None:
+                self._pending.clear()
+            else:
+                self._pending.pop(stream_id, None)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [threading.Thread(target=self._run, name=f"DetectionWorker-{index}", daemon=True)
+                         for index in range(self.worker_count)]
+        for thread in self._threads:
+            thread.start()
+
+    def _next_job_locked(self):
+        ready = [job for stream_id, job in self._pending.items() if stream_id not in self._busy]
+        if not ready:
+            return None
+        job = min(ready, key=lambda job: self._last_served.get(job['stream_id'], 0.0))
+        del self._pending[job['stream_id']]
+        self._busy.add(job['stream_id'])
+        self._last_served[job['stream_id']] = time.perf_counter()
+        return job
+
+    def _run(self):
+        while True:
+            with self._condition:
+                job = self._next_job_locked()
+                while job is None and self._running:
+                    self._condition.wait()
+                    job = self._next_job_locked()
+                if job is None:
+                    return
+                engine = self._engines.get(job['stream_id'])
+
+            try:
+                if engine is not None:
+                    self.detection_finished.emit(run_detection_job(engine, job))
+            except Exception as e:
+                logger.error("Detection worker error: %s", e)
+                self.error_occurred.emit(f"Detection error: {str(e)}")
+            finally:
+                with self._condition:
+                    self._busy.discard(job['stream_id'])
+                    removed = self._removed.pop(job['stream_id'], None)
+                    if removed is not None:
+                        removed.set()
+                    self.processed_jobs += 1
+                    # The stream may have a job waiting that this one held back
+                    self._condition.notify()
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'workers': self.worker_count,
+                'busy': len(self._busy),
+                'pending': len(self._pending),
+                'submitted': self.submitted_jobs,
+                'dropped': self.dropped_jobs,
+                'processed': self.processed_jobs
+            }
+
+    def stop(self):
+        """Stop the worker threads, discarding pending jobs"""
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5.0)
+        self._threads = []
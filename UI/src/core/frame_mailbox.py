@@ -0,0 +1,120 @@
+import threading
+import time
+from PySide6.QtCore import QObject, Signal
+
+from src.utils.metrics import metrics
+
+class FrameMailbox(QObject):
+    """Single-slot, latest-value channel between a producer and a consumer.
+
+    put() replaces whatever the consumer has not taken yet, so at most one
+    item is ever waiting and end-to-end latency stays bounded however slow
+    the consumer is. A replaced item is counted as dropped and released
+    (items with a release() method, such as FrameHandle, go back to their
+    pool).
+
+    Consumers either block in wait() on their own thread, or connect to
+    item_available and call take() on the Qt thread. item_available is
+    coalesced: it is emitted only when the mailbox goes from empty to
+    full, so at most one notification sits in the Qt event queue.
+    """
+    item_available = Signal()
+
+    def __init__(self, metric=None):
+        super().__init__()
+        # Metric name for the time items wait in the mailbox (None: not recorded)
+        self.metric = metric
+        self._condition = threading.Condition()
+        self._item = None
+        self._put_time = None
+        self._closed = False
+
+        # Statistics
+        self.put_count = 0
+        self.taken_count = 0
+        self.dropped_count = 0
+
+    def put(self, item):
+        """Deliver item, replacing any item not yet taken
+
+        Returns:
+            True if an older item was dropped, False otherwise
+        """
+        with self._condition:
+            if self._closed:
+                dropped_item, notify = item, False
+            else:
+                dropped_item = self._item
+                notify = dropped_item is None
+                self._item = item
+                self._put_time = time.perf_counter()
+                self.put_count += 1
+                self._condition.notify()
+            if dropped_item is not None:
+                self.dropped_count += 1
+
+        if dropped_item is not None:
+            self._release(dropped_item)
+        if notify:
+            self.item_available.emit()
+        return dropped_item is not None
+
+    def take(self):
+        """Remove and return the waiting item, or None if there is none"""
+        with self._condition:
+            return self._take_locked()
+
+    def wait(self, timeout=None):
+        """Block until an item arrives (or the mailbox is closed) and take it"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self._closed, timeout)
+            return self._take_locked()
+
+    def _take_locked(self):
+        item = self._item
+        if item is not None:
+            self._item = None
+            self.taken_count += 1
+            if self.metric:
+                metrics.record(self.metric, (time.perf_counter() - self._put_time) * 1000)
+        return item
+
+    def has_item(self):
+        with self._condition:
+            return self._item is not None
+
+    def clear(self):
+        """Discard the waiting item without counting it as dropped"""
+        with self._condition:
+            item = self._item
+            self._item = None
+        if item is not None:
+            self._release(item)
+
+    def close(self):
+        """Discard the waiting item, refuse new ones and wake any waiter"""
+        with self._condition:
+            self._closed = True
+            item = self._item
+            self._item = None
+            self._condition.notify_all()
+        if item is not None:
+            self._release(item)
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _release(self, item):
+        release = getattr(item, 'release', None)
+        if release is not None:
+            release()
+
+    def get_stats(self):
+        with self._condition:
+            return {
+                'put': self.put_count,
+                'taken': self.taken_count,
+                'dropped': self.dropped_count,
+                'pending': self._item is not None
+            }
@@ -0,0 +1,111 @@
+import threading
+import numpy as np
+
+class FrameHandle:
+    """Reference-counted frame backed by a pooled buffer.
+
+    The capture thread creates a handle holding one reference. Every
+    consumer that keeps the frame beyond the signal slot calls retain(),
+    and every holder calls release() when done; the buffer goes back to
+    the pool when the last reference is released. The frame must not be
+    used after release().
+
+    The capture thread also stamps the handle with the frame's sequence
+    number and capture times (see frame_info()).
+    """
+
+    def __init__(self, pool, buffer):
+        self._pool = pool
+        self._lock = threading.Lock()
+        self._refs = 1
+        self.frame = buffer
+
+        # Capture metadata
+        self.sequence = None       # Grabbed-frame number since capture started
+        self.capture_time = None   # time.perf_counter() when the frame was grabbed
+        self.capture_wall_time = None  # time.time() at the same moment
+        self.position_ms = None    # CAP_PROP_POS_MSEC (stream/camera timestamp), if reported
+
+    def frame_info(self):
+        """Capture metadata as a plain dict that can outlive the handle"""
+        return {
+            'sequence': self.sequence,
+            'capture_time': self.capture_time,
+            'capture_wall_time': self.capture_wall_time,
+            'position_ms': self.position_ms
+        }
+
+    def retain(self):
+        with self._lock:
+            if self._refs <= 0:
+                raise RuntimeError("Frame handle used after release")
+            self._refs += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            if self._refs <= 0:
+                return
+            self._refs -= 1
+            released = self._refs == 0
+        if released:
+            self._pool._recycle(self.frame)
+
+    @property
+    def released(self):
+        with self._lock:
+            return self._refs <= 0
+
+class FramePool:
+    """Fixed ring of preallocated frame buffers reused by the capture thread.
+
+    acquire() hands out a free buffer wrapped in a FrameHandle, or None when
+    every buffer is still referenced (the caller should drop the frame
+    rather than allocate). Changing the requested shape reallocates the pool
+    lazily; buffers of the old shape are discarded as they come back.
+    """
+
+    def __init__(self, capacity=4):
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._shape = None
+        self._dtype = None
+        self._free = []
+        self._allocated = 0
+
+        # Statistics
+        self.allocations = 0
+        self.exhausted_count = 0
+
+    def acquire(self, shape, dtype=np.uint8):
+        shape = tuple(shape)
+        dtype = np.dtype(dtype)
+        with self._lock:
+            if shape != self._shape or dtype != self._dtype:
+                # Resolution changed - start a fresh set of buffers
+                self._shape = shape
+                self._dtype = dtype
+                self._free = []
+                self._allocated = 0
+
+            if self._free:
+                buffer = self._free.pop()
+            elif self._allocated < self.capacity:
+                buffer = np.empty(shape, dtype=dtype)
+                self._allocated += 1
+                self.allocations += 1
+            else:
+                self.exhausted_count += 1
+                return None
+
+        return FrameHandle(self, buffer)
+
+    def _recycle(self, buffer):
+        with self._lock:
+            if buffer.shape == self._shape and buffer.dtype == self._dtype:
+                self._free.append(buffer)
+
+    def available(self):
+        """Number of buffers that can be acquired without exhausting the pool"""
+        with self._lock:
+            return len(self._free) + (self.capacity - self._allocated)
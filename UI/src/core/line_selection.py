@@ -0,0 +1,172 @@
+import time
+import numpy as np
+
+def merge_collinear_segments(lines, angle_tolerance=2.0, distance_tolerance=5.0,
+                             max_gap=10.0, time_budget=None):
+    """Merge HoughLinesP segments that lie on the same straight line.
+
+    Segments are visited longest first and joined to an existing group when
+    their direction is within angle_tolerance degrees, their midpoint lies
+    within distance_tolerance pixels of the group's line, and they overlap
+    or come within max_gap pixels of it along that line. Each group becomes
+    one segment spanning the extreme endpoints of its members.
+
+    If time_budget (seconds) runs out, the segments not yet visited are
+    passed through unmerged, so the longest lines are always merged first.
+
+    Args:
+        lines: HoughLinesP output, shape (N, 1, 4) or (N, 4)
+    Returns:
+        (segments, support, support_length): merged (M, 4) int32 segments,
+        number of source segments per merged segment, and the summed
+        length of those source segments
+    """
+    segments = np.asarray(lines, dtype=np.float64).reshape(-1, 4)
+    count = len(segments)
+    if count == 0:
+        return np.empty((0, 4), dtype=np.int32), np.empty(0, dtype=np.int32), np.empty(0)
+
+    deltas = segments[:, 2:4] - segments[:, 0:2]
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+    directions = np.degrees(np.arctan2(deltas[:, 1], deltas[:, 0])) % 180.0
+    midpoints = (segments[:, 0:2] + segments[:, 2:4]) / 2.0
+
+    order = np.argsort(-lengths, kind='stable')
+    deadline = None if time_budget is None else time.perf_counter() + time_budget
+
+    # Group state, preallocated for the worst case of no merges at all
+    group_origin = np.empty((count, 2))
+    group_unit = np.empty((count, 2))
+    group_direction = np.empty(count)
+    group_min = np.empty(count)
+    group_max = np.empty(count)
+    group_support = np.zeros(count, dtype=np.int32)
+    group_length = np.zeros(count)
+    groups = 0
+
+    for position, index in enumerate(order):
+        if deadline is not None and time.perf_counter() > deadline:
+            # Out of time - keep the remaining (shorter) segments as they are
+            remaining = order[position:]
+            for rest in remaining:
+                _start_group(rest, groups, segments, deltas, lengths, directions,
+                             group_origin, group_unit, group_direction,
+                             group_min, group_max, group_support, group_length)
+                groups += 1
+            break
+
+        match = -1
+        if groups:
+            angle_diff = np.abs(group_direction[:groups] - directions[index])
+            angle_diff = np.minimum(angle_diff, 180.0 - angle_diff)
+
+            offset = midpoints[index] - group_origin[:groups]
+            unit = group_unit[:groups]
+            # Perpendicular distance from the midpoint to each group's line
+            distance = np.abs(offset[:, 0] * unit[:, 1] - offset[:, 1] * unit[:, 0])
+
+            # Extent of this segment projected onto each group's direction
+            start_proj = ((segments[index, 0:2] - group_origin[:groups]) * unit).sum(axis=1)
+            end_proj = ((segments[index, 2:4] - group_origin[:groups]) * unit).sum(axis=1)
+            seg_min = np.minimum(start_proj, end_proj)
+            seg_max = np.maximum(start_proj, end_proj)
+            gap = np.maximum(seg_min - group_max[:groups], group_min[:groups] - seg_max)
+
+            candidates = np.flatnonzero((angle_diff <= angle_tolerance) &
+                                        (distance <= distance_tolerance) &
+                                        (gap <= max_gap))
+            if len(candidates):
+                match = candidates[0]
+
+        if match < 0:
+            _start_group(index, groups, segments, deltas, lengths, directions,
+                         group_origin, group_unit, group_direction,
+                         group_min, group_max, group_support, group_length)
+            groups += 1
+        else:
+            group_min[match] = min(group_min[match], seg_min[match])
+            group_max[match] = max(group_max[match], seg_max[match])
+            group_support[match] += 1
+            group_length[match] += lengths[index]
+
+    # Convert each group back to endpoint form
+    origin = group_origin[:groups]
+    unit = group_unit[:groups]
+    starts = origin + unit * group_min[:groups, None]
+    ends = origin + unit * group_max[:groups, None]
+    merged = np.rint(np.hstack([starts, ends])).astype(np.int32)
+
+    return merged, group_support[:groups].copy(), group_length[:groups].copy()
+
+def _start_group(index, group, segments, deltas, lengths, directions,
+                 group_origin, group_unit, group_direction,
+                 group_min, group_max, group_support, group_length):
+    """Open a new group seeded with a single segment"""
+    length = lengths[index]
+    group_origin[group] = segments[index, 0:2]
+    group_unit[group] = deltas[index] / length if length > 0 else (1.0, 0.0)
+    group_direction[group] = directions[index]
+    group_min[group] = 0.0
+    group_max[group] = length
+    group_support[group] = 1
+    group_length[group] = length
+
+def clip_segments(segments, width, height):
+    """Clip segments to a width x height image.
+
+    Endpoints are moved along each segment's own line (Liang-Barsky), so a
+    clipped segment keeps its angle, unlike clamping x and y separately.
+    Merged segments can overhang the image by a few pixels because their
+    endpoints are projected onto the seed segment's line. Segments lying
+    wholly outside the image are returned unchanged.
+
+    Returns:
+        (N, 4) int32 segments
+    """
+    segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+    starts = segments[:, 0:2]
+    deltas = segments[:, 2:4] - starts
+    enter = np.zeros(len(segments))
+    leave = np.ones(len(segments))
+
+    for axis, limit in enumerate((width - 1, height - 1)):
+        position = starts[:, axis]
+        delta = deltas[:, axis]
+        moving = delta != 0
+        inside = (position >= 0) & (position <= limit)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            low = (0 - position) / delta
+            high = (limit - position) / delta
+        # Parallel to this boundary pair: fully inside or fully outside
+        enter = np.maximum(enter, np.where(moving, np.minimum(low, high), np.where(inside, -np.inf, np.inf)))
+        leave = np.minimum(leave, np.where(moving, np.maximum(low, high), np.where(inside, np.inf, -np.inf)))
+
+    clipped = segments.copy()
+    visible = enter <= leave
+    clipped[visible, 0:2] = starts[visible] + deltas[visible] * enter[visible, None]
+    clipped[visible, 2:4] = starts[visible] + deltas[visible] * leave[visible, None]
+    return np.rint(clipped).astype(np.int32)
+
+def rank_segments(segments, support, support_length, min_length=0, max_lines=None):
+    """Order merged segments by significance and drop insignificant ones.
+
+    Segments are ranked by the total length of Hough evidence behind them
+    (longest first), with the number of merged segments breaking ties.
+    Segments shorter than min_length are discarded, and at most max_lines
+    are kept when a limit is given.
+
+    Returns:
+        (segments, support, support_length) in ranked order
+    """
+    if len(segments) == 0:
+        return segments, support, support_length
+
+    deltas = segments[:, 2:4] - segments[:, 0:2]
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+
+    order = np.lexsort((-support, -support_length))
+    order = order[lengths[order] >= min_length]
+    if max_lines is not None:
+        order = order[:max_lines]
+
+    return segments[order], support[order], support_length[order]
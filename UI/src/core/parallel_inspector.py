@@ -0,0 +1,226 @@
+"""
+Multi-process execution for batch inspection.
+
+Frames are sharded across a pool of worker processes, each with its own
+DetectionEngine. Two sharding modes are available:
+
+- frames: the parent decodes every frame into a ring of shared memory
+  slots and workers read them in place, so no pixel data is pickled.
+- ranges: each worker opens the video itself and decodes its own range of
+  frames; only the small result records travel back. Sources without a
+  known frame count (and images) fall back to the frames mode. Ranges
+  start with a seek, which is only frame-accurate for seekable codecs.
+
+Results are always written in source and frame order.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory, util
+
+import cv2
+import numpy as np
+
+from src.core.batch_inspector import BatchInspector, create_engine, iter_frames, iter_video_frames
+from src.utils.logging_setup import configure_logging, shutdown_logging
+
+def default_worker_count():
+    """Worker processes to use when none are requested: one per detected core"""
+    try:
+        from hardware_config import hardware_config
+        return max(1, int(hardware_config.cpu_count))
+    except (ImportError, TypeError, ValueError):
+        return os.cpu_count() or 1
+
+# Per-process worker state, set up by _init_worker
+_inspector = None
+_attached = {}
+
+def _init_worker(settings, roi):
+    global _inspector
+    # Forked workers inherit the queue handler but not its listener thread
+    configure_logging(level=settings['log_level'])
+    engine = create_engine(settings)
+    # Distinguish image names written by different processes in the same second
+    engine.image_writer.filename_tag = f"p{os.getpid()}"
+    # Queued defect images and log records are written out when the worker
+    # process exits (pool workers skip atexit handlers)
+    util.Finalize(engine, engine.close, exitpriority=10)
+    util.Finalize(None, _close_attached, exitpriority=10)
+    util.Finalize(None, shutdown_logging, exitpriority=5)
+    _inspector = BatchInspector(engine, roi)
+
+def _attach(name):
+    """Open a shared memory block created by the parent without tracking it
+
+    Only the parent, which creates and unlinks the blocks, may track them.
+    A worker that registers a block with its own resource tracker gets
+    "No such file or directory" warnings at exit once the parent has
+    unlinked it, and unregistering afterwards would also remove the
+    parent's registration when the tracker is shared (fork).
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument; skip the registration instead
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+def _close_attached():
+    for block in _attached.values():
+        try:
+            block.close()
+        except BufferError:
+            # A frame view is still alive; the mapping goes with the process
+            pass
+    _attached.clear()
+
+def _shared_view(name, shape, dtype):
+    """Map a frame stored in the named shared memory block"""
+    block = _attached.get(name)
+    if block is None:
+        block = _attach(name)
+        _attached[name] = block
+    return np.ndarray(shape, dtype=dtype, buffer=block.buf)
+
+def _inspect_shared(name, shape, dtype, meta):
+    frame = _shared_view(name, shape, dtype)
+    if _inspector.roi is None:
+        # The slot is reused once this call returns, but the engine draws on
+        # the frame and may still be saving it - give it a private copy
+        frame = frame.copy()
+    return _inspector.inspect_frame(dict(meta, frame=frame))
+
+def _inspect_range(path, start, stop, stride):
+    return [_inspector.inspect_frame(record)
+            for record in iter_video_frames(path, start, stop, stride)]
+
+class SharedFrameSlots:
+    """Ring of shared memory blocks the parent decodes frames into"""
+
+    def __init__(self, count):
+        self.count = count
+        self.capacity = 0
+        self.blocks = []
+        self.free = []
+
+    def ensure_capacity(self, nbytes):
+        """Make every slot at least nbytes; only valid while all slots are free"""
+        if nbytes <= self.capacity:
+            return
+        self.close()
+        self.capacity = nbytes
+        self.blocks = [shared_memory.SharedMemory(create=True, size=nbytes)
+                       for _ in range(self.count)]
+        self.free = list(range(self.count))
+
+    def store(self, frame):
+        """Copy a frame into a free slot and return the slot index"""
+        slot = self.free.pop()
+        view = np.ndarray(frame.shape, dtype=frame.dtype, buffer=self.blocks[slot].buf)
+        view[...] = frame
+        return slot
+
+    def release(self, slot):
+        self.free.append(slot)
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+        self.free = []
+        self.capacity = 0
+
+class ParallelInspector:
+    """Runs batch inspection across a pool of worker processes"""
+    SHARD_MODES = ('frames', 'ranges')
+
+    def __init__(self, settings, roi=None, workers=None, shard='frames', slots_per_worker=2):
+        if shard not in self.SHARD_MODES:
+            raise ValueError(f"Unsupported shard mode: {shard}")
+        self.settings = settings
+        self.roi = roi
+        self.workers = workers or default_worker_count()
+        self.shard = shard
+        self.slots = SharedFrameSlots(self.workers * slots_per_worker)
+        self._in_flight = deque()
+        self.frame_count = 0
+        self.defect_frames = 0
+
+    def run(self, sources, stride, writer):
+        """Inspect every source, writing results in order; returns (frames, defect frames)"""
+        self.frame_count = 0
+        self.defect_frames = 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.settings, self.roi)) as executor:
+            try:
+                for kind, path in sources:
+                    frame_total = 0
+                    if kind == 'video' and self.shard == 'ranges':
+                        frame_total = self.video_frame_count(path)
+                    if frame_total > 0:
+                        # Keep source order: finish queued frames before the ranges
+                        self._drain(writer)
+                        self._run_ranges(executor, path, frame_total, stride, writer)
+                    else:
+                        for record in iter_frames([(kind, path)], stride):
+                            self._submit_frame(executor, record, writer)
+                self._drain(writer)
+            finally:
+                self.slots.close()
+        return self.frame_count, self.defect_frames
+
+    def video_frame_count(self, path):
+        cap = cv2.VideoCapture(path)
+        try:
+            return int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+        finally:
+            cap.release()
+
+    def _submit_frame(self, executor, record, writer):
+        frame = np.ascontiguousarray(record['frame'])
+        if frame.nbytes > self.slots.capacity:
+            # Larger frame than the slots hold - reallocate once they are idle
+            self._drain(writer)
+            self.slots.ensure_capacity(frame.nbytes)
+        while not self.slots.free:
+            self._complete_oldest(writer)
+
+        slot = self.slots.store(frame)
+        meta = {key: value for key, value in record.items() if key != 'frame'}
+        future = executor.submit(_inspect_shared, self.slots.blocks[slot].name,
+                                 frame.shape, frame.dtype.str, meta)
+        self._in_flight.append((future, slot))
+
+    def _complete_oldest(self, writer):
+        future, slot = self._in_flight.popleft()
+        try:
+            self._write(writer, future.result())
+        finally:
+            self.slots.release(slot)
+
+    def _drain(self, writer):
+        while self._in_flight:
+            self._complete_oldest(writer)
+
+    def _run_ranges(self, executor, path, frame_total, stride, writer):
+        # Several ranges per worker balance uneven decode and detection costs
+        chunk = max(stride, -(-frame_total // (self.workers * 4)))
+        # Align ranges to the stride so every range starts on an inspected frame
+        chunk = -(-chunk // stride) * stride
+        ranges = [(start, min(start + chunk, frame_total)) for start in range(0, frame_total, chunk)]
+        futures = [executor.submit(_inspect_range, path, start, stop, stride) for start, stop in ranges]
+        for future in futures:
+            for result in future.result():
+                self._write(writer, result)
+
+    def _write(self, writer, result):
+        writer.write(result)
+        self.frame_count += 1
+        if result['defect_count']:
+            self.defect_frames += 1
@@ -1,10 +1,24 @@
 import cv2
+import logging
 import numpy as np
 import time
 from PySide6.QtCore import QThread, Signal
 
+from src.core.frame_mailbox import FrameMailbox
+from src.core.frame_pool import FramePool
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
 class VideoThread(QThread):
-    frame_ready = Signal(np.ndarray)
+    """Captures frames into pooled buffers and delivers them via frame_mailbox.
+
+    Only the newest frame waits in the mailbox: a frame the consumer has not
+    taken when the next one arrives is dropped and its buffer recycled, so a
+    slow consumer never builds up a queue of stale frames. Consumers connect
+    to frame_mailbox.item_available, take() the FrameHandle and must
+    release() it when done.
+    """
     error_occurred = Signal(str)
     
     def __init__(self, camera_index=None):
@@ -24,13 +38,31 @@ class VideoThread(QThread):
         # Performance settings
         self.max_frame_rate = 30  # Limit frame rate to prevent overwhelming
         self.frame_interval = 1.0 / self.max_frame_rate
-        self.last_frame_time = 0
+        
+        # Deadline scheduler: frames are emitted at most once per frame_interval;
+        # camera frames grabbed before the deadline are skipped without decoding
+        self._next_deadline = 0.0
+        self._last_grab_time = None
+        self._source_period = None  # Smoothed time between grabbed frames
+        self.skipped_frames = 0
+        
+        # Every grabbed frame gets a sequence number and capture timestamps
+        self.frame_sequence = 0
+        self._last_grab_wall_time = None
         
         # Error handling
         self.max_consecutive_failures = 3
         self.reconnect_delay = 2.0
         self.frame_timeout = 5.0  # Timeout for frame reading
         
+        # Preallocated frame buffers, reused instead of allocating per frame
+        self.frame_pool = FramePool(capacity=4)
+        self._capture_buffer = None  # Scratch buffer when capture size != output size
+        self.dropped_frames = 0  # Pool exhausted
+        
+        # Latest-frame delivery to the consumer (drops are counted there)
+        self.frame_mailbox = FrameMailbox(metric='display.wait')
+        
     def set_camera_settings(self, settings):
         self.camera_settings = settings
         self.max_frame_rate = settings.get('fps', 30)
@@ -52,44 +84,85 @@ class VideoThread(QThread):
                 
             self.running = True
             consecutive_failures = 0
+            self._next_deadline = time.perf_counter()
+            self._last_grab_time = None
+            self.frame_sequence = 0
             
             while self.running:
                 try:
-                    # Frame rate limiting
-                    current_time = time.time()
-                    if current_time - self.last_frame_time < self.frame_interval:
-                        time.sleep(0.001)  # Small sleep to prevent busy waiting
+                    # Video files have no frame clock of their own: wait for the
+                    # next deadline and consume every frame. Cameras are grabbed
+                    # at their own rate; grab() blocks until a frame arrives.
+                    if self.video_file is not None:
+                        self.wait_for_deadline()
+                        
+                    if not self.grab_frame():
+                        consecutive_failures += 1
+                        if consecutive_failures >= self.max_consecutive_failures:
+                            raise Exception("Failed to read frame multiple times")
+                        continue
+                    consecutive_failures = 0
+                    grab_time = self._last_grab_time
+                    
+                    # Decode only frames that will be emitted
+                    if self.video_file is None and not self.frame_due(grab_time):
+                        self.skipped_frames += 1
+                        continue
+                    self.advance_deadline(grab_time)
+                        
+                    # Every buffer is still held by consumers - drop this frame
+                    width, height = self.camera_settings['resolution']
+                    handle = self.frame_pool.acquire((height, width, 3))
+                    if handle is None:
+                        self.dropped_frames += 1
                         continue
+                    self.stamp_frame(handle, grab_time)
                         
-                    # Read frame with timeout
-                    ret, frame = self.read_frame_with_timeout()
+                    # Decode straight into the pooled buffer when the capture
+                    # already delivers the output resolution
+                    if self._capture_buffer is None:
+                        ret, frame = self.retrieve_frame(handle.frame)
+                    else:
+                        ret, frame = self.retrieve_frame(self._capture_buffer)
                     
                     if ret and frame is not None:
-                        consecutive_failures = 0
-                        self.last_frame_time = current_time
-                        
-                        # Resize frame if needed
-                        if frame.shape[:2] != self.camera_settings['resolution'][::-1]:
-                            frame = cv2.resize(frame, self.camera_settings['resolution'])
+                        if frame is not handle.frame:
+                            # Capture size differs - keep a scratch buffer for it
+                            # and resize into the pooled buffer
+                            self._capture_buffer = frame
+                            with metrics.timer('capture.resize'):
+                                if frame.shape == handle.frame.shape:
+                                    np.copyto(handle.frame, frame)
+                                    self._capture_buffer = None
+                                else:
+                                    cv2.resize(frame, (width, height), dst=handle.frame)
                             
-                        self.frame_ready.emit(frame)
+                        metrics.record('capture.latency', (time.perf_counter() - grab_time) * 1000)
+                        self.frame_mailbox.put(handle)
                     else:
+                        handle.release()
                         consecutive_failures += 1
                         if consecutive_failures >= self.max_consecutive_failures:
                             raise Exception("Failed to read frame multiple times")
                             
                 except Exception as e:
-                    print(f"Error in video processing: {str(e)}")
+                    if not self.running:
+                        break
+                    logger.error("Error in video processing: %s", e)
                     self.error_occurred.emit("Connection lost. Attempting to reconnect...")
                     
                     if not self.reconnect():
                         break
                         
-                # Small sleep to prevent excessive CPU usage
-                time.sleep(0.001)
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
                 
         except Exception as e:
             self.error_occurred.emit(f"Error starting: {str(e)}")
+        finally:
+            # Return an untaken frame to the pool
+            self.frame_mailbox.clear()
             
     def initialize_capture(self):
         """Initialize video capture with proper error handling"""
@@ -108,7 +181,7 @@ class VideoThread(QThread):
                 self.apply_camera_settings()
                 
         except Exception as e:
-            print(f"Capture initialization error: {str(e)}")
+            logger.error("Capture initialization error: %s", e)
             self.cap = None
             
     def apply_camera_settings(self):
@@ -137,31 +210,95 @@ class VideoThread(QThread):
             # Additional camera optimisations
             self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimise buffer size
             
+            # Bound how long a blocking grab() can wait for the camera
+            if hasattr(cv2, 'CAP_PROP_READ_TIMEOUT_MSEC'):
+                self.cap.set(cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.frame_timeout * 1000))
+            
         except Exception as e:
-            print(f"Camera settings error: {str(e)}")
+            logger.error("Camera settings error: %s", e)
             
-    def read_frame_with_timeout(self):
-        """Read frame with timeout to prevent hanging"""
+    def grab_frame(self):
+        """Grab the next frame from the source without decoding it
+        
+        Blocks until the camera delivers a frame (bounded by the capture's
+        read timeout). Also tracks the source frame period for frame_due().
+        """
         try:
-            # Set a timeout for frame reading
-            start_time = time.time()
-            
-            while time.time() - start_time < self.frame_timeout:
-                ret, frame = self.cap.read()
-                if ret:
-                    return ret, frame
-                time.sleep(0.001)
+            start_time = time.perf_counter()
+            grabbed = self.cap.grab()
+            grab_time = time.perf_counter()
+            if not grabbed:
+                return False
                 
-            return False, None
+            self.frame_sequence += 1
+            self._last_grab_wall_time = time.time()
+            metrics.record('capture.grab', (grab_time - start_time) * 1000)
+            if self._last_grab_time is not None:
+                period = grab_time - self._last_grab_time
+                if self._source_period is None:
+                    self._source_period = period
+                else:
+                    self._source_period += 0.1 * (period - self._source_period)
+            self._last_grab_time = grab_time
+            return True
+            
+        except Exception as e:
+            if self.running:
+                logger.error("Frame grab error: %s", e)
+            return False
+            
+    def stamp_frame(self, handle, grab_time):
+        """Attach the sequence number and capture timestamps of the last grab"""
+        handle.sequence = self.frame_sequence
+        handle.capture_time = grab_time
+        handle.capture_wall_time = self._last_grab_wall_time
+        # Camera/stream timestamp; backends that do not report one return 0 or -1
+        position_ms = self.cap.get(cv2.CAP_PROP_POS_MSEC)
+        handle.position_ms = position_ms if position_ms > 0 else None
+        
+    def retrieve_frame(self, buffer=None):
+        """Decode the last grabbed frame
+        
+        When buffer matches the capture size the frame is decoded into it
+        in place; otherwise OpenCV returns a newly allocated frame.
+        """
+        try:
+            start_time = time.perf_counter()
+            ret, frame = self.cap.retrieve(buffer)
+            if ret:
+                metrics.record('capture.retrieve', (time.perf_counter() - start_time) * 1000)
+            return ret, frame
             
         except Exception as e:
-            print(f"Frame reading error: {str(e)}")
+            logger.error("Frame retrieve error: %s", e)
             return False, None
             
+    def frame_due(self, grab_time):
+        """Whether a frame grabbed at grab_time should be emitted
+        
+        Frames arriving up to half a source frame early still count, so a
+        camera running at the target rate is not halved by timing jitter.
+        """
+        tolerance = 0.5 * self._source_period if self._source_period else 0.0
+        return grab_time >= self._next_deadline - tolerance
+        
+    def advance_deadline(self, now):
+        """Schedule the next emit one frame interval after the current deadline"""
+        if self._next_deadline < now - self.frame_interval:
+            # Fell behind by more than a frame - restart the schedule
+            self._next_deadline = now
+        self._next_deadline += self.frame_interval
+        
+    def wait_for_deadline(self):
+        """Sleep until the next emit deadline"""
+        delay = self._next_deadline - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+            
     def reconnect(self):
         """Attempt to reconnect to the video source"""
         try:
-            print("Attempting to reconnect...")
+            logger.info("Attempting to reconnect...")
             
             # Release current capture
             if self.cap is not None:
@@ -182,7 +319,7 @@ class VideoThread(QThread):
                 return False
                 
         except Exception as e:
-            print(f"Reconnection error: {str(e)}")
+            logger.error("Reconnection error: %s", e)
             self.error_occurred.emit(f"Reconnection failed: {str(e)}")
             return False
             
@@ -190,10 +327,9 @@ class VideoThread(QThread):
         """Stop the video thread safely"""
         self.running = False
         
-        # Release capture
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
-            
-        # Wait for thread to finish
-        self.wait() 
\ No newline at end of file
+        # The capture loop releases the capture itself once its current grab
+        # returns; only force it if the grab is stuck
+        if not self.wait(int((self.frame_timeout + 1.0) * 1000)):
+            if self.cap is not None:
+                self.cap.release()
+            self.wait() 
\ No newline at end of file
@@ -0,0 +1,231 @@
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+
+from PySide6.QtCore import QAbstractTableModel, QModelIndex, QObject, QSize, Qt, Signal
+from PySide6.QtGui import QImageReader, QPixmap
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZE = QSize(64, 36)
+
+class ThumbnailLoader(QObject):
+    """Decodes defect image thumbnails on a background thread.
+
+    Requests are served newest first, so the rows the user is looking at
+    now load before rows that have already scrolled away. Results come back
+    as QImages through thumbnail_loaded (QPixmaps must be made on the GUI
+    thread).
+    """
+    thumbnail_loaded = Signal(str, object)
+
+    def __init__(self, size=THUMBNAIL_SIZE):
+        super().__init__()
+        self.size = size
+        self._queue = queue.LifoQueue()
+        self._requested = set()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="ThumbnailLoader")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def request(self, path):
+        with self._lock:
+            if path in self._requested:
+                return
+            self._requested.add(path)
+        self._queue.put(path)
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            if path is None:
+                return
+            try:
+                reader = QImageReader(path)
+                original = reader.size()
+                if original.isValid():
+                    # Decoders that support it (e.g. JPEG) scale while decoding
+                    reader.setScaledSize(original.scaled(self.size, Qt.AspectRatioMode.KeepAspectRatio))
+                image = reader.read()
+                self.thumbnail_loaded.emit(path, None if image.isNull() else image)
+            except Exception as e:
+                logger.warning("Thumbnail error for %s: %s", path, e)
+            finally:
+                with self._lock:
+                    self._requested.discard(path)
+
+    def stop(self):
+        self._queue.put(None)
+
+class DefectTableModel(QAbstractTableModel):
+    """Defect rows for a QTableView, newest first.
+
+    Rows come from two append-only lists: live defects reported while the
+    window is open, and history pages fetched from the fault database on
+    demand (canFetchMore/fetchMore) as the view scrolls. History is limited
+    to faults logged before the window opened (max_id), so no fault appears
+    in both. Thumbnails are only loaded for rows the view actually paints,
+    and kept in a small LRU cache.
+    """
+    COLUMNS = ['Image', 'Time', 'Angle (°)', 'Frame', 'Details']
+    PAGE_SIZE = 200
+    THUMBNAIL_CACHE_SIZE = 300
+
+    def __init__(self, database_manager, parent=None):
+        super().__init__(parent)
+        self.database_manager = database_manager
+        self.filters = {}
+        self._live = []
+        self._history = []
+        self._history_done = False
+        self._history_cursor = None
+        self._max_id = 0
+
+        self._thumbnails = OrderedDict()
+        self._loader = ThumbnailLoader()
+        self._loader.thumbnail_loaded.connect(self.on_thumbnail_loaded)
+
+    def reload(self, **filters):
+        """Start over with new filters: live rows are dropped, history is re-read"""
+        self.beginResetModel()
+        self.filters = {key: value for key, value in filters.items() if value is not None}
+        self._live = []
+        self._history = []
+        self._history_done = False
+        self._history_cursor = None
+        try:
+            self._max_id = self.database_manager.get_max_fault_id()
+        except Exception as e:
+            logger.error("Error reading fault database: %s", e)
+            self._max_id = 0
+            self._history_done = True
+        self.endResetModel()
+
+    def matching_count(self):
+        """Faults matching the filters: all history (loaded or not) plus live rows"""
+        try:
+            return self.database_manager.count_faults(max_id=self._max_id, **self.filters) + len(self._live)
+        except Exception as e:
+            logger.error("Error counting faults: %s", e)
+            return self.rowCount()
+
+    def matches(self, record):
+        angle = record.get('angle')
+        captured_at = record.get('captured_at')
+        if 'min_angle' in self.filters and (angle is None or angle < self.filters['min_angle']):
+            return False
+        if 'max_angle' in self.filters and (angle is None or angle > self.filters['max_angle']):
+            return False
+        if captured_at is not None:
+            if 'start' in self.filters and captured_at < self.filters['start']:
+                return False
+            if 'end' in self.filters and captured_at > self.filters['end']:
+                return False
+        return True
+
+    def add_defect(self, record):
+        """Add a live defect (dict with timestamp, angle, image_path, ...) at the top"""
+        if not self.matches(record):
+            return False
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._live.append(record)
+        self.endInsertRows()
+        return True
+
+    def record(self, row):
+        live_count = len(self._live)
+        if row < live_count:
+            return self._live[live_count - 1 - row]
+        return self._history[row - live_count]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._live) + len(self._history)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._history_done
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._history_done:
+            return
+        try:
+            rows = self.database_manager.query_faults(limit=self.PAGE_SIZE, before=self._history_cursor,
+                                                      max_id=self._max_id, **self.filters)
+        except Exception as e:
+            logger.error("Error paging fault database: %s", e)
+            rows = []
+        if len(rows) < self.PAGE_SIZE:
+            self._history_done = True
+        if not rows:
+            return
+        self._history_cursor = self.database_manager.page_cursor(rows[-1])
+
+        first = self.rowCount()
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self._history.extend({
+            'timestamp': row['timestamp'],
+            'angle': row['measurement'],
+            'frame_sequence': row['frame_sequence'],
+            'image_path': row['image_path'],
+            'details': row['details']
+        } for row in rows)
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        record = self.record(index.row())
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 1:
+                return record['timestamp']
+            if column == 2:
+                return None if record['angle'] is None else f"{record['angle']:.2f}"
+            if column == 3:
+                return record.get('frame_sequence')
+            if column == 4:
+                return record.get('details')
+        elif role == Qt.ItemDataRole.DecorationRole and column == 0:
+            return self.thumbnail(record.get('image_path'))
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 0:
+            return record.get('image_path')
+        elif role == Qt.ItemDataRole.TextAlignmentRole and column in (2, 3):
+            return int(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+        return None
+
+    def thumbnail(self, path):
+        """Cached thumbnail, or None while it is loaded in the background"""
+        if not path:
+            return None
+        if path in self._thumbnails:
+            self._thumbnails.move_to_end(path)
+            return self._thumbnails[path]
+        if os.path.exists(path):
+            self._loader.request(path)
+        return None
+
+    def on_thumbnail_loaded(self, path, image):
+        self._thumbnails[path] = QPixmap.fromImage(image) if image is not None else None
+        while len(self._thumbnails) > self.THUMBNAIL_CACHE_SIZE:
+            self._thumbnails.popitem(last=False)
+        # One signal for the whole image column; the view only repaints the
+        # visible rows, which avoids scanning every row for this path
+        if self.rowCount():
+            self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, 0),
+                                  [Qt.ItemDataRole.DecorationRole])
+
+    def close(self):
+        self._loader.stop()
@@ -7,9 +7,11 @@ import socket
 from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, 
                                QLineEdit, QPushButton, QSpinBox, QDoubleSpinBox,
                                QSlider, QCheckBox, QComboBox, QMessageBox,
-                               QTextEdit, QListWidget, QInputDialog, QScrollArea,
-                               QGroupBox, QWidget)
-from PySide6.QtCore import Qt
+                               QTextEdit, QListWidget, QInputDialog,
+                               QGroupBox, QTableView, QHeaderView,
+                               QAbstractItemView, QDateTimeEdit, QFileDialog, QTableWidget,
+                               QTableWidgetItem)
+from PySide6.QtCore import Qt, QDateTime, QTimer, QThread, Signal
 from PySide6.QtGui import QPixmap, QImage
 
 class CameraSettingsDialog(QDialog):
@@ -218,37 +220,208 @@ class PalletSetupDialog(QDialog):
                 json.dump(template, file)
             QMessageBox.information(self, "Success", f"Template saved as {name}.json")
 
+class DefectExportThread(QThread):
+    """Streams the faults matching a filter to a CSV file off the GUI thread"""
+    FIELDS = ['id', 'timestamp', 'fault_type', 'measurement', 'frame_sequence',
+              'camera_id', 'roi', 'image_path', 'details']
+    progress = Signal(int)
+    export_finished = Signal(int, str)
+    export_failed = Signal(str)
+    
+    def __init__(self, database_manager, file_path, filters, parent=None):
+        super().__init__(parent)
+        self.database_manager = database_manager
+        self.file_path = file_path
+        self.filters = filters
+        
+    def run(self):
+        import csv
+        try:
+            count = 0
+            with open(self.file_path, 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=self.FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                # Streamed in batches, so the size of the history does not matter
+                for row in self.database_manager.iter_faults(**self.filters):
+                    writer.writerow(row)
+                    count += 1
+                    if count % 5000 == 0:
+                        self.progress.emit(count)
+                        if self.isInterruptionRequested():
+                            self.export_failed.emit(f"Export cancelled after {count} defects")
+                            return
+            self.export_finished.emit(count, self.file_path)
+        except Exception as e:
+            self.export_failed.emit(str(e))
+
 class DefectsWindow(QDialog):
-    def __init__(self, parent=None):
+    """Defect browser: a table of logged faults, paged from the database, with live updates"""
+    
+    def __init__(self, database_manager, parent=None):
         super().__init__(parent)
         self.setWindowTitle("Defects")
         self.setModal(False)
-        self.resize(600, 400)
+        self.resize(900, 500)
+        
+        from src.ui.defect_table_model import DefectTableModel, THUMBNAIL_SIZE
+        self.thumbnail_size = THUMBNAIL_SIZE
+        self.model = DefectTableModel(database_manager, self)
         self.setup_ui()
+        self.apply_filters()
         
     def setup_ui(self):
         layout = QVBoxLayout()
         
-        scroll_area = QScrollArea()
-        self.defects_widget = QWidget()
-        self.defects_layout = QVBoxLayout(self.defects_widget)
-        scroll_area.setWidget(self.defects_widget)
-        scroll_area.setWidgetResizable(True)
-        layout.addWidget(scroll_area)
+        # Filters
+        filter_layout = QHBoxLayout()
+        
+        self.time_filter_check = QCheckBox("From")
+        filter_layout.addWidget(self.time_filter_check)
+        now = QDateTime.currentDateTime()
+        self.start_edit = QDateTimeEdit(now.addSecs(-8 * 3600))
+        self.start_edit.setCalendarPopup(True)
+        self.start_edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+        filter_layout.addWidget(self.start_edit)
+        filter_layout.addWidget(QLabel("To"))
+        self.end_edit = QDateTimeEdit(now.addSecs(3600))
+        self.end_edit.setCalendarPopup(True)
+        self.end_edit.setDisplayFormat("yyyy-MM-dd HH:mm")
+        filter_layout.addWidget(self.end_edit)
+        
+        self.angle_filter_check = QCheckBox("Angle")
+        filter_layout.addWidget(self.angle_filter_check)
+        self.min_angle_spin = QDoubleSpinBox()
+        self.min_angle_spin.setRange(-180.0, 180.0)
+        self.min_angle_spin.setValue(0.0)
+        filter_layout.addWidget(self.min_angle_spin)
+        filter_layout.addWidget(QLabel("to"))
+        self.max_angle_spin = QDoubleSpinBox()
+        self.max_angle_spin.setRange(-180.0, 180.0)
+        self.max_angle_spin.setValue(180.0)
+        filter_layout.addWidget(self.max_angle_spin)
+        
+        apply_button = QPushButton("Apply")
+        apply_button.clicked.connect(self.apply_filters)
+        filter_layout.addWidget(apply_button)
+        
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset_filters)
+        filter_layout.addWidget(reset_button)
+        filter_layout.addStretch()
+        
+        self.export_button = QPushButton("Export CSV...")
+        self.export_button.clicked.connect(self.export_csv)
+        filter_layout.addWidget(self.export_button)
+        self.export_thread = None
+        layout.addLayout(filter_layout)
+        
+        # Rows are fetched from the database as the table scrolls
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.setIconSize(self.thumbnail_size)
+        self.table.verticalHeader().setVisible(False)
+        # Fixed row heights and column modes keep layout cost independent of row count
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(self.thumbnail_size.height() + 6)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setStretchLastSection(True)
+        self.table.setColumnWidth(0, self.thumbnail_size.width() + 12)
+        self.table.setColumnWidth(1, 150)
+        self.table.setColumnWidth(2, 80)
+        self.table.setColumnWidth(3, 70)
+        self.table.doubleClicked.connect(self.on_row_activated)
+        layout.addWidget(self.table)
+        
+        status_layout = QHBoxLayout()
+        self.count_label = QLabel()
+        status_layout.addWidget(self.count_label)
+        status_layout.addStretch()
+        self.export_label = QLabel()
+        status_layout.addWidget(self.export_label)
+        layout.addLayout(status_layout)
+        
+        self.model.rowsInserted.connect(self.update_count)
+        self.model.modelReset.connect(self.update_count)
         
         self.setLayout(layout)
         
-    def update_defects(self, defects):
-        for i in reversed(range(self.defects_layout.count())):
-            self.defects_layout.itemAt(i).widget().setParent(None)
+    def current_filters(self):
+        filters = {}
+        if self.time_filter_check.isChecked():
+            filters['start'] = self.start_edit.dateTime().toPython()
+            filters['end'] = self.end_edit.dateTime().toPython()
+        if self.angle_filter_check.isChecked():
+            filters['min_angle'] = self.min_angle_spin.value()
+            filters['max_angle'] = self.max_angle_spin.value()
+        return filters
+        
+    def apply_filters(self):
+        self.model.reload(**self.current_filters())
+        self._matching = self.model.matching_count()
+        self.update_count()
+        
+    def reset_filters(self):
+        self.time_filter_check.setChecked(False)
+        self.angle_filter_check.setChecked(False)
+        self.apply_filters()
+        
+    def add_defect(self, defect):
+        """Show a newly detected defect (dict from the detection engine)"""
+        if self.model.add_defect(defect):
+            self._matching += 1
+            self.update_count()
+            
+    def update_count(self, *args):
+        matching = getattr(self, '_matching', None)
+        if matching is None:
+            return
+        self.count_label.setText(f"{self.model.rowCount()} of {matching} defects loaded")
+        
+    def export_csv(self):
+        """Write every fault matching the filters to a CSV file"""
+        default_name = f"defects_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Defects", default_name, "CSV Files (*.csv)")
+        if not file_path:
+            return
             
-        for i, (timestamp, angle, image_path) in enumerate(defects):
-            defect_label = QLabel(f"Defect {i+1}: {angle:.2f}° at {timestamp}")
-            self.defects_layout.addWidget(defect_label)
+        # A long history takes a while; the GUI thread keeps logging defects meanwhile
+        self.export_thread = DefectExportThread(self.model.database_manager, file_path,
+                                                self.current_filters(), self)
+        self.export_thread.progress.connect(
+            lambda count: self.export_label.setText(f"Exporting... {count} defects written"))
+        self.export_thread.export_finished.connect(self.on_export_finished)
+        self.export_thread.export_failed.connect(self.on_export_failed)
+        self.export_button.setEnabled(False)
+        self.export_label.setText("Exporting...")
+        self.export_thread.start()
+        
+    def on_export_finished(self, count, file_path):
+        self.export_button.setEnabled(True)
+        self.export_label.setText(f"Exported {count} defects to {file_path}")
+        
+    def on_export_failed(self, message):
+        self.export_button.setEnabled(True)
+        self.export_label.setText("")
+        QMessageBox.critical(self, "Export Failed", f"Could not export defects:\n{message}")
             
-            view_button = QPushButton("View Image")
-            view_button.clicked.connect(lambda checked, path=image_path: self.show_image(path))
-            self.defects_layout.addWidget(view_button)
+    def on_row_activated(self, index):
+        image_path = self.model.record(index.row()).get('image_path')
+        if image_path:
+            self.show_image(image_path)
+            
+    def done(self, result):
+        # Closing (window button or Escape) ends the dialog; free its pages and thumbnails
+        if self.export_thread is not None and self.export_thread.isRunning():
+            # The file is left incomplete; nobody is left to report it to
+            self.export_thread.blockSignals(True)
+            self.export_thread.requestInterruption()
+            self.export_thread.wait()
+        self.model.close()
+        super().done(result)
+        self.deleteLater()
             
     def show_image(self, image_path):
         if os.path.exists(image_path):
@@ -266,6 +439,120 @@ class DefectsWindow(QDialog):
                 image_window.setLayout(layout)
                 image_window.show() 
 
+class DefectStatisticsWindow(QDialog):
+    """Defect counts and angle deviation per hour or shift, read from the rollup tables"""
+    
+    PERIODS = [("Last 24 hours", 1), ("Last 7 days", 7), ("Last 30 days", 30)]
+    
+    def __init__(self, database_manager, shift_starts, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Defect Statistics")
+        self.setModal(False)
+        self.resize(700, 450)
+        self.database_manager = database_manager
+        self.shift_starts = shift_starts
+        self.setup_ui()
+        self.refresh()
+        
+        # Rollup queries read one row per bucket, so refreshing is cheap
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(10000)
+        
+    def setup_ui(self):
+        layout = QVBoxLayout()
+        
+        controls_layout = QHBoxLayout()
+        self.bucket_combo = QComboBox()
+        self.bucket_combo.addItems(["By Shift", "By Hour"])
+        self.bucket_combo.currentIndexChanged.connect(self.refresh)
+        controls_layout.addWidget(self.bucket_combo)
+        
+        self.period_combo = QComboBox()
+        for label, days in self.PERIODS:
+            self.period_combo.addItem(label, days)
+        self.period_combo.currentIndexChanged.connect(self.refresh)
+        controls_layout.addWidget(self.period_combo)
+        
+        self.by_camera_check = QCheckBox("Per camera")
+        self.by_camera_check.toggled.connect(self.refresh)
+        controls_layout.addWidget(self.by_camera_check)
+        
+        controls_layout.addStretch()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        controls_layout.addWidget(refresh_button)
+        layout.addLayout(controls_layout)
+        
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["Period", "Camera", "Defects", "Defects/h",
+                                              "Mean Dev (°)", "Max Dev (°)"])
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(0, 170)
+        layout.addWidget(self.table)
+        
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+        
+        self.setLayout(layout)
+        
+    def refresh(self):
+        by_shift = self.bucket_combo.currentIndex() == 0
+        by_camera = self.by_camera_check.isChecked()
+        end = datetime.datetime.now()
+        start = end - datetime.timedelta(days=self.period_combo.currentData())
+        
+        try:
+            if by_shift:
+                # Read a day earlier so the shift running at the start of the period is complete
+                rows = self.database_manager.get_shift_stats(self.shift_starts, start=start - datetime.timedelta(days=1),
+                                                             by_camera=by_camera)
+                rows = [row for row in rows
+                        if row['start'] + datetime.timedelta(hours=self.shift_hours(row['shift'])) > start]
+            else:
+                rows = self.database_manager.get_hourly_stats(start=start.replace(minute=0, second=0, microsecond=0),
+                                                              by_camera=by_camera)
+        except Exception as e:
+            self.summary_label.setText(f"Error reading statistics: {str(e)}")
+            return
+            
+        # Newest first
+        rows.reverse()
+        self.table.setRowCount(len(rows))
+        for row_index, row in enumerate(rows):
+            if by_shift:
+                period = f"{row['start']:%Y-%m-%d} shift {row['shift']} ({row['start']:%H:%M})"
+                hours = self.shift_hours(row['shift'])
+            else:
+                period = f"{row['start']:%Y-%m-%d %H:00}"
+                hours = 1
+            camera = "-" if row['camera_id'] is None else f"Stream {row['camera_id'] + 1}"
+            values = [period, camera if by_camera else "All", str(row['count']),
+                      f"{row['count'] / hours:.1f}",
+                      "-" if row['mean_deviation'] is None else f"{row['mean_deviation']:.2f}",
+                      "-" if row['max_deviation'] is None else f"{row['max_deviation']:.2f}"]
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if column >= 2:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter)
+                self.table.setItem(row_index, column, item)
+                
+        total = sum(row['count'] for row in rows)
+        self.summary_label.setText(f"{total} defects in {len(rows)} {'shift' if by_shift else 'hour'} rows")
+        
+    def shift_hours(self, shift):
+        """Length in hours of the day's shift number shift (1-based)"""
+        starts = sorted(self.shift_starts)
+        next_start = starts[shift] if shift < len(starts) else starts[0] + 24
+        return next_start - starts[shift - 1]
+        
+    def done(self, result):
+        self.refresh_timer.stop()
+        super().done(result)
+        self.deleteLater()
+
 class RelaySetupDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -305,6 +592,28 @@ class RelaySetupDialog(QDialog):
         self.trigger_duration_spin.setSingleStep(0.1)
         layout.addWidget(self.trigger_duration_spin)
         
+        # Reject timing: delay the pulse until the board reaches the ejector
+        layout.addWidget(QLabel("Belt Speed (mm/s, 0 = fire immediately)"))
+        self.belt_speed_spin = QDoubleSpinBox()
+        self.belt_speed_spin.setRange(0.0, 10000.0)
+        self.belt_speed_spin.setValue(0.0)
+        self.belt_speed_spin.setSingleStep(10.0)
+        layout.addWidget(self.belt_speed_spin)
+        
+        layout.addWidget(QLabel("Camera to Ejector Distance (mm)"))
+        self.ejector_distance_spin = QDoubleSpinBox()
+        self.ejector_distance_spin.setRange(0.0, 100000.0)
+        self.ejector_distance_spin.setValue(0.0)
+        self.ejector_distance_spin.setSingleStep(10.0)
+        layout.addWidget(self.ejector_distance_spin)
+        
+        layout.addWidget(QLabel("Reject Lead Time (ms)"))
+        self.lead_time_spin = QDoubleSpinBox()
+        self.lead_time_spin.setRange(0.0, 5000.0)
+        self.lead_time_spin.setValue(0.0)
+        self.lead_time_spin.setSingleStep(5.0)
+        layout.addWidget(self.lead_time_spin)
+        
         # Status display
         self.status_label = QLabel("Status: Not Connected")
         self.status_label.setStyleSheet("color: red;")
@@ -364,5 +673,8 @@ class RelaySetupDialog(QDialog):
             'port': self.port_entry.text(),
             'baudrate': int(self.baudrate_combo.currentText()),
             'timeout': self.timeout_spin.value(),
-            'trigger_duration': self.trigger_duration_spin.value()
+            'trigger_duration': self.trigger_duration_spin.value(),
+            'belt_speed': self.belt_speed_spin.value(),
+            'ejector_distance': self.ejector_distance_spin.value(),
+            'reject_lead_time': self.lead_time_spin.value() / 1000.0
         } 
\ No newline at end of file
@@ -1,12 +1,17 @@
+import time
 import cv2
 import numpy as np
 from PySide6.QtWidgets import QWidget
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QPixmap, QImage, QPainter, QPen, QColor
-from PySide6.QtCore import QRect
+from PySide6.QtCore import QRect, QSize
+
+from src.utils.metrics import metrics
 
 class VideoWidget(QWidget):
     roi_selected_signal = Signal()
+    # Emitted on any click, so a tiled view can track the active stream
+    activated = Signal()
     
     def __init__(self):
         super().__init__()
@@ -17,30 +22,89 @@ class VideoWidget(QWidget):
         self.selecting_roi = False
         self.dragging_corner = None
         self.roi_visible = True
+        self.highlighted = False
         self.current_frame = None
+        self.current_image = None
+        
+        # Reusable RGB display buffer and the QImage wrapping it (no copy)
+        self._display_buffer = None
+        self._display_image = None
+        
+        # Cached display transform, keyed on frame size and widget size
+        self._display_rect = None
+        self._display_rect_key = None
         
-    def set_frame(self, frame):
+        # Live video is scaled with fast transformation at paint time; still
+        # images get a smooth scaled pixmap that is cached between paints
+        self.live_video = False
+        self._scaled_pixmap = None
+        
+    def get_display_buffer(self, shape):
+        """Return the reusable RGB buffer for frames of this shape"""
+        if self._display_buffer is None or self._display_buffer.shape != tuple(shape):
+            self._display_buffer = np.empty(shape, dtype=np.uint8)
+            height, width = shape[:2]
+            self._display_image = QImage(self._display_buffer.data, width, height,
+                                         3 * width, QImage.Format.Format_RGB888)
+        return self._display_buffer
+        
+    def set_frame(self, frame, live=False):
         self.current_frame = frame
+        self.live_video = live
+        self._scaled_pixmap = None
+        if frame is self._display_buffer:
+            self.current_image = self._display_image
+        else:
+            self.current_image = self.to_qimage(frame)
         self.update()
         
+    def to_qimage(self, frame):
+        """Wrap an RGB frame in a QImage; the frame must outlive the image"""
+        frame = np.ascontiguousarray(frame)
+        self.current_frame = frame
+        height, width, channel = frame.shape
+        return QImage(frame.data, width, height, 3 * width, QImage.Format.Format_RGB888)
+        
+    def resizeEvent(self, event):
+        # Widget size changed - the cached transform and pixmap are stale
+        self._display_rect_key = None
+        self._scaled_pixmap = None
+        super().resizeEvent(event)
+        
     def paintEvent(self, event):
         if self.current_frame is not None:
+            paint_start = time.perf_counter()
             painter = QPainter(self)
+            target_rect = self.get_scaled_pixmap_rect()
             
-            height, width, channel = self.current_frame.shape
-            bytes_per_line = 3 * width
-            q_image = QImage(self.current_frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-            pixmap = QPixmap.fromImage(q_image)
-            
-            scaled_pixmap = pixmap.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            painter.drawPixmap(0, 0, scaled_pixmap)
+            if self.live_video:
+                # Frame changes every paint: scale straight from the QImage
+                painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, False)
+                painter.drawImage(target_rect, self.current_image)
+            else:
+                if self._scaled_pixmap is None:
+                    self._scaled_pixmap = QPixmap.fromImage(self.current_image).scaled(
+                        target_rect.size(), Qt.AspectRatioMode.IgnoreAspectRatio,
+                        Qt.TransformationMode.SmoothTransformation)
+                painter.drawPixmap(target_rect.topLeft(), self._scaled_pixmap)
             
             if self.roi_visible and self.roi_start and self.roi_end:
                 pen = QPen(QColor(0, 255, 0), 2)
                 painter.setPen(pen)
                 painter.drawRect(QRect(self.roi_start, self.roi_end))
                 
+            painter.end()
+            metrics.record('display.paint', (time.perf_counter() - paint_start) * 1000)
+            
+        if self.highlighted:
+            # Active tile of a multi-stream view
+            painter = QPainter(self)
+            painter.setPen(QPen(QColor(0, 120, 215), 3))
+            painter.drawRect(self.rect().adjusted(1, 1, -2, -2))
+            painter.end()
+                
     def mousePressEvent(self, event):
+        self.activated.emit()
         if event.button() == Qt.MouseButton.LeftButton:
             if self.selecting_roi:
                 self.roi_start = event.pos()
@@ -77,6 +141,10 @@ class VideoWidget(QWidget):
             return False
         return abs(pos.x() - corner.x()) < 10 and abs(pos.y() - corner.y()) < 10
         
+    def set_highlighted(self, highlighted):
+        self.highlighted = highlighted
+        self.update()
+        
     def clear_roi(self):
         self.roi_start = None
         self.roi_end = None
@@ -88,22 +156,27 @@ class VideoWidget(QWidget):
         self.update()
         
     def get_scaled_pixmap_rect(self):
-        """Get the rectangle where the scaled pixmap is drawn"""
+        """Get the rectangle where the scaled frame is drawn
+        
+        Only recomputed when the frame resolution or widget size changes.
+        """
         if self.current_frame is None:
             return None
             
-        height, width, channel = self.current_frame.shape
-        bytes_per_line = 3 * width
-        q_image = QImage(self.current_frame.data, width, height, bytes_per_line, QImage.Format.Format_RGB888)
-        pixmap = QPixmap.fromImage(q_image)
-        
-        scaled_pixmap = pixmap.scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-        
-        # Calculate the position where the scaled pixmap is drawn
-        x_offset = (self.width() - scaled_pixmap.width()) // 2
-        y_offset = (self.height() - scaled_pixmap.height()) // 2
-        
-        return QRect(x_offset, y_offset, scaled_pixmap.width(), scaled_pixmap.height())
+        height, width = self.current_frame.shape[:2]
+        key = (width, height, self.width(), self.height())
+        if key != self._display_rect_key:
+            # Same aspect-ratio fit as QPixmap.scaled(..., KeepAspectRatio)
+            scaled_size = QSize(width, height).scaled(self.size(), Qt.AspectRatioMode.KeepAspectRatio)
+            
+            # Calculate the position where the scaled frame is drawn (centred)
+            x_offset = (self.width() - scaled_size.width()) // 2
+            y_offset = (self.height() - scaled_size.height()) // 2
+            
+            self._display_rect = QRect(x_offset, y_offset, scaled_size.width(), scaled_size.height())
+            self._display_rect_key = key
+            
+        return self._display_rect
         
     def widget_to_frame_coordinates(self, widget_pos):
         """Convert widget coordinates to frame coordinates"""
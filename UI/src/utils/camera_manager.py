@@ -1,98 +1,262 @@
 import cv2
+import glob
+import logging
+import os
 import platform
+import re
+import threading
+import time
+from PySide6.QtCore import QObject, Signal
 from PySide6.QtWidgets import QInputDialog, QMessageBox
 
-class CameraManager:
+logger = logging.getLogger(__name__)
+
+class CameraManager(QObject):
+    """Discovers cameras and keeps a cached inventory of the working ones.
+
+    Devices are probed concurrently on daemon threads, each with its own
+    timeout, so one slow or hung device neither delays the others nor keeps
+    the application from exiting. On Linux the candidates are the
+    /dev/video* capture nodes rather than blind indices, and the cache is
+    invalidated when that set of nodes changes (hotplug); elsewhere the
+    inventory expires after cache_ttl seconds. Lookups never wait for a
+    probe: the inventory is rebuilt in the background and inventory_updated
+    is emitted when it is ready.
+    """
+
+    inventory_updated = Signal(object)  # camera info dicts keyed by index
+
     def __init__(self):
+        super().__init__()
         self.is_linux = platform.system() == 'Linux'
-        
-    def list_available_cameras(self):
-        available_cameras = []
+
+        try:
+            from hardware_config import hardware_config
+            settings = hardware_config.get_camera_discovery_settings()
+        except ImportError:
+            settings = {'probe_timeout': 3.0, 'max_probe_index': 4, 'cache_ttl': 60.0, 'probe_workers': 4}
+        self.probe_timeout = settings['probe_timeout']
+        self.max_probe_index = settings['max_probe_index']
+        self.cache_ttl = settings['cache_ttl']
+        self.probe_workers = settings['probe_workers']
+
+        self._lock = threading.Lock()
+        self._inventory = None          # index -> camera info dict
+        self._inventory_time = 0.0
+        self._inventory_signature = None
+        self._refresh_thread = None
+
+    def list_available_cameras(self, refresh=False):
+        """Working cameras as (path, name) pairs, probing now if the cache is stale"""
+        inventory = self.get_inventory(refresh=refresh)
+        if inventory is None:
+            inventory = self.refresh_inventory()
+        return [(str(info['index']), info['name']) for info in inventory.values()]
+
+    def get_inventory(self, refresh=False):
+        """Cached camera info dicts keyed by index, without blocking
+
+        Returns None if the cache is missing or stale; a background refresh
+        is then started and inventory_updated is emitted when it finishes.
+        """
+        with self._lock:
+            if not refresh and self._inventory is not None and self.is_inventory_current():
+                return dict(self._inventory)
+
+        self.refresh_async()
+        return None
+
+    def refresh_inventory(self):
+        """Probe every candidate device concurrently and replace the cache"""
+        signature = self.device_signature()
+        candidates = self.enumerate_devices()
+
+        start_time = time.perf_counter()
+        results = self.probe_all(candidates)
+        inventory = {info['index']: info for info in results.values() if info is not None}
+
+        inventory = dict(sorted(inventory.items()))
+        with self._lock:
+            self._inventory = inventory
+            self._inventory_time = time.time()
+            self._inventory_signature = signature
+        logger.info("Found %d camera(s) in %.2fs: %s", len(inventory),
+                    time.perf_counter() - start_time, [info['name'] for info in inventory.values()])
+        self.inventory_updated.emit(dict(inventory))
+        return dict(inventory)
+
+    def probe_all(self, candidates):
+        """Probe (index, name) candidates concurrently, giving up after probe_timeout
+
+        Returns index -> info (None if the camera does not work). Probes run
+        on daemon threads: a hung VideoCapture is abandoned, not waited for,
+        and does not hold up interpreter exit.
+        """
+        results = {}
+        slots = threading.BoundedSemaphore(max(1, self.probe_workers))
+
+        def probe(index, name):
+            with slots:
+                results[index] = self.probe_camera(index, name)
+
+        threads = []
+        for index, name in candidates:
+            thread = threading.Thread(target=probe, args=(index, name), name=f"CameraProbe-{index}")
+            thread.daemon = True
+            thread.start()
+            threads.append((index, thread))
+
+        deadline = time.monotonic() + self.probe_timeout
+        for index, thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                logger.warning("⚠️ Camera %s did not respond within %.1fs", index, self.probe_timeout)
+        return {index: results.get(index) for index, _ in threads}
+
+    def refresh_async(self):
+        """Build the inventory on a background thread (e.g. at startup)"""
+        if self._refresh_thread is not None and self._refresh_thread.is_alive():
+            return
+        self._refresh_thread = threading.Thread(target=self.refresh_inventory, name="CameraDiscovery")
+        self._refresh_thread.daemon = True
+        self._refresh_thread.start()
+
+    def invalidate(self):
+        """Drop the cached inventory; the next lookup probes again"""
+        with self._lock:
+            self._inventory = None
+
+    def is_inventory_current(self):
+        if self.is_linux:
+            # Device nodes appear and disappear with hotplug
+            return self._inventory_signature == self.device_signature()
+        return time.time() - self._inventory_time < self.cache_ttl
+
+    def device_signature(self):
+        """Cheap fingerprint of the attached devices (Linux only)"""
+        if not self.is_linux:
+            return None
+        return tuple(sorted(glob.glob('/dev/video*')))
+
+    def enumerate_devices(self):
+        """Candidate (index, name) pairs to probe"""
+        if not self.is_linux or not os.path.isdir('/sys/class/video4linux'):
+            return [(index, f"Camera {index}") for index in range(self.max_probe_index)]
+
+        devices = []
+        for path in glob.glob('/dev/video*'):
+            match = re.fullmatch(r'/dev/video(\d+)', path)
+            if not match:
+                continue
+            index = int(match.group(1))
+            sysfs = f"/sys/class/video4linux/video{index}"
+            # UVC cameras also expose metadata nodes (index != 0) that cannot capture
+            if self.read_sysfs(f"{sysfs}/index") not in (None, '0'):
+                continue
+            name = self.read_sysfs(f"{sysfs}/name") or f"Camera {index}"
+            devices.append((index, name))
+        return sorted(devices)
+
+    def read_sysfs(self, path):
+        try:
+            with open(path) as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def open_capture(self, camera_index):
+        """Open a camera with the backend open/read timeouts set where supported"""
+        timeout_ms = int(self.probe_timeout * 1000)
+        try:
+            return cv2.VideoCapture(int(camera_index), cv2.CAP_ANY,
+                                    [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                                     cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms])
+        except (AttributeError, TypeError, cv2.error):
+            # OpenCV without capture parameters
+            return cv2.VideoCapture(int(camera_index))
+
+    def probe_camera(self, camera_index, name=None):
+        """Open a camera, read one frame and return its info, or None if it does not work"""
+        cap = None
         try:
-            # Try a range of camera indices with better error handling
-            for i in range(4):  # Try more camera indices
-                try:
-                    cap = cv2.VideoCapture(i)
-                    if cap.isOpened():
-                        # Try to read a frame to verify the camera works
-                        ret, frame = cap.read()
-                        if ret and frame is not None:
-                            name = f"Camera {i}"
-                            path = str(i)
-                            available_cameras.append((path, name))
-                            print(f"Found camera: {name} at index {i}")
-                        cap.release()
-                    else:
-                        cap.release()
-                except Exception as e:
-                    print(f"Error testing camera {i}: {str(e)}")
-                    continue
-                    
+            cap = self.open_capture(camera_index)
+            if not cap.isOpened():
+                return None
+            ret, frame = cap.read()
+            if not ret or frame is None:
+                logger.debug("Camera %s opened but cannot read frames", camera_index)
+                return None
+            return {
+                'index': int(camera_index),
+                'name': name or f"Camera {camera_index}",
+                'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                'fps': int(cap.get(cv2.CAP_PROP_FPS))
+            }
         except Exception as e:
-            print(f"Error listing cameras: {str(e)}")
-        
-        return available_cameras
-        
-    def select_camera_dialog(self, parent):
-        available_cameras = self.list_available_cameras()
-        if available_cameras:
-            camera_names = [f"Camera {i}" for i in range(len(available_cameras))]
-            camera_index, ok = QInputDialog.getItem(parent, "Select Camera", 
-                                                  "Choose a camera:", 
-                                                  camera_names, 
-                                                  0, False)
+            logger.error("Error testing camera %s: %s", camera_index, e)
+            return None
+        finally:
+            if cap is not None:
+                cap.release()
+
+    def select_camera_dialog(self, parent, inventory, in_use=()):
+        """Ask the user for a camera from the inventory; returns its index or None
+
+        Cameras in in_use (opened by a running stream) stay listed even if the
+        inventory is refreshed while they are busy.
+        """
+        inventory = dict(inventory)
+        for index in in_use:
+            if index is not None and index not in inventory:
+                inventory[index] = {'index': index, 'name': f"Camera {index}",
+                                    'width': 0, 'height': 0, 'fps': 0}
+
+        if inventory:
+            labels = {self.describe(info): index for index, info in sorted(inventory.items())}
+            label, ok = QInputDialog.getItem(parent, "Select Camera",
+                                             "Choose a camera:",
+                                             list(labels),
+                                             0, False)
             if ok:
-                try:
-                    camera_num = int(camera_index.split()[-1])
-                    return camera_num
-                except ValueError:
-                    QMessageBox.warning(parent, "Error", "Invalid camera selection")
-                    return None
+                return labels[label]
+            return None
         else:
-            QMessageBox.warning(parent, "No Cameras", 
+            QMessageBox.warning(parent, "No Cameras",
                               "No cameras found. Please check:\n"
                               "1. Camera is connected\n"
                               "2. Camera drivers are installed\n"
                               "3. No other application is using the camera")
+            # Probe again next time - the user may be fixing the problem
+            self.invalidate()
             return None
-            
+
+    def describe(self, info):
+        text = f"{info['index']}: {info['name']}"
+        if info['width'] and info['height']:
+            text += f" ({info['width']}x{info['height']}"
+            text += f" @ {info['fps']} fps)" if info['fps'] else ")"
+        return text
+
     def get_camera_info(self, camera_index):
-        try:
-            cap = cv2.VideoCapture(camera_index)
-            if cap.isOpened():
-                # Try to read a frame first
-                ret, frame = cap.read()
-                if not ret:
-                    print(f"Camera {camera_index} opened but cannot read frames")
-                    cap.release()
-                    return None
-                    
-                width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-                fps = int(cap.get(cv2.CAP_PROP_FPS))
-                cap.release()
-                return {
-                    'width': width,
-                    'height': height,
-                    'fps': fps,
-                    'index': camera_index
-                }
-            else:
-                print(f"Failed to open camera {camera_index}")
-        except Exception as e:
-            print(f"Error getting camera info: {str(e)}")
-        return None
-        
+        """Cached info of a camera, probing it only if it is not in the inventory"""
+        with self._lock:
+            if self._inventory is not None and int(camera_index) in self._inventory:
+                return dict(self._inventory[int(camera_index)])
+
+        info = self.probe_with_timeout(camera_index)
+        if info is not None:
+            with self._lock:
+                if self._inventory is not None:
+                    self._inventory[info['index']] = info
+        else:
+            logger.warning("Failed to open camera %s", camera_index)
+        return info
+
     def test_camera_connection(self, camera_index):
         """Test if a camera can be opened and read from"""
-        try:
-            cap = cv2.VideoCapture(camera_index)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                cap.release()
-                return ret and frame is not None
-            else:
-                return False
-        except Exception as e:
-            print(f"Error testing camera {camera_index}: {str(e)}")
-            return False 
\ No newline at end of file
+        return self.probe_with_timeout(camera_index) is not None
+
+    def probe_with_timeout(self, camera_index):
+        """Probe one camera, giving up after probe_timeout"""
+        return self.probe_all([(int(camera_index), None)])[int(camera_index)]
@@ -1,58 +1,495 @@
 import sqlite3
 import datetime
+import logging
 import os
+import queue
+import threading
+import time
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+def _create_faults_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS faults (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            fault_type TEXT,
+            image_index INTEGER,
+            details TEXT,
+            measurement REAL
+        )
+    ''')
+
+def _add_capture_columns(conn):
+    # Databases opened by earlier builds may already have these columns
+    _add_column(conn, 'frame_sequence', 'INTEGER')
+    _add_column(conn, 'image_path', 'TEXT')
+
+def _add_indexed_time_columns(conn):
+    _add_column(conn, 'ts_ms', 'INTEGER')
+    _add_column(conn, 'camera_id', 'INTEGER')
+    _add_column(conn, 'roi', 'TEXT')
+    # Text timestamps are local time; 'utc' converts them to the epoch
+    conn.execute('''
+        UPDATE faults SET ts_ms = CAST(strftime('%s', timestamp, 'utc') AS INTEGER) * 1000
+        WHERE ts_ms IS NULL AND timestamp IS NOT NULL
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_faults_ts ON faults (ts_ms)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_faults_type_ts ON faults (fault_type, ts_ms)')
+
+def _add_hourly_rollup(conn):
+    _add_column(conn, 'deviation', 'REAL')
+    # One row per local hour, camera (-1 when unknown) and fault type,
+    # kept up to date by the writer thread
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS fault_hourly (
+            hour_start INTEGER,
+            camera_id INTEGER,
+            fault_type TEXT,
+            count INTEGER,
+            deviation_count INTEGER,
+            deviation_sum REAL,
+            deviation_max REAL,
+            PRIMARY KEY (hour_start, camera_id, fault_type)
+        )
+    ''')
+    conn.execute('''
+        INSERT OR REPLACE INTO fault_hourly
+        SELECT CAST(strftime('%s', strftime('%Y-%m-%d %H:00:00', timestamp), 'utc') AS INTEGER) * 1000,
+               IFNULL(camera_id, -1), fault_type, COUNT(*), COUNT(deviation), IFNULL(SUM(deviation), 0),
+               MAX(deviation)
+        FROM faults WHERE timestamp IS NOT NULL GROUP BY 1, 2, 3
+    ''')
+
+def _add_column(conn, name, column_type):
+    columns = [row[1] for row in conn.execute('PRAGMA table_info(faults)')]
+    if name not in columns:
+        conn.execute(f'ALTER TABLE faults ADD COLUMN {name} {column_type}')
+
+# Schema migrations in order; the database's PRAGMA user_version is the
+# number of migrations applied. Append new migrations, never edit old ones.
+MIGRATIONS = [
+    _create_faults_table,
+    _add_capture_columns,
+    _add_indexed_time_columns,
+    _add_hourly_rollup
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
 
 class DatabaseManager:
-    def __init__(self, db_path='faults.db'):
+    """SQLite fault log with a long-lived WAL connection and batched writes.
+
+    log_fault() only enqueues the row; a background writer thread inserts
+    queued rows with executemany() once batch_size rows are waiting or
+    flush_interval seconds have passed since the oldest one was queued.
+    Reads flush pending rows first so they always see everything logged.
+
+    The same transaction adds each batch to the fault_hourly rollup
+    (counts and angle deviation per hour, camera and fault type), so
+    hourly and shift statistics read one row per bucket instead of
+    scanning the faults.
+    """
+
+    def __init__(self, db_path='faults.db', batch_size=50, flush_interval=1.0):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._conn = None
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._writer_thread = None
+        self._writer_running = False
+        # Guards _closed so no row is queued once close() has begun
+        self._close_lock = threading.Lock()
+        self._closed = False
+        self._connection_closed = False
+
+        # Statistics
+        self.rows_written = 0
+        self.batches_written = 0
+        self.write_errors = 0
+
         self.init_database()
-        
+        self.start_writer()
+
+    def _get_connection(self):
+        """Return the shared connection, opening and tuning it on first use"""
+        with self._lock:
+            if self._connection_closed:
+                # Never reopen behind close()
+                raise sqlite3.ProgrammingError("Fault database is closed")
+            if self._conn is None:
+                self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._conn.execute('PRAGMA journal_mode=WAL')
+                # NORMAL is durable across application crashes in WAL mode and
+                # avoids an fsync on every commit
+                self._conn.execute('PRAGMA synchronous=NORMAL')
+            return self._conn
+
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS faults (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT,
-                fault_type TEXT,
-                image_index INTEGER,
-                details TEXT,
-                measurement REAL
-            )
-        ''')
-        conn.commit()
-        conn.close()
-        
-    def log_fault(self, fault_type, image_index, details, measurement=None):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO faults (timestamp, fault_type, image_index, details, measurement)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 
-              fault_type, image_index, details, measurement))
-        conn.commit()
-        conn.close()
-        
+        """Create the schema or migrate an older database to SCHEMA_VERSION"""
+        with self._lock:
+            conn = self._get_connection()
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version > SCHEMA_VERSION:
+                raise RuntimeError(f"Fault database {self.db_path} has schema version {version}, "
+                                   f"newer than this application ({SCHEMA_VERSION})")
+
+            for version in range(version, SCHEMA_VERSION):
+                # Each migration and its version bump commit together
+                start_time = time.perf_counter()
+                conn.execute('BEGIN')
+                try:
+                    MIGRATIONS[version](conn)
+                    conn.execute(f'PRAGMA user_version = {version + 1}')
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logger.info("Fault database migrated to schema version %d (%.0fms)",
+                            version + 1, (time.perf_counter() - start_time) * 1000)
+
+    def start_writer(self):
+        """Start the background writer thread if it is not already running"""
+        if self._writer_thread and self._writer_thread.is_alive():
+            return
+
+        self._writer_running = True
+        self._writer_thread = threading.Thread(target=self._writer_loop, name="DatabaseWriter")
+        self._writer_thread.daemon = True
+        self._writer_thread.start()
+
+    def log_fault(self, fault_type, image_index, details, measurement=None,
+                  timestamp=None, frame_sequence=None, image_path=None, camera_id=None, roi=None,
+                  deviation=None):
+        """Queue a fault row; timestamp (datetime) defaults to now, e.g. pass the capture time
+
+        camera_id is the stream the fault was seen on, roi its (x1, y1, x2, y2)
+        bounds and deviation the angle's distance from the standard angle.
+        """
+        if timestamp is None:
+            timestamp = datetime.datetime.now()
+        if roi is not None:
+            roi = ','.join(str(int(value)) for value in roi)
+        row = (timestamp.strftime("%Y-%m-%d %H:%M:%S"), int(timestamp.timestamp() * 1000),
+               fault_type, image_index, details, measurement, frame_sequence, image_path, camera_id, roi,
+               deviation)
+
+        with self._close_lock:
+            if self._closed:
+                logger.warning("⚠️ Fault not logged, database is closed: %s", details)
+                return
+            if self._writer_running:
+                self._queue.put(('row', row))
+                return
+        # Writer not running - write directly
+        self._write_rows([row])
+
+    def flush(self, timeout=5.0):
+        """Block until every row queued so far has been committed"""
+        with self._close_lock:
+            if self._closed or not self._writer_running:
+                return True
+            done = threading.Event()
+            self._queue.put(('flush', done))
+        return done.wait(timeout)
+
+    def close(self):
+        """Write pending rows, stop the writer and close the connection
+
+        Rows logged after close() has begun are dropped with a warning.
+        """
+        with self._close_lock:
+            if self._closed:
+                return
+            # Nothing is queued after the stop request, so the writer sees every row
+            self._closed = True
+            if self._writer_thread:
+                self._queue.put(('stop', None))
+
+        if self._writer_thread:
+            self._writer_thread.join(timeout=5.0)
+            if self._writer_thread.is_alive():
+                logger.error("❌ Database writer did not stop within 5s")
+            self._writer_thread = None
+        self._writer_running = False
+
+        with self._lock:
+            self._connection_closed = True
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _writer_loop(self):
+        pending = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                kind, payload = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                kind, payload = None, None
+
+            if kind == 'row':
+                pending.append(payload)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            # Flush on size, age, explicit request or shutdown
+            if pending and (kind in ('flush', 'stop') or
+                            len(pending) >= self.batch_size or
+                            time.monotonic() >= deadline):
+                self._write_rows(pending)
+                pending = []
+                deadline = None
+
+            if kind == 'flush':
+                payload.set()
+            elif kind == 'stop':
+                break
+
+    def _write_rows(self, rows):
+        try:
+            start_time = time.perf_counter()
+            with self._lock:
+                conn = self._get_connection()
+                try:
+                    conn.executemany('''
+                        INSERT INTO faults (timestamp, ts_ms, fault_type, image_index, details, measurement,
+                                            frame_sequence, image_path, camera_id, roi, deviation)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ''', rows)
+                    # The rollup commits with the faults it counts
+                    conn.executemany('''
+                        INSERT INTO fault_hourly VALUES (?, ?, ?, ?, ?, ?, ?)
+                        ON CONFLICT (hour_start, camera_id, fault_type) DO UPDATE SET
+                            count = count + excluded.count,
+                            deviation_count = deviation_count + excluded.deviation_count,
+                            deviation_sum = deviation_sum + excluded.deviation_sum,
+                            deviation_max = MAX(IFNULL(deviation_max, excluded.deviation_max),
+                                                IFNULL(excluded.deviation_max, deviation_max))
+                    ''', self._hourly_buckets(rows))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+            metrics.record('database.write', (time.perf_counter() - start_time) * 1000)
+            self.rows_written += len(rows)
+            self.batches_written += 1
+        except Exception as e:
+            self.write_errors += 1
+            logger.error("❌ Database write error (%d rows lost): %s", len(rows), e)
+
+    def _hourly_buckets(self, rows):
+        """Aggregate a batch of fault rows into fault_hourly rows"""
+        buckets = {}
+        for row in rows:
+            ts_ms, fault_type, camera_id, deviation = row[1], row[2], row[8], row[10]
+            hour_start = datetime.datetime.fromtimestamp(ts_ms / 1000).replace(minute=0, second=0, microsecond=0)
+            key = (int(hour_start.timestamp() * 1000), -1 if camera_id is None else camera_id, fault_type)
+            bucket = buckets.setdefault(key, [0, 0, 0.0, None])
+            bucket[0] += 1
+            if deviation is not None:
+                bucket[1] += 1
+                bucket[2] += deviation
+                bucket[3] = deviation if bucket[3] is None else max(bucket[3], deviation)
+        return [key + tuple(bucket) for key, bucket in buckets.items()]
+
     def get_all_faults(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM faults ORDER BY timestamp DESC')
-        faults = cursor.fetchall()
-        conn.close()
-        return faults
-        
+        """Every fault as a tuple; loads the whole table, prefer iter_faults() for history"""
+        self.flush()
+        with self._lock:
+            cursor = self._get_connection().cursor()
+            cursor.execute('SELECT * FROM faults ORDER BY ts_ms DESC')
+            return cursor.fetchall()
+
     def get_faults_by_type(self, fault_type):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM faults WHERE fault_type = ? ORDER BY timestamp DESC', (fault_type,))
-        faults = cursor.fetchall()
-        conn.close()
-        return faults
-        
+        self.flush()
+        with self._lock:
+            cursor = self._get_connection().cursor()
+            cursor.execute('SELECT * FROM faults WHERE fault_type = ? ORDER BY ts_ms DESC', (fault_type,))
+            return cursor.fetchall()
+
+    def get_max_fault_id(self):
+        """Id of the newest fault (0 if there are none)"""
+        self.flush()
+        with self._lock:
+            row = self._get_connection().execute('SELECT MAX(id) FROM faults').fetchone()
+            return row[0] or 0
+
+    def _fault_filter(self, max_id=None, start=None, end=None, min_angle=None, max_angle=None,
+                      fault_type=None, camera_id=None, before=None):
+        """WHERE clause and parameters for the fault query filters"""
+        clauses, params = [], []
+        if before is not None:
+            # Keyset: rows after the (ts_ms, id) of the last row of the previous page
+            clauses.append('(ts_ms, id) < (?, ?)')
+            params.extend(before)
+        if max_id is not None:
+            clauses.append('id <= ?')
+            params.append(max_id)
+        if fault_type is not None:
+            clauses.append('fault_type = ?')
+            params.append(fault_type)
+        if camera_id is not None:
+            clauses.append('camera_id = ?')
+            params.append(camera_id)
+        # Time ranges use the indexed epoch column
+        if start is not None:
+            clauses.append('ts_ms >= ?')
+            params.append(int(start.timestamp() * 1000))
+        if end is not None:
+            clauses.append('ts_ms <= ?')
+            params.append(int(end.timestamp() * 1000))
+        if min_angle is not None:
+            clauses.append('measurement >= ?')
+            params.append(min_angle)
+        if max_angle is not None:
+            clauses.append('measurement <= ?')
+            params.append(max_angle)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def query_faults(self, limit=200, before=None, **filters):
+        """One page of faults, newest (capture time) first, as dicts.
+
+        Pages are keyset paginated: pass before=page_cursor(last_row) to get
+        the next page, which costs the same however deep into the history it
+        is (unlike OFFSET, which reads and discards every skipped row).
+
+        Filters: max_id (ignore faults logged later), start/end (datetimes),
+        min_angle/max_angle (measurement range), fault_type and camera_id.
+        """
+        self.flush()
+        return self._query_page(limit, before, filters)
+
+    def iter_faults(self, batch_size=500, **filters):
+        """Yield matching faults newest first, reading batch_size rows at a time
+
+        Only one batch is held in memory and the connection is released
+        between batches, so the writer thread is not blocked while a caller
+        works through a long history (e.g. an export).
+        """
+        self.flush()
+        before = None
+        while True:
+            rows = self._query_page(batch_size, before, filters)
+            yield from rows
+            if len(rows) < batch_size:
+                return
+            before = self.page_cursor(rows[-1])
+
+    def page_cursor(self, row):
+        """Keyset cursor of a query_faults row, for the next page's before"""
+        return (row['ts_ms'], row['id'])
+
+    def _query_page(self, limit, before, filters):
+        where, params = self._fault_filter(before=before, **filters)
+        with self._lock:
+            cursor = self._get_connection().execute(
+                'SELECT id, timestamp, ts_ms, fault_type, details, measurement, deviation, frame_sequence, '
+                f'image_path, camera_id, roi FROM faults{where} ORDER BY ts_ms DESC, id DESC LIMIT ?', params + [limit])
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def count_faults(self, **filters):
+        """Number of faults matching the query_faults filters"""
+        where, params = self._fault_filter(**filters)
+        self.flush()
+        with self._lock:
+            return self._get_connection().execute(f'SELECT COUNT(*) FROM faults{where}', params).fetchone()[0]
+
+    def get_hourly_stats(self, start=None, end=None, camera_id=None, fault_type=None, by_camera=False):
+        """Fault counts and angle deviation per hour, oldest first, from the rollup
+
+        start/end (datetimes) select the hours that begin within them. With
+        by_camera each camera gets its own rows, otherwise cameras are summed.
+        Returns dicts with start (datetime), camera_id, count, deviation_count,
+        deviation_sum, mean_deviation and max_deviation.
+        """
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('hour_start >= ?')
+            params.append(int(start.timestamp() * 1000))
+        if end is not None:
+            clauses.append('hour_start <= ?')
+            params.append(int(end.timestamp() * 1000))
+        if camera_id is not None:
+            clauses.append('camera_id = ?')
+            params.append(camera_id)
+        if fault_type is not None:
+            clauses.append('fault_type = ?')
+            params.append(fault_type)
+        where = (' WHERE ' + ' AND '.join(clauses)) if clauses else ''
+        group = 'hour_start, camera_id' if by_camera else 'hour_start'
+
+        self.flush()
+        with self._lock:
+            rows = self._get_connection().execute(
+                f'SELECT hour_start, {"camera_id" if by_camera else "NULL"}, SUM(count), SUM(deviation_count), '
+                f'SUM(deviation_sum), MAX(deviation_max) FROM fault_hourly{where} '
+                f'GROUP BY {group} ORDER BY {group}', params).fetchall()
+        return [self._stats_row(datetime.datetime.fromtimestamp(hour_start / 1000), camera_id,
+                                count, deviation_count, deviation_sum, deviation_max)
+                for hour_start, camera_id, count, deviation_count, deviation_sum, deviation_max in rows]
+
+    def get_shift_stats(self, shift_starts, start=None, end=None, camera_id=None, fault_type=None,
+                        by_camera=False):
+        """Fault counts and angle deviation per shift, oldest first
+
+        shift_starts are the local hours shifts begin at (e.g. [6, 14, 22]);
+        a shift runs until the next one starts. Shifts are summed from the
+        hourly rollup, so shift times can change without rewriting data.
+        Rows are as get_hourly_stats, plus shift (1-based number of the day's shift).
+        """
+        shift_starts = sorted(shift_starts)
+        shifts = {}
+        for hour in self.get_hourly_stats(start, end, camera_id, fault_type, by_camera):
+            hour_start = hour['start']
+            earlier = [shift_hour for shift_hour in shift_starts if shift_hour <= hour_start.hour]
+            if earlier:
+                shift, day = len(earlier), hour_start.date()
+            else:
+                # Before the first shift of the day: the previous day's last shift
+                shift, day = len(shift_starts), hour_start.date() - datetime.timedelta(days=1)
+            shift_start = datetime.datetime.combine(day, datetime.time(shift_starts[shift - 1]))
+
+            key = (shift_start, hour['camera_id'])
+            totals = shifts.setdefault(key, {'shift': shift, 'count': 0, 'deviation_count': 0,
+                                             'deviation_sum': 0.0, 'max_deviation': None})
+            totals['count'] += hour['count']
+            totals['deviation_count'] += hour['deviation_count']
+            totals['deviation_sum'] += hour['deviation_sum']
+            if hour['max_deviation'] is not None:
+                totals['max_deviation'] = max(totals['max_deviation'] or 0.0, hour['max_deviation'])
+
+        results = []
+        for (shift_start, shift_camera), totals in sorted(shifts.items(), key=lambda item: (item[0][0], item[0][1] or 0)):
+            row = self._stats_row(shift_start, shift_camera, totals['count'], totals['deviation_count'],
+                                  totals['deviation_sum'], totals['max_deviation'])
+            row['shift'] = totals['shift']
+            results.append(row)
+        return results
+
+    def _stats_row(self, start, camera_id, count, deviation_count, deviation_sum, deviation_max):
+        return {
+            'start': start,
+            'camera_id': None if camera_id is None or camera_id < 0 else camera_id,
+            'count': count,
+            'deviation_count': deviation_count,
+            'deviation_sum': deviation_sum,
+            'mean_deviation': deviation_sum / deviation_count if deviation_count else None,
+            'max_deviation': deviation_max
+        }
+
     def clear_faults(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM faults')
-        conn.commit()
-        conn.close() 
\ No newline at end of file
+        self.flush()
+        with self._lock:
+            conn = self._get_connection()
+            conn.execute('DELETE FROM faults')
+            conn.execute('DELETE FROM fault_hourly')
+            conn.commit()
@@ -0,0 +1,157 @@
+"""
+Recent defect history: a fixed-size ring buffer backed by the fault database.
+"""
+import datetime
+import logging
+import threading
+from typing import Optional, Dict, Any, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DTYPE = np.dtype([
+    ('captured_at', np.float64),    # Capture time, seconds since the epoch
+    ('angle', np.float32),
+    ('frame_sequence', np.int64),   # -1 when unknown
+    ('stream_id', np.int16)         # -1 when unknown
+])
+
+class DefectHistory:
+    """The most recent defects in a fixed-capacity ring buffer.
+
+    Numeric fields live in one preallocated numpy record array and image
+    paths in a list of the same length, so memory stays constant however
+    long the station runs. Every defect is also logged to the fault
+    database; queries reaching back past the oldest entry still held are
+    answered from there instead.
+    """
+
+    def __init__(self, capacity: int = 2048, database_manager=None):
+        """
+        Args:
+            capacity: Number of recent defects kept in memory
+            database_manager: DatabaseManager queried for older defects
+        """
+        self.capacity = capacity
+        self.database_manager = database_manager
+        self._records = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._image_paths = [None] * capacity
+        self._next = 0                  # Slot the next defect is written to
+        self._size = 0
+        self._session_start = datetime.datetime.now().timestamp()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.total_count = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, defect: Dict[str, Any], stream_id: Optional[int] = None) -> None:
+        """Add a defect (dict from the detection engine), overwriting the oldest when full."""
+        captured_at = defect.get('captured_at') or datetime.datetime.now()
+        frame_sequence = defect.get('frame_sequence')
+        with self._lock:
+            slot = self._next
+            self._records[slot] = (captured_at.timestamp(),
+                                   defect.get('angle', np.nan),
+                                   -1 if frame_sequence is None else frame_sequence,
+                                   -1 if stream_id is None else stream_id)
+            self._image_paths[slot] = defect.get('image_path')
+            self._next = (slot + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            self.total_count += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._image_paths = [None] * self.capacity
+            self._next = 0
+            self._size = 0
+
+    def _ordered_slots(self) -> np.ndarray:
+        """Slot indices of the held defects, newest first."""
+        return (self._next - 1 - np.arange(self._size)) % self.capacity
+
+    def oldest_time(self) -> Optional[datetime.datetime]:
+        """Capture time of the oldest defect still in memory."""
+        with self._lock:
+            if self._size == 0:
+                return None
+            slot = (self._next - self._size) % self.capacity
+            return datetime.datetime.fromtimestamp(self._records['captured_at'][slot])
+
+    def is_complete_since(self, start: datetime.datetime) -> bool:
+        """True if no defect captured at or after start has been evicted."""
+        if self.total_count == self._size:
+            # Nothing evicted yet, but earlier sessions may have logged defects
+            return start.timestamp() >= self._session_start
+        oldest = self.oldest_time()
+        return oldest is not None and start >= oldest
+
+    def count_since(self, seconds: float, now: Optional[float] = None) -> int:
+        """Defects captured in the last seconds (limited to those in memory)."""
+        if now is None:
+            now = datetime.datetime.now().timestamp()
+        with self._lock:
+            captured = self._records['captured_at'][self._ordered_slots()]
+        return int(np.count_nonzero(captured >= now - seconds))
+
+    def query(self, start: Optional[datetime.datetime] = None, end: Optional[datetime.datetime] = None,
+              limit: int = 200, memory_only: bool = False) -> List[Dict[str, Any]]:
+        """
+        Defects captured between start and end, newest first.
+        Served from memory when the buffer still covers start, otherwise
+        from the fault database; either way as dicts with timestamp,
+        captured_at, angle, image_path, frame_sequence and stream_id.
+        memory_only never touches the database (which flushes pending
+        writes first), at the cost of missing defects no longer held.
+        """
+        if memory_only or (start is not None and self.is_complete_since(start)):
+            with self._lock:
+                slots = self._ordered_slots()
+                captured = self._records['captured_at'][slots]
+                mask = np.ones(len(slots), dtype=bool) if start is None else captured >= start.timestamp()
+                if end is not None:
+                    mask &= captured <= end.timestamp()
+                slots = slots[mask][:limit]
+                records = self._records[slots]
+                image_paths = [self._image_paths[slot] for slot in slots]
+            return [self._to_dict(record, image_path) for record, image_path in zip(records, image_paths)]
+
+        if self.database_manager is None:
+            return []
+        try:
+            rows = self.database_manager.query_faults(limit=limit, start=start, end=end)
+        except Exception as e:
+            logger.error("Error querying defect history: %s", e)
+            return []
+        return [{
+            'timestamp': row['timestamp'],
+            'captured_at': datetime.datetime.fromtimestamp(row['ts_ms'] / 1000) if row['ts_ms'] is not None else None,
+            'angle': row['measurement'],
+            'image_path': row['image_path'],
+            'frame_sequence': row['frame_sequence'],
+            # Faults are logged with the stream id as their camera id
+            'stream_id': row['camera_id']
+        } for row in rows]
+
+    def _to_dict(self, record, image_path) -> Dict[str, Any]:
+        captured_at = datetime.datetime.fromtimestamp(record['captured_at'])
+        return {
+            'timestamp': captured_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'captured_at': captured_at,
+            'angle': float(record['angle']),
+            'image_path': image_path,
+            'frame_sequence': None if record['frame_sequence'] < 0 else int(record['frame_sequence']),
+            'stream_id': None if record['stream_id'] < 0 else int(record['stream_id'])
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get history counters and memory use."""
+        return {
+            'held': self._size,
+            'capacity': self.capacity,
+            'total': self.total_count,
+            'memory_bytes': self._records.nbytes
+        }
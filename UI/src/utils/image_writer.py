@@ -0,0 +1,219 @@
+import cv2
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class DefectImageWriter:
+    """Encodes and saves defect images on a background thread.
+
+    Frames are queued with the filename they will be written to, so callers
+    get the image path back immediately and never pay for encoding or disk
+    I/O. The queue is bounded; when it is full the drop policy decides
+    whether the new frame (drop_newest: submit() returns False, so no path
+    is recorded), the caller (block) or the oldest queued frame gives way.
+    drop_oldest discards a frame whose path was already handed out, so use
+    it only where callers do not keep the paths.
+    """
+    CODEC_EXTENSIONS = {
+        'png': '.png',
+        'jpg': '.jpg',
+        'webp': '.webp'
+    }
+    DROP_POLICIES = ('drop_oldest', 'drop_newest', 'block')
+
+    def __init__(self, output_dir="defect_images", codec='png', png_compression=1,
+                 jpeg_quality=90, webp_quality=90, max_queue_size=16,
+                 drop_policy='drop_newest', max_images=None):
+        if codec not in self.CODEC_EXTENSIONS:
+            raise ValueError(f"Unsupported image codec: {codec}")
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(f"Unsupported drop policy: {drop_policy}")
+
+        self.output_dir = output_dir
+        self.codec = codec
+        self.png_compression = png_compression
+        self.jpeg_quality = jpeg_quality
+        self.webp_quality = webp_quality
+        self.drop_policy = drop_policy
+        self.max_images = max_images
+
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._sequence = 0
+        # Optional tag keeping names unique across writers sharing output_dir
+        self.filename_tag = None
+        # Images in output_dir at the last cleanup scan plus those written since
+        self._image_count = None
+
+        # Metrics
+        self._encode_times = deque(maxlen=100)
+        self.written_count = 0
+        self.dropped_count = 0
+        self.error_count = 0
+        self.max_queue_depth = 0
+
+    @property
+    def extension(self):
+        return self.CODEC_EXTENSIONS[self.codec]
+
+    def encode_params(self):
+        """OpenCV imwrite/imencode parameters for the configured codec"""
+        if self.codec == 'png':
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)]
+        if self.codec == 'jpg':
+            return [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)]
+        return [cv2.IMWRITE_WEBP_QUALITY, int(self.webp_quality)]
+
+    def next_filename(self, timestamp):
+        """Build a unique image path for a defect recorded at timestamp"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        tag = f"{self.filename_tag}_" if self.filename_tag else ""
+        return os.path.join(self.output_dir,
+                            f"defect_{timestamp.replace(':', '-').replace(' ', '_')}_{tag}{sequence:06d}{self.extension}")
+
+    def start(self):
+        """Start the writer thread if it is not already running"""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, name="DefectImageWriter")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, frame, filename):
+        """Queue a frame for saving; the caller must not modify it afterwards.
+
+        Returns:
+            True if the frame was queued, False if it was dropped
+        """
+        self.start()
+        item = (frame, filename)
+
+        if self.drop_policy == 'block':
+            self._queue.put(item)
+        else:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                if self.drop_policy == 'drop_newest':
+                    self.dropped_count += 1
+                    return False
+                # drop_oldest: make room by discarding the frame queued first
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped_count += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(item)
+                except queue.Full:
+                    self.dropped_count += 1
+                    return False
+
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return True
+
+    def _writer_loop(self):
+        while self._running:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    continue
+                self._write_image(*item)
+            finally:
+                self._queue.task_done()
+
+    def _write_image(self, frame, filename):
+        try:
+            if not os.path.exists(self.output_dir):
+                os.makedirs(self.output_dir)
+
+            # Ensure frame is in BGR format for saving
+            if len(frame.shape) != 3 or frame.shape[2] != 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+
+            start_time = time.perf_counter()
+            ok, encoded = cv2.imencode(self.extension, frame, self.encode_params())
+            self._encode_times.append(time.perf_counter() - start_time)
+            if not ok:
+                raise Exception(f"Failed to encode {self.codec} image")
+
+            with open(filename, 'wb') as file:
+                file.write(encoded.tobytes())
+            metrics.record('image.save', (time.perf_counter() - start_time) * 1000)
+            self.written_count += 1
+
+            # Enforce the retention limit here rather than on the detection path;
+            # the folder is only scanned once it may hold more than max_images
+            if self._image_count is not None:
+                self._image_count += 1
+            if self.max_images and (self._image_count is None or self._image_count > self.max_images):
+                self.cleanup_old_images()
+
+        except Exception as e:
+            self.error_count += 1
+            logger.error("❌ Error saving defect frame: %s", e)
+
+    def cleanup_old_images(self):
+        """Remove the oldest defect images beyond the retention limit"""
+        try:
+            if not self.max_images or not os.path.exists(self.output_dir):
+                return
+
+            extensions = tuple(self.CODEC_EXTENSIONS.values())
+            files = [f for f in os.listdir(self.output_dir) if f.startswith("defect_") and f.endswith(extensions)]
+
+            if len(files) > self.max_images:
+                # Sort by modification time (oldest first)
+                files.sort(key=lambda x: os.path.getmtime(os.path.join(self.output_dir, x)))
+
+                for file in files[:-self.max_images]:
+                    try:
+                        os.remove(os.path.join(self.output_dir, file))
+                    except Exception as e:
+                        logger.warning("⚠️ Error removing old defect image %s: %s", file, e)
+            self._image_count = min(len(files), self.max_images)
+
+        except Exception as e:
+            logger.error("❌ Error cleaning up defect images: %s", e)
+
+    def flush(self):
+        """Block until every queued image has been written"""
+        if self._thread and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self):
+        """Write out queued images and stop the writer thread"""
+        if not self._thread:
+            return
+        self.flush()
+        self._running = False
+        self._queue.put(None)
+        self._thread.join(timeout=5.0)
+        self._thread = None
+
+    def get_stats(self):
+        """Queue depth, encode time (milliseconds) and write/drop counters"""
+        encode_times = list(self._encode_times)
+        return {
+            'queue_depth': self._queue.qsize(),
+            'max_queue_depth': self.max_queue_depth,
+            'avg_encode_ms': sum(encode_times) / len(encode_times) * 1000 if encode_times else None,
+            'last_encode_ms': encode_times[-1] * 1000 if encode_times else None,
+            'written': self.written_count,
+            'dropped': self.dropped_count,
+            'errors': self.error_count
+        }
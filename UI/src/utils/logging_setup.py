@@ -0,0 +1,179 @@
+"""
+Application logging: level-gated, rate-limited and written off the hot threads.
+
+Loggers are plain `logging.getLogger(__name__)` loggers. configure_logging()
+installs a single queue handler on the root logger, so a logging call on the
+capture, detection or GUI thread only filters the record and puts it on a
+queue; formatting and console/file I/O happen on a QueueListener thread.
+
+Pass structured context with fields():
+
+    logger.info("Relay triggered", extra=fields(angle=angle, port=port))
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+_listener = None
+_queue_handler = None
+_rate_filter = None
+
+def fields(**values):
+    """Structured key/value context for a log record (pass as extra=)"""
+    return {'fields': values}
+
+class RateLimitFilter(logging.Filter):
+    """Allows at most `rate` records per call site every `period` seconds.
+
+    Records over the limit are dropped; the number dropped is attached to the
+    next record that gets through from the same call site. CRITICAL records
+    are never limited.
+    """
+
+    def __init__(self, rate=5, period=1.0):
+        super().__init__()
+        self.rate = rate
+        self.period = period
+        self._lock = threading.Lock()
+        self._sites = {}
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        if not self.rate or record.levelno >= logging.CRITICAL:
+            return True
+
+        site = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._sites.get(site, (now, 0, 0))
+            if now - window_start >= self.period:
+                window_start, count = now, 0
+            if count >= self.rate:
+                self._sites[site] = (window_start, count, suppressed + 1)
+                self.suppressed_total += 1
+                return False
+            self._sites[site] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+    def pending_suppressed(self):
+        """Records dropped since the last record let through at each call site"""
+        with self._lock:
+            return sum(suppressed for _, _, suppressed in self._sites.values())
+
+class StructuredFormatter(logging.Formatter):
+    """Formats records as text with key=value fields, or as JSON lines"""
+
+    def __init__(self, json_lines=False):
+        super().__init__("%(asctime)s %(levelname)-7s %(threadName)s %(name)s: %(message)s")
+        self.json_lines = json_lines
+
+    def format(self, record):
+        record_fields = getattr(record, 'fields', None) or {}
+        suppressed = getattr(record, 'suppressed', 0)
+
+        if self.json_lines:
+            entry = {
+                'time': self.formatTime(record),
+                'level': record.levelname,
+                'logger': record.name,
+                'thread': record.threadName,
+                'message': record.getMessage()
+            }
+            entry.update(record_fields)
+            if suppressed:
+                entry['suppressed'] = suppressed
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+
+        text = super().format(record)
+        if record_fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in record_fields.items())
+        if suppressed:
+            text += f" [{suppressed} similar messages suppressed]"
+        return text
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves message formatting to the listener thread.
+
+    The stock handler formats the message before queueing it, which puts the
+    string work back on the calling thread. Log arguments must therefore not
+    be mutated after the call (pass numbers and strings, not live arrays).
+    """
+
+    def prepare(self, record):
+        return record
+
+def configure_logging(level=None, log_file=None, json_lines=None, rate_limit=None, rate_period=None):
+    """Route all logging through a rate-limited background queue.
+
+    Arguments default to the hardware_config logging settings. Calling it
+    again replaces the previous configuration.
+    """
+    global _listener, _queue_handler, _rate_filter
+
+    try:
+        from hardware_config import hardware_config
+        settings = hardware_config.get_logging_settings()
+    except ImportError:
+        settings = {'level': 'INFO', 'log_file': None, 'json_lines': False,
+                    'rate_limit': 5, 'rate_period': 1.0}
+
+    level = settings['level'] if level is None else level
+    log_file = settings['log_file'] if log_file is None else log_file
+    json_lines = settings['json_lines'] if json_lines is None else json_lines
+    rate_limit = settings['rate_limit'] if rate_limit is None else rate_limit
+    rate_period = settings['rate_period'] if rate_period is None else rate_period
+
+    shutdown_logging()
+
+    formatter = StructuredFormatter(json_lines=json_lines)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=10 * 1024 * 1024, backupCount=3, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = DeferredQueueHandler(log_queue)
+    _rate_filter = RateLimitFilter(rate_limit, rate_period)
+    _queue_handler.addFilter(_rate_filter)
+
+    root = logging.getLogger()
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    root.addHandler(_queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _queue_handler
+
+def shutdown_logging():
+    """Write out queued records and remove the queue handler"""
+    global _listener, _queue_handler, _rate_filter
+
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        # Report records the rate limit dropped that no later record accounted for
+        pending = _rate_filter.pending_suppressed()
+        if pending:
+            _queue_handler.enqueue(logging.makeLogRecord({
+                'name': __name__, 'levelno': logging.INFO, 'levelname': 'INFO',
+                'msg': "%d log messages suppressed by rate limiting", 'args': (pending,)
+            }))
+        _queue_handler = None
+        _rate_filter = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,116 @@
+import csv
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+class RollingHistogram:
+    """Latency samples (milliseconds) over a fixed window of recent events.
+
+    Samples go into a preallocated ring buffer, so recording is O(1) and
+    allocation free; percentiles are computed over the window on demand.
+    """
+
+    def __init__(self, window=1000):
+        self._samples = np.zeros(window)
+        self._index = 0
+        self._filled = 0
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, value_ms):
+        self._samples[self._index] = value_ms
+        self._index = (self._index + 1) % len(self._samples)
+        self._filled = min(self._filled + 1, len(self._samples))
+        self.count += 1
+        self.total_ms += value_ms
+
+    def summary(self):
+        """Percentiles over the window plus lifetime count and mean"""
+        if self._filled == 0:
+            return {'count': 0, 'window': 0, 'p50': None, 'p95': None, 'p99': None,
+                    'max': None, 'mean': None}
+        window = self._samples[:self._filled]
+        p50, p95, p99 = np.percentile(window, [50, 95, 99])
+        return {
+            'count': self.count,
+            'window': self._filled,
+            'p50': float(p50),
+            'p95': float(p95),
+            'p99': float(p99),
+            'max': float(window.max()),
+            'mean': self.total_ms / self.count
+        }
+
+class MetricsRegistry:
+    """Thread-safe set of named rolling latency histograms.
+
+    Instrumented code records durations with record() or the timer()
+    context manager; timings use the monotonic perf_counter clock.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self.started_at = time.time()
+
+    def record(self, name, value_ms):
+        """Add one latency sample in milliseconds"""
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = RollingHistogram(self.window)
+            histogram.add(value_ms)
+
+    def record_seconds(self, name, value_s):
+        self.record(name, value_s * 1000.0)
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block and record it under name"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000.0)
+
+    def summary(self, name=None):
+        """Percentile summary for one metric, or a dict of all metrics"""
+        with self._lock:
+            if name is not None:
+                histogram = self._histograms.get(name)
+                return histogram.summary() if histogram else None
+            return {key: histogram.summary() for key, histogram in sorted(self._histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self.started_at = time.time()
+
+    def export(self, path):
+        """Write the current summaries to path as JSON, or CSV for .csv paths"""
+        metrics = self.summary()
+        if path.lower().endswith('.csv'):
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['metric', 'count', 'window', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'mean_ms'])
+                for name, stats in metrics.items():
+                    writer.writerow([name, stats['count'], stats['window'], stats['p50'],
+                                     stats['p95'], stats['p99'], stats['max'], stats['mean']])
+        else:
+            with open(path, 'w') as file:
+                json.dump({
+                    'exported_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+                    'started_at': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started_at)),
+                    'window': self.window,
+                    'metrics': metrics
+                }, file, indent=2)
+
+# Global metrics registry shared by the capture, detection, storage and UI code
+metrics = MetricsRegistry()
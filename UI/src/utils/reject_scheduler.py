@@ -0,0 +1,198 @@
+"""
+Reject scheduling: fire the relay when a defective board reaches the ejector.
+"""
+import math
+import time
+import logging
+import threading
+from typing import Optional, Dict, Any
+
+from src.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class RejectScheduler:
+    """Delays relay pulses by the board's travel time from camera to ejector.
+
+    A reject is due at capture_time + ejector_distance / belt_speed - lead_time,
+    where lead_time covers the relay command latency and the ejector's
+    mechanical response. Pending rejects sit in a hashed timer wheel: each
+    slot holds the rejects due in one tick, so scheduling is O(1) however
+    many boards are in flight, and a single thread wakes once per tick only
+    while rejects are pending.
+
+    With no belt speed or ejector distance configured (or no capture time)
+    rejects fire immediately, as before.
+    """
+
+    def __init__(self, relay_controller=None, belt_speed: float = 0.0, ejector_distance: float = 0.0,
+                 lead_time: float = 0.0, tick: float = 0.002, slots: int = 1024):
+        """
+        Args:
+            relay_controller: RelayController that executes the pulses
+            belt_speed: Conveyor speed in mm/s
+            ejector_distance: Distance along the belt from the camera's view to the ejector in mm
+            lead_time: Seconds to fire early to cover relay and ejector response
+            tick: Timer wheel resolution in seconds
+            slots: Timer wheel size; one revolution spans slots * tick seconds
+        """
+        self.relay_controller = relay_controller
+        self.tick = tick
+        self._wheel = [[] for _ in range(slots)]
+        self._pending = 0
+        self._earliest_tick = None      # Earliest tick scheduled since the wheel was last idle
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self.configure(belt_speed, ejector_distance, lead_time)
+
+        # Statistics
+        self.scheduled_count = 0
+        self.fired_count = 0
+        self.late_count = 0
+        self.failed_count = 0
+        self.cancelled_count = 0
+        self.last_lateness = None
+
+    def configure(self, belt_speed: float, ejector_distance: float, lead_time: float = 0.0) -> None:
+        """Set the conveyor geometry; applies to rejects scheduled from now on."""
+        self.belt_speed = belt_speed
+        self.ejector_distance = ejector_distance
+        self.lead_time = lead_time
+
+    @property
+    def delay(self) -> Optional[float]:
+        """Seconds from frame capture to firing, or None when rejects fire immediately."""
+        if self.belt_speed <= 0 or self.ejector_distance <= 0:
+            return None
+        return max(0.0, self.ejector_distance / self.belt_speed - self.lead_time)
+
+    def schedule(self, capture_time: Optional[float] = None, duration: float = 0.5) -> bool:
+        """
+        Schedule a reject pulse for the board in the frame captured at capture_time.
+        Args:
+            capture_time: perf_counter() time the frame was grabbed
+            duration: Relay pulse length in seconds
+        Returns:
+            True if the reject was scheduled (or fired), False otherwise
+        """
+        delay = self.delay
+        if delay is None or capture_time is None:
+            return self._fire(duration, capture_time, None)
+
+        fire_at = capture_time + delay
+        if fire_at <= time.perf_counter():
+            # Detection took longer than the board's travel time
+            self.late_count += 1
+            logger.warning("⚠️ Reject fired late: board passed the ejector %.1fms ago",
+                           (time.perf_counter() - fire_at) * 1000)
+            return self._fire(duration, capture_time, fire_at)
+
+        self.start()
+        tick_index = math.ceil(fire_at / self.tick)
+        with self._condition:
+            self._wheel[tick_index % len(self._wheel)].append((tick_index, fire_at, duration, capture_time))
+            if self._pending == 0 or tick_index < self._earliest_tick:
+                self._earliest_tick = tick_index
+            self._pending += 1
+            self.scheduled_count += 1
+            self._condition.notify()
+        return True
+
+    def start(self) -> None:
+        """Start the timer thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="RejectScheduler")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the timer thread, discarding rejects that have not fired."""
+        with self._condition:
+            self._running = False
+            cancelled = self._clear_locked()
+            self._condition.notify()
+        if cancelled:
+            logger.warning("⚠️ %d pending rejects cancelled", cancelled)
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def clear(self) -> int:
+        """Cancel all pending rejects; returns how many were cancelled."""
+        with self._condition:
+            return self._clear_locked()
+
+    def _clear_locked(self) -> int:
+        cancelled = self._pending
+        for slot in self._wheel:
+            slot.clear()
+        self._pending = 0
+        self.cancelled_count += cancelled
+        return cancelled
+
+    def _run(self) -> None:
+        """Timer thread: advances the wheel one tick at a time and fires due rejects."""
+        current_tick = None
+        while self._running:
+            with self._condition:
+                if self._pending == 0:
+                    # Nothing in flight - sleep until a reject is scheduled
+                    self._condition.wait()
+                    current_tick = None
+                    continue
+
+                if current_tick is None:
+                    # Resume at the earliest pending reject even if its tick
+                    # has passed by the time this thread woke up
+                    current_tick = min(math.ceil(time.perf_counter() / self.tick), self._earliest_tick)
+
+                timeout = current_tick * self.tick - time.perf_counter()
+                if timeout > 0:
+                    self._condition.wait(timeout)
+                    continue
+
+                # Rejects due by this tick; the rest belong to later revolutions
+                slot = self._wheel[current_tick % len(self._wheel)]
+                due = [entry for entry in slot if entry[0] <= current_tick]
+                if due:
+                    slot[:] = [entry for entry in slot if entry[0] > current_tick]
+                    self._pending -= len(due)
+                current_tick += 1
+
+            for _, fire_at, duration, capture_time in sorted(due, key=lambda entry: entry[1]):
+                self._fire(duration, capture_time, fire_at)
+
+    def _fire(self, duration: float, capture_time: Optional[float], fire_at: Optional[float]) -> bool:
+        if fire_at is not None:
+            self.last_lateness = time.perf_counter() - fire_at
+            metrics.record('reject.lateness', self.last_lateness * 1000)
+
+        relay = self.relay_controller
+        try:
+            if relay is not None and relay.trigger(duration=duration, capture_time=capture_time):
+                self.fired_count += 1
+                return True
+            self.failed_count += 1
+            logger.error("❌ Reject pulse failed - relay not available")
+        except Exception as e:
+            self.failed_count += 1
+            logger.error("❌ Reject pulse error: %s", e)
+        return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get reject counters, pending rejects and the configured delay."""
+        delay = self.delay
+        return {
+            'delay_ms': None if delay is None else delay * 1000,
+            'pending': self._pending,
+            'scheduled': self.scheduled_count,
+            'fired': self.fired_count,
+            'late': self.late_count,
+            'failed': self.failed_count,
+            'cancelled': self.cancelled_count,
+            'last_lateness_ms': None if self.last_lateness is None else self.last_lateness * 1000
+        }
@@ -3,16 +3,23 @@ Enhanced relay controller with better testing and error handling.
 """
 import serial
 import time
+import queue
 import logging
 import threading
+from collections import deque
 from typing import Optional, Dict, Any
 
+from src.utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 class RelayError(Exception):
     """Custom exception for relay-related errors."""
     pass
 
+RELAY_ON_COMMAND = bytes([0xA0, 0x01, 0x01, 0xA2])
+RELAY_OFF_COMMAND = bytes([0xA0, 0x01, 0x00, 0xA1])
+
 class RelayController:
     """Enhanced relay controller with better testing and error handling."""
     
@@ -32,6 +39,24 @@ class RelayController:
         self.test_mode = False
         self.test_thread = None
         self._connecting = False  # Prevent multiple simultaneous connection attempts
+        self._serial_lock = threading.RLock()  # Serialise writes from the actuator and callers
+        
+        # Asynchronous actuation: a writer thread owns the ON/OFF timing
+        self._command_queue = queue.Queue()
+        self._actuator_thread = None
+        self._actuator_running = False
+        self._relay_on = False
+        self._off_deadline = None
+        
+        # Actuation statistics (command-to-wire latency in seconds)
+        self._latencies = deque(maxlen=100)
+        self.last_command_latency = None
+        # Frame capture to relay ON edge (seconds), for triggers given a capture time
+        self._end_to_end = deque(maxlen=100)
+        self.last_end_to_end_latency = None
+        self.pulse_count = 0
+        self.coalesced_count = 0
+        self.failed_count = 0
         logger.info(f"Relay controller initialized for port {port}")
     
     def connect(self) -> bool:
@@ -73,6 +98,7 @@ class RelayController:
             
             if self._test_connection():
                 self.is_connected_flag = True
+                self.start_actuator()
                 logger.info(f"✅ Connected to relay on {self.port}")
                 return True
             else:
@@ -121,8 +147,7 @@ class RelayController:
             if not self.serial or not self.serial.is_open:
                 return False
             
-            test_command = bytes([0xA0, 0x01, 0x00, 0xA1])
-            self.serial.write(test_command)
+            self._write_command(RELAY_OFF_COMMAND)
             time.sleep(0.1)
             
             if self.serial.in_waiting > 0:
@@ -141,6 +166,9 @@ class RelayController:
             if self.test_mode:
                 self.stop_test()
             
+            # Stop the actuator (it switches the relay off if a pulse is active)
+            self.stop_actuator()
+            
             # Turn off relay if connected
             if self.serial and self.serial.is_open:
                 try:
@@ -192,10 +220,8 @@ class RelayController:
             logger.warning("❌ Not connected to relay")
             return False
         
-        command = bytes([0xA0, 0x01, 0x01, 0xA2])
         try:
-            self.serial.write(command)
-            self.serial.flush()
+            self._write_command(RELAY_ON_COMMAND)
             time.sleep(0.05)
             logger.info("✅ Relay turned ON")
             return True
@@ -213,10 +239,8 @@ class RelayController:
             logger.warning("❌ Not connected to relay")
             return False
         
-        command = bytes([0xA0, 0x01, 0x00, 0xA1])
         try:
-            self.serial.write(command)
-            self.serial.flush()
+            self._write_command(RELAY_OFF_COMMAND)
             time.sleep(0.05)
             logger.info("✅ Relay turned OFF")
             return True
@@ -224,31 +248,140 @@ class RelayController:
             logger.error(f"❌ Failed to turn OFF: {str(e)}")
             return False
     
-    def trigger(self, duration: float = 0.5) -> bool:
+    def _write_command(self, command: bytes) -> None:
+        """Write a command frame to the relay and wait until it is on the wire."""
+        with self._serial_lock:
+            self.serial.write(command)
+            self.serial.flush()
+    
+    def trigger(self, duration: float = 0.5, capture_time: Optional[float] = None) -> bool:
         """
-        Trigger the relay for a specified duration.
+        Trigger the relay for a specified duration without blocking.
+        The pulse is queued for the actuator thread, which writes ON straight
+        away and schedules the matching OFF. A trigger that arrives while a
+        pulse is active extends that pulse instead of starting a new one.
         Args:
             duration: Duration in seconds to keep relay on
+            capture_time: perf_counter() time the triggering frame was captured,
+                used to measure capture-to-actuation latency
         Returns:
-            True if successful, False otherwise
+            True if the pulse was queued, False otherwise
         """
         if not self.is_connected():
             logger.error("❌ Cannot trigger relay - not connected")
             return False
         
         try:
-            if self.turn_on():
-                time.sleep(duration)
-                self.turn_off()
-                logger.info(f"✅ Relay triggered for {duration} seconds")
-                return True
-            else:
-                logger.error("❌ Failed to trigger relay")
-                return False
+            self.start_actuator()
+            self._command_queue.put(('pulse', duration, time.perf_counter(), capture_time))
+            return True
         except Exception as e:
-            logger.error(f"❌ Error during relay trigger: {str(e)}")
+            logger.error("❌ Error during relay trigger: %s", e)
             return False
     
+    def start_actuator(self) -> None:
+        """Start the serial writer thread if it is not already running."""
+        if self._actuator_thread and self._actuator_thread.is_alive():
+            return
+        
+        self._actuator_running = True
+        self._actuator_thread = threading.Thread(target=self._actuator_loop, name="RelayActuator")
+        self._actuator_thread.daemon = True
+        self._actuator_thread.start()
+    
+    def stop_actuator(self) -> None:
+        """Stop the serial writer thread, switching the relay off first."""
+        if not self._actuator_thread:
+            return
+        
+        self._actuator_running = False
+        self._command_queue.put(('stop', 0, time.perf_counter(), None))
+        if self._actuator_thread.is_alive() and self._actuator_thread is not threading.current_thread():
+            self._actuator_thread.join(timeout=2.0)
+        self._actuator_thread = None
+    
+    def _actuator_loop(self) -> None:
+        """Writer thread: executes queued pulses and scheduled OFF commands."""
+        while self._actuator_running:
+            # Sleep until the next command arrives or the active pulse is due to end
+            timeout = None
+            if self._off_deadline is not None:
+                timeout = max(0.0, self._off_deadline - time.perf_counter())
+            try:
+                action, duration, queued_at, capture_time = self._command_queue.get(timeout=timeout)
+            except queue.Empty:
+                action = None
+            
+            if action == 'pulse':
+                deadline = time.perf_counter() + duration
+                if self._relay_on:
+                    # Overlapping trigger - extend the active pulse
+                    self._off_deadline = max(self._off_deadline, deadline)
+                    self.coalesced_count += 1
+                    # The relay is already energised for this frame's board
+                    self._record_end_to_end(capture_time)
+                else:
+                    try:
+                        self._write_command(RELAY_ON_COMMAND)
+                        self._record_latency(time.perf_counter() - queued_at)
+                        self._record_end_to_end(capture_time)
+                        self._relay_on = True
+                        self._off_deadline = deadline
+                        self.pulse_count += 1
+                        logger.debug("Relay pulse started: %.3fs, latency %.2fms",
+                                     duration, self.last_command_latency * 1000)
+                    except Exception as e:
+                        self.failed_count += 1
+                        logger.error("❌ Failed to turn ON: %s", e)
+            
+            if self._relay_on and (action == 'stop' or time.perf_counter() >= self._off_deadline):
+                self._release_relay()
+        
+        # Never leave the relay energised when the actuator stops
+        if self._relay_on:
+            self._release_relay()
+    
+    def _release_relay(self) -> None:
+        """Write the OFF command for the active pulse."""
+        try:
+            self._write_command(RELAY_OFF_COMMAND)
+        except Exception as e:
+            self.failed_count += 1
+            logger.error("❌ Failed to turn OFF: %s", e)
+        self._relay_on = False
+        self._off_deadline = None
+    
+    def _record_latency(self, latency: float) -> None:
+        self.last_command_latency = latency
+        self._latencies.append(latency)
+        metrics.record('relay.command', latency * 1000)
+    
+    def _record_end_to_end(self, capture_time: Optional[float]) -> None:
+        if capture_time is None:
+            return
+        latency = time.perf_counter() - capture_time
+        self.last_end_to_end_latency = latency
+        self._end_to_end.append(latency)
+        metrics.record('pipeline.capture_to_relay', latency * 1000)
+    
+    def get_actuation_stats(self) -> Dict[str, Any]:
+        """Get command-to-wire and capture-to-actuation latency (milliseconds) and pulse counters."""
+        latencies = list(self._latencies)
+        end_to_end = list(self._end_to_end)
+        return {
+            'last_latency_ms': None if self.last_command_latency is None else self.last_command_latency * 1000,
+            'avg_latency_ms': sum(latencies) / len(latencies) * 1000 if latencies else None,
+            'max_latency_ms': max(latencies) * 1000 if latencies else None,
+            'last_end_to_end_ms': None if self.last_end_to_end_latency is None else self.last_end_to_end_latency * 1000,
+            'avg_end_to_end_ms': sum(end_to_end) / len(end_to_end) * 1000 if end_to_end else None,
+            'max_end_to_end_ms': max(end_to_end) * 1000 if end_to_end else None,
+            'pulses': self.pulse_count,
+            'coalesced': self.coalesced_count,
+            'failed': self.failed_count,
+            'queued': self._command_queue.qsize(),
+            'relay_on': self._relay_on
+        }
+    
     def test_relay(self, cycles: int = 3, on_duration: float = 0.3, 
                    off_duration: float = 0.3) -> bool:
         """
@@ -337,7 +470,8 @@ class RelayController:
         return {
             'connected': self.is_connected(),
             'port': self.port,
-            'test_mode': self.test_mode
+            'test_mode': self.test_mode,
+            'actuation': self.get_actuation_stats()
         }
     
     def update_config(self, port: str, baudrate: int = 9600, timeout: float = 1.0) -> None:
@@ -363,9 +497,12 @@ class RelayController:
                 return self.connect()
             
             # Try a simple test to see if the connection is responsive
+            # (skipped mid-pulse, where an OFF frame would cut the pulse short)
+            if self._relay_on:
+                return True
             try:
-                test_command = bytes([0xA0, 0x01, 0x00, 0xA1])
-                self.serial.write(test_command)
+                with self._serial_lock:
+                    self.serial.write(RELAY_OFF_COMMAND)
                 time.sleep(0.05)
                 return True
             except Exception as e:
@@ -0,0 +1,47 @@
+import json
+import os
+
+import cv2
+import pytest
+
+from benchmarks.synthetic_boards import make_board_image
+from src.core.batch_inspector import run_batch
+
+FRAME_COUNT = 120
+
+@pytest.fixture
+def defect_video(tmp_path):
+    """A short video in which every frame has misaligned boards"""
+    path = str(tmp_path / "boards.avi")
+    image, _ = make_board_image(width=640, height=360, angles=(90, 80, 90, 78))
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (image.shape[1], image.shape[0]))
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    for _ in range(FRAME_COUNT):
+        writer.write(image)
+    writer.release()
+    return path
+
+def read_results(path):
+    with open(path) as file:
+        return [json.loads(line) for line in file]
+
+def test_saved_images_are_not_pruned(defect_video, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    image_dir = str(tmp_path / "images")
+    assert run_batch([defect_video, '-o', output, '--save-images', image_dir]) == 0
+
+    results = read_results(output)
+    image_paths = [result['image_path'] for result in results if result['image_path']]
+    assert len(results) == FRAME_COUNT
+    # More images than any retention profile keeps
+    assert len(image_paths) > 50
+    missing = [path for path in image_paths if not os.path.exists(path)]
+    assert missing == []
+
+def test_max_images_limits_saved_images(defect_video, tmp_path):
+    output = str(tmp_path / "results.jsonl")
+    image_dir = str(tmp_path / "images")
+    assert run_batch([defect_video, '-o', output, '--save-images', image_dir, '--max-images', '25']) == 0
+
+    assert len(os.listdir(image_dir)) == 25
@@ -0,0 +1,23 @@
+import numpy as np
+
+from src.core.detection_engine import DetectionEngine
+from src.core.line_selection import clip_segments
+
+FRAME_SHAPE = (240, 320, 3)
+
+def test_clip_segments_keeps_the_angle():
+    clipped = clip_segments([[-10, -10, 400, 400], [10, -3, 10, 500], [5, 5, 50, 60]], 320, 240)
+    assert clipped.tolist() == [[0, 0, 239, 239], [10, 0, 10, 239], [5, 5, 50, 60]]
+
+def test_clip_segments_leaves_segments_outside_the_image():
+    assert clip_segments([[-5, -5, -1, -1]], 320, 240).tolist() == [[-5, -5, -1, -1]]
+
+def test_merged_line_along_the_border_is_kept():
+    # Two pieces of a board edge at the left ROI border; merging projects the
+    # lower end onto the upper piece's line, past x = 0
+    engine = DetectionEngine()
+    lines = np.array([[3, 10, 0, 110], [0, 115, 0, 200]]).reshape(-1, 1, 4)
+    classified = engine.classify_lines(engine.select_lines(lines, FRAME_SHAPE), FRAME_SHAPE)
+    assert len(classified) == 1
+    assert classified['in_bounds'].all()
+    assert abs(classified['angle'][0] - np.degrees(np.arctan2(100, 3))) < 0.5
@@ -0,0 +1,37 @@
+import threading
+import time
+import types
+
+from src.utils import reject_scheduler
+from src.utils.reject_scheduler import RejectScheduler
+
+class FakeRelay:
+    def __init__(self):
+        self.fired = threading.Event()
+
+    def trigger(self, duration=0.5, capture_time=None):
+        self.fired.set()
+        return True
+
+def test_reject_due_within_a_tick_fires_after_a_late_wakeup(monkeypatch):
+    # The timer thread wakes only after the clock has moved several ticks
+    # past the reject's deadline, as it can under CPU load
+    offset = [0.0]
+    monkeypatch.setattr(reject_scheduler, 'time',
+                        types.SimpleNamespace(perf_counter=lambda: time.perf_counter() + offset[0]))
+    relay = FakeRelay()
+    scheduler = RejectScheduler(relay, belt_speed=1000.0, ejector_distance=100.0, tick=0.002)
+    scheduler.start()
+    try:
+        # Idle timer thread
+        time.sleep(0.05)
+        with scheduler._condition:
+            now = reject_scheduler.time.perf_counter()
+            assert scheduler.schedule(capture_time=now - scheduler.delay + 0.001)
+            offset[0] += 0.010
+
+        # One wheel revolution (about 2 s) late before the fix
+        assert relay.fired.wait(1.0)
+        assert scheduler.last_lateness < 0.5
+    finally:
+        scheduler.stop()